@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Runs the benchmarks of pyworld2 and tracks performance regressions. Run from
+the root of the repository:
+
+    python -m benchmarks run            # appends results to the history
+    python -m benchmarks compare        # last results against previous ones
+
+compare exits with status 1 if a benchmark regressed past the threshold.
+
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import pyworld2
+
+from .suite import BENCHMARKS, run_benchmarks
+
+HISTORY_FILE = os.path.join(os.path.dirname(__file__), "history.jsonl")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_history(history_file):
+    if not os.path.exists(history_file):
+        return []
+    with open(history_file) as fhistory:
+        return [json.loads(line) for line in fhistory if line.strip()]
+
+
+def compare(history, baseline=-2, threshold=0.1):
+    """
+    Compares the last entry of the history with a baseline entry.
+
+    Returns
+    -------
+    list
+        names of the benchmarks slower than (1 + threshold) times the
+        baseline.
+
+    """
+    reference, last = history[baseline], history[-1]
+    regressions = []
+    print(f"{'benchmark':<28}{'baseline':>12}{'last':>12}{'ratio':>8}")
+    for name, result in last["results"].items():
+        if name not in reference["results"]:
+            continue
+        ratio = result["value"] / reference["results"][name]["value"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<28}{reference['results'][name]['value']:>12.3e}"
+              f"{result['value']:>12.3e}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--history", default=HISTORY_FILE,
+                        help="json lines history file (default: "
+                             "%(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    parser_run = commands.add_parser("run", help="runs benchmarks and "
+                                                 "appends them to history")
+    parser_run.add_argument("names", nargs="*",
+                            help="benchmarks to run, among "
+                                 f"{', '.join(BENCHMARKS)} (default: all)")
+    parser_run.add_argument("--repeat", type=int, default=5)
+    parser_compare = commands.add_parser("compare", help="compares the last "
+                                                         "entry of history")
+    parser_compare.add_argument("--baseline", type=int, default=-2,
+                                help="index of the baseline entry (default: "
+                                     "%(default)s, the previous one)")
+    parser_compare.add_argument("--threshold", type=float, default=0.1,
+                                help="tolerated slowdown (default: "
+                                     "%(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        unknown = set(args.names) - set(BENCHMARKS)
+        if unknown:
+            parser.error(f"unknown benchmarks {sorted(unknown)}")
+        results = run_benchmarks(args.names or None, repeat=args.repeat)
+        for name, result in results.items():
+            print(f"{name:<28}{result['value']:>12.3e} {result['unit']}")
+        entry = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "commit": git_commit(), "version": pyworld2.__version__,
+                 "python": platform.python_version(),
+                 "numpy": np.__version__, "machine": platform.node(),
+                 "results": results}
+        with open(args.history, "a") as fhistory:
+            fhistory.write(json.dumps(entry) + "\n")
+        return 0
+
+    history = read_history(args.history)
+    if len(history) < 2:
+        print("compare needs at least 2 entries in the history")
+        return 1
+    regressions = compare(history, args.baseline, args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the cost of table functions based on scipy interp1d with
+TableFunction: per scalar call, and per World2.step call.
+
+Run from the root of the repository:
+
+    python -m benchmarks.bench_table_functions
+
+"""
+import timeit
+
+from scipy.interpolate import interp1d
+
+from pyworld2 import World2
+from pyworld2.utils import TableFunction
+
+
+def to_interp1d(func):
+    """
+    Builds the interp1d equivalent to a TableFunction, as in pyworld2 1.1.
+
+    """
+    return interp1d(func.x, func.y, bounds_error=False,
+                    fill_value=(func.y[0], func.y[-1]))
+
+
+def time_step(w2, repeat=5):
+    """
+    Returns the best time of one step over full runs [s].
+
+    """
+    w2.run()
+    best = min(timeit.repeat(w2.run, number=1, repeat=repeat))
+    return best / (w2.n - 1)
+
+
+def main():
+    w2 = World2()
+    w2.set_all_standard()
+
+    func = w2.drmm
+    func_ref = to_interp1d(func)
+    number = 20000
+    t_scalar = min(timeit.repeat(lambda: func(1.7), number=number)) / number
+    t_scalar_ref = min(timeit.repeat(lambda: func_ref(1.7),
+                                     number=number)) / number
+
+    t_step = time_step(w2)
+    for name, value in list(vars(w2).items()):
+        if isinstance(value, TableFunction):
+            setattr(w2, name, to_interp1d(value))
+    t_step_ref = time_step(w2)
+
+    print(f"{'':<16}{'interp1d':>12}{'TableFunction':>16}{'speedup':>10}")
+    print(f"{'scalar call':<16}{t_scalar_ref*1e6:>10.2f}us"
+          f"{t_scalar*1e6:>14.2f}us{t_scalar_ref/t_scalar:>9.1f}x")
+    print(f"{'World2.step':<16}{t_step_ref*1e6:>10.2f}us"
+          f"{t_step*1e6:>14.2f}us{t_step_ref/t_step:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of pyworld2. Each benchmark returns the best time per unit of work
+over several repeats, so that lower is always better.
+
+"""
+import subprocess
+import sys
+import timeit
+
+from pyworld2 import World2, World2Ensemble, config
+
+BENCHMARKS = {}
+
+
+def benchmark(unit):
+    """
+    Registers a benchmark function, timing one unit of work.
+
+    """
+    def register(func):
+        BENCHMARKS[func.__name__] = (func, unit)
+        return func
+    return register
+
+
+def best_time(func, repeat, number=1):
+    """
+    Returns the best time of one call of func over repeats [s].
+
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def standard_world(**kwargs):
+    w2 = World2(**kwargs)
+    w2.set_all_standard()
+    return w2
+
+
+@benchmark("s/run")
+def run_dt_0_2_200y(repeat):
+    return best_time(standard_world().run, repeat)
+
+
+@benchmark("s/run")
+def run_dt_0_05_200y(repeat):
+    return best_time(standard_world(dt=0.05).run, repeat)
+
+
+@benchmark("s/run")
+def run_dt_0_2_1000y(repeat):
+    return best_time(standard_world(year_max=2900).run, repeat)
+
+
+@benchmark("s/step")
+def step(repeat):
+    w2 = standard_world()
+    w2.step_init()
+
+    def steps():
+        for k in range(1, w2.n):
+            w2.step(k)
+    return best_time(steps, repeat) / (w2.n - 1)
+
+
+@benchmark("s/call")
+def set_table_functions_cold(repeat):
+    w2 = World2()
+
+    def setup():
+        config.clear_registry()
+        w2.set_table_functions()
+    return best_time(setup, repeat, number=10)
+
+
+@benchmark("s/call")
+def set_table_functions(repeat):
+    return best_time(World2().set_table_functions, repeat, number=100)
+
+
+@benchmark("s/call")
+def set_switch_functions_cold(repeat):
+    w2 = World2()
+
+    def setup():
+        config.clear_registry()
+        w2.set_switch_functions()
+    return best_time(setup, repeat, number=10)
+
+
+@benchmark("s/call")
+def set_switch_functions(repeat):
+    return best_time(World2().set_switch_functions, repeat, number=100)
+
+
+@benchmark("s/import")
+def import_pyworld2(repeat):
+    code = ("import time; t = time.perf_counter(); import pyworld2; "
+            "print(time.perf_counter() - t)")
+    return min(float(subprocess.check_output([sys.executable, "-c", code]))
+               for _ in range(repeat))
+
+
+@benchmark("s/run")
+def batch_throughput(repeat):
+    n_runs = 1000
+    w2 = World2Ensemble(n_runs)
+    w2.set_all_standard()
+    return best_time(w2.run, repeat) / n_runs
+
+
+def run_benchmarks(names=None, repeat=5):
+    """
+    Runs benchmarks, all of them if names is None.
+
+    Returns
+    -------
+    dict
+        by benchmark name, its "value" [unit] and "unit".
+
+    """
+    results = {}
+    for name, (func, unit) in BENCHMARKS.items():
+        if names is None or name in names:
+            results[name] = {"value": func(repeat), "unit": unit}
+    return results
@@ -2,4 +2,7 @@
 
 __version__ = "1.1"
 
-from .world2 import World2, hello_world2
+from .world2 import World2, hello_world2, run_policies
+from .ensemble import World2Ensemble
+
+__all__ = ["World2", "World2Ensemble", "hello_world2", "run_policies"]
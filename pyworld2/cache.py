@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Content-addressed cache of World2 results.
+
+A run is keyed by a hash of everything that determines its result: time
+grid, dtype and number of runs, constants and initial conditions, x and y
+values of the table functions, values and threshold years of the switch
+functions, the options of World2.run, and the version of pyworld2. Results
+are kept in memory for the most recent keys, and on disk in a directory
+whose size is capped by evicting the least recently used results.
+
+Examples
+--------
+>>> cache = ResultCache("~/.cache/pyworld2", max_bytes=1 << 30)
+>>> w2 = World2()
+>>> w2.set_all_standard()
+>>> w2.run(cache=cache)    # runs, and stores the result
+>>> w2.run(cache=cache)    # loads the result from memory
+>>> cache.stats
+
+"""
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from . import __version__
+from .config import SWITCH_NAMES, TABLE_NAMES
+from .utils import Schedule
+from .world2 import CONSTANT_NAMES, INITIAL_STATE_NAMES
+
+
+def configuration_key(w2, **run_options):
+    """
+    Returns the hash of everything that determines the result of a run.
+    Values are hashed as float64 bytes, in the fixed order of the names of
+    pyworld2, so that equal configurations share the key however they were
+    set.
+
+    Parameters
+    ----------
+    w2 : World2
+        simulation with constants, initial state, table and switch functions
+        set. World2Ensemble simulations are keyed the same way.
+    **run_options
+        arguments of World2.run, e.g. method and backend.
+
+    Returns
+    -------
+    str
+        hexadecimal sha256 digest.
+
+    """
+    # numpy values of the options are hashed as Python scalars and lists
+    header = json.dumps(
+        {"version": __version__, "class": type(w2).__name__,
+         "dtype": w2.dtype.str, "shape": w2._vector_shape(0)[1:],
+         "run": run_options},
+        sort_keys=True, default=lambda value: np.asarray(value).tolist())
+    digest = hashlib.sha256(header.encode())
+
+    # scalars, with NaN and the shape in place of arrays, then the arrays
+    scalars, arrays = [], []
+
+    def update(*values):
+        for value in values:
+            if isinstance(value, (int, float)) or np.ndim(value) == 0:
+                scalars.append(value)
+            else:
+                value = np.asarray(value, dtype="<f8")
+                scalars.extend([np.nan, *value.shape])
+                arrays.append(value)
+
+    update(w2.year_min, w2.year_max, w2.dt, w2.stride)
+    for name in CONSTANT_NAMES + INITIAL_STATE_NAMES:
+        update(getattr(w2, name))
+    for func_name in SWITCH_NAMES:
+        func = getattr(w2, func_name.lower())
+        if isinstance(func, Schedule):
+            scalars.append(np.inf)
+            update(len(func.values), *func.values, *func.trigger_values)
+        else:
+            update(func.value_before_switch, func.value_after_switch,
+                   func.trigger_value)
+    for func_name in TABLE_NAMES:
+        func = getattr(w2, func_name.lower())
+        scalars.append(func.x.size)
+        arrays += [func.x, func.y]
+    digest.update(np.array(scalars, dtype="<f8").tobytes())
+    for value in arrays:
+        digest.update(np.ascontiguousarray(value, dtype="<f8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Cache of World2 results, in memory and on disk, for World2.run(cache=).
+
+    Attributes
+    ----------
+    path : str
+        directory of the results on disk, one "<key>.npz" file each, or None
+        to keep results in memory only.
+    max_bytes : int
+        size cap of the directory. Least recently used results are removed
+        beyond it.
+    max_items : int
+        number of results kept in memory.
+    stats : dict
+        "hits" in memory, "disk_hits", "misses" and "evictions" from disk.
+
+    """
+
+    def __init__(self, path=None, max_bytes=1 << 30, max_items=64):
+        """
+        __init__ of class ResultCache.
+
+        Parameters
+        ----------
+        path : str, optional
+            directory of the results on disk, created if needed. The default
+            is None, for a cache in memory only.
+        max_bytes : int, optional
+            size cap of the directory [bytes]. The default is 1 GiB.
+        max_items : int, optional
+            number of results kept in memory. The default is 64.
+
+        """
+        self.path = None
+        if path is not None:
+            self.path = os.path.abspath(os.path.expanduser(path))
+            os.makedirs(self.path, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.stats = dict.fromkeys(["hits", "disk_hits", "misses",
+                                    "evictions"], 0)
+        self._memory = OrderedDict()
+
+    def key(self, w2, **run_options):
+        """
+        Returns the key of a run, see configuration_key.
+
+        """
+        return configuration_key(w2, **run_options)
+
+    def get(self, key):
+        """
+        Returns the trajectories and integration statistics of a key, or
+        None if it is not cached. Trajectories are read-only.
+
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.stats["hits"] += 1
+            return self._memory[key]
+        file_name = self._file(key)
+        if file_name is not None and os.path.exists(file_name):
+            try:
+                with np.load(file_name) as data:
+                    result = (data["trajectories"],
+                              json.loads(str(data["stats"])))
+                # the access time of the LRU order
+                os.utime(file_name)
+            except (OSError, ValueError, KeyError):
+                # removed by another process, or partially written
+                result = None
+            if result is not None:
+                self.stats["disk_hits"] += 1
+                self._remember(key, *result)
+                return self._memory[key]
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key, trajectories, stats):
+        """
+        Stores the trajectories and integration statistics of a key.
+
+        """
+        self._remember(key, np.array(trajectories), dict(stats))
+        if self.path is None:
+            return
+        # written aside then renamed, so that readers never see partial files
+        fd, tmp_name = tempfile.mkstemp(suffix=".tmp", dir=self.path)
+        with os.fdopen(fd, "wb") as fnpz:
+            np.savez(fnpz, trajectories=trajectories,
+                     stats=np.array(json.dumps(stats)))
+        os.replace(tmp_name, self._file(key))
+        self._evict()
+
+    def clear(self):
+        """
+        Removes all results, in memory and on disk.
+
+        """
+        self._memory.clear()
+        if self.path is not None:
+            for entry in os.scandir(self.path):
+                if entry.name.endswith(".npz"):
+                    os.remove(entry.path)
+
+    def disk_usage(self):
+        """
+        Returns the size of the results on disk [bytes].
+
+        """
+        if self.path is None:
+            return 0
+        return sum(entry.stat().st_size for entry in os.scandir(self.path)
+                   if entry.name.endswith(".npz"))
+
+    def _file(self, key):
+        if self.path is None:
+            return None
+        return os.path.join(self.path, f"{key}.npz")
+
+    def _remember(self, key, trajectories, stats):
+        trajectories.flags.writeable = False
+        self._memory[key] = (trajectories, stats)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".npz"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, file_name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(file_name)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.stats["evictions"] += 1
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Command-line interface of pyworld2.
+
+Examples
+--------
+Runs the scenarios of the book World Dynamics on all cores, and saves their
+trajectories, summary metrics and figures in ./results:
+
+    pyworld2 run examples/manifest.json -o results --plot
+
+Serves simulations over HTTP/JSON on localhost, see pyworld2.service:
+
+    pyworld2 serve --port 8642
+
+Runs the shards of a sweep in a shared directory, see pyworld2.sweep:
+
+    pyworld2 sweep worker /shared/sweep
+
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .world2 import VARIABLE_NAMES, World2
+
+PLOT_NAMES = ["P", "POLR", "CI", "QL", "NR"]
+PLOT_LIMS = [[0, 8e9], [0, 40], [0, 20e9], [0, 2], [0, 1000e9]]
+
+
+def find_scenarios(source):
+    """
+    Lists the scenarios of a directory or of a manifest.
+
+    Parameters
+    ----------
+    source : str
+        directory of "functions_switch_<name>.json" files, each possibly
+        paired with a "functions_table_<name>.json" file. Or a json manifest:
+        a list of configurations (see World2.from_configuration), each with a
+        "name" and optionally a "title" and "ylims" for its figure. Paths to
+        json files are relative to the manifest.
+
+    Returns
+    -------
+    list
+        configurations of the scenarios, with absolute paths.
+
+    """
+    if os.path.isdir(source):
+        scenarios = []
+        pattern = os.path.join(source, "functions_switch_*.json")
+        for switch_file in sorted(glob.glob(pattern)):
+            name = re.match(r"functions_switch_(.*)\.json",
+                            os.path.basename(switch_file)).group(1)
+            scenario = {"name": name, "switch_functions": switch_file}
+            table_file = os.path.join(source, f"functions_table_{name}.json")
+            if os.path.exists(table_file):
+                scenario["table_functions"] = table_file
+            scenarios.append(scenario)
+        return scenarios
+
+    with open(source) as fjson:
+        scenarios = json.load(fjson)
+    base_dir = os.path.dirname(os.path.abspath(source))
+    for scenario in scenarios:
+        for key in ["table_functions", "switch_functions"]:
+            if isinstance(scenario.get(key), str):
+                scenario[key] = os.path.join(base_dir, scenario[key])
+    return scenarios
+
+
+def run_scenario(scenario, output_dir, plot=False, backend="python"):
+    """
+    Runs one scenario, and saves its trajectories in "<name>.npz" and its
+    figure in "<name>.png".
+
+    Returns
+    -------
+    dict
+        name of the scenario, wall times [s] and final, minimum and maximum
+        values of the plotted variables.
+
+    """
+    t_start = time.perf_counter()
+    w2 = World2.from_configuration(scenario)
+    w2.run(backend=backend)
+    t_run = time.perf_counter() - t_start
+
+    name = scenario["name"]
+    vectors = {var_name: getattr(w2, var_name) for var_name in VARIABLE_NAMES}
+    np.savez(os.path.join(output_dir, f"{name}.npz"), time=w2.time, **vectors)
+    if plot:
+        render_scenario(w2, os.path.join(output_dir, f"{name}.png"),
+                        scenario.get("title", name),
+                        scenario.get("ylims", PLOT_LIMS))
+
+    summary = {"name": name}
+    for metric, func in [("final", lambda x: x[-1]), ("min", np.nanmin),
+                         ("max", np.nanmax)]:
+        summary[metric] = {var_name: float(func(getattr(w2, var_name.lower())))
+                           for var_name in PLOT_NAMES}
+    summary["wall_time"] = {"run": t_run,
+                            "total": time.perf_counter() - t_start}
+    return summary
+
+
+def render_scenario(w2, fig_file, title, ylims):
+    """
+    Saves the figure of a World2 run, with a non-interactive backend.
+
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    from .plotting import plot_world_variables
+
+    axs = plot_world_variables(w2.time,
+                               [getattr(w2, var_name.lower())
+                                for var_name in PLOT_NAMES],
+                               PLOT_NAMES, ylims, figsize=(7, 4), grid=True,
+                               title=title)
+    axs[0].figure.savefig(fig_file)
+    plt.close(axs[0].figure)
+
+
+def run_scenarios(scenarios, output_dir, jobs=None, plot=False,
+                  backend="python"):
+    """
+    Runs scenarios over a pool of processes, prints the wall time of each,
+    and writes their summaries in "summary.json".
+
+    Returns
+    -------
+    list
+        summaries of the scenarios, see run_scenario.
+
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    t_start = time.perf_counter()
+    summaries = {}
+    if jobs == 1:
+        for scenario in scenarios:
+            summary = run_scenario(scenario, output_dir, plot, backend)
+            summaries[summary["name"]] = summary
+            _print_summary(summary)
+    else:
+        with ProcessPoolExecutor(jobs) as pool:
+            futures = [pool.submit(run_scenario, scenario, output_dir, plot,
+                                   backend) for scenario in scenarios]
+            for future in as_completed(futures):
+                summary = future.result()
+                summaries[summary["name"]] = summary
+                _print_summary(summary)
+    summaries = [summaries[scenario["name"]] for scenario in scenarios]
+    with open(os.path.join(output_dir, "summary.json"), "w") as fjson:
+        json.dump(summaries, fjson, indent=1)
+    print(f"{len(scenarios)} scenarios in "
+          f"{time.perf_counter() - t_start:.3f} s, results in {output_dir}")
+    return summaries
+
+
+def _print_summary(summary):
+    print(f"{summary['name']:<24} run {summary['wall_time']['run']:8.3f} s"
+          f"   total {summary['wall_time']['total']:8.3f} s")
+
+
+def _sweep(args):
+    from .sweep import Sweep
+
+    sweep = Sweep(args.path)
+    if args.action == "worker":
+        shards = sweep.run_worker()
+        print(f"{len(shards)} shards run")
+    elif args.action == "retry":
+        shards = sweep.retry(args.stale_after)
+        print(f"{len(shards)} shards pending again")
+    elif args.action == "merge":
+        store = sweep.merge(args.output)
+        print(f"{store.n_runs} runs merged in {args.output}")
+    status = sweep.status()
+    print("   ".join(f"{state} {status[state]}" for state in
+                     ["done", "running", "pending", "failed"]) +
+          f"   of {status['n_shards']} shards")
+    for i, shard in enumerate(status["shards"]):
+        if shard["state"] == "running" and "host" in shard:
+            print(f"shard {i:<6} on {shard['host']} (pid {shard['pid']}) "
+                  f"for {time.time() - shard['time']:.0f} s")
+
+
+def main(argv=None):
+    """
+    Entry point of the pyworld2 command.
+
+    """
+    parser = argparse.ArgumentParser(prog="pyworld2",
+                                     description="Simulations of the World2 "
+                                                 "model.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    parser_run = commands.add_parser("run", help="runs a catalog of "
+                                                 "scenarios in parallel")
+    parser_run.add_argument("source", help="directory of json configuration "
+                                           "files, or json manifest")
+    parser_run.add_argument("-o", "--output", default="pyworld2_results",
+                            help="output directory (default: "
+                                 "%(default)s)")
+    parser_run.add_argument("-j", "--jobs", type=int, default=None,
+                            help="number of processes (default: all cores)")
+    parser_run.add_argument("--plot", action="store_true",
+                            help="saves the figure of each scenario")
+    parser_run.add_argument("--backend", default="python",
+                            choices=["python", "numba"],
+                            help="backend of World2.run (default: "
+                                 "%(default)s)")
+    parser_serve = commands.add_parser("serve", help="serves simulations "
+                                                     "over HTTP/JSON")
+    parser_serve.add_argument("--host", default="127.0.0.1",
+                              help="address (default: %(default)s)")
+    parser_serve.add_argument("--port", type=int, default=8642,
+                              help="port (default: %(default)s)")
+    parser_serve.add_argument("-j", "--jobs", type=int, default=None,
+                              help="number of processes (default: all "
+                                   "cores)")
+    parser_sweep = commands.add_parser("sweep", help="works on a sweep in a "
+                                                     "shared directory")
+    parser_sweep.add_argument("action",
+                              choices=["worker", "status", "retry", "merge"],
+                              help="runs shards until none is left, prints "
+                                   "the progress, makes failed shards "
+                                   "pending, or merges all shards")
+    parser_sweep.add_argument("path", help="directory of the sweep")
+    parser_sweep.add_argument("-o", "--output", default="sweep_results",
+                              help="directory of the merged ResultStore "
+                                   "(default: %(default)s)")
+    parser_sweep.add_argument("--stale-after", type=float, default=None,
+                              help="with retry, also releases claims older "
+                                   "than this [s]")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        run_scenarios(find_scenarios(args.source), args.output,
+                      jobs=args.jobs, plot=args.plot, backend=args.backend)
+    elif args.command == "serve":
+        from .service import serve
+        print(f"serving on http://{args.host}:{args.port}")
+        serve(args.host, args.port, args.jobs)
+    elif args.command == "sweep":
+        _sweep(args)
+    return 0
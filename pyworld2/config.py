@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Loading of the json configuration files of table and switch functions.
+
+Each file is parsed and validated once per process: compiled functions are
+kept in a registry keyed by path and modification time, and shared by all
+World2 instances. Many scenarios can also be bundled into one json file.
+
+"""
+import glob
+import json
+import os
+
+from .utils import BatchTableFunction, Clipper, Schedule, TableFunction
+
+TABLE_NAMES = ["BRCM", "BRFM", "BRMM", "BRPM",
+               "DRCM", "DRFM", "DRMM", "DRPM",
+               "CFIFR", "CIM", "CIQR", "FCM", "FPCI", "FPM",
+               "NREM", "NRMM", "POLAT", "POLCM",
+               "QLC", "QLF", "QLM", "QLP"]
+SWITCH_NAMES = ["BRN", "DRN", "CIDN", "CIGN", "FC", "NRUN", "POLN"]
+
+DEFAULT_TABLE_FILE = os.path.join(os.path.dirname(__file__),
+                                  "functions_table_default.json")
+DEFAULT_SWITCH_FILE = os.path.join(os.path.dirname(__file__),
+                                   "functions_switch_default.json")
+
+_registry = {}
+
+
+def parse_table_functions(tables, partial=False):
+    """
+    Compiles table functions from the content of a json configuration file.
+
+    Parameters
+    ----------
+    tables : list
+        tables with "y.name", "x.values" and "y.values" keys, as in
+        "functions_table_default.json". Lists of y-vectors (and possibly of
+        x-vectors) define BatchTableFunction, for World2Ensemble.
+    partial : bool, optional
+        if True, only the given tables are compiled, e.g. to override some
+        tables of another file. The default is False, for all tables.
+
+    Returns
+    -------
+    dict
+        TableFunction by name of TABLE_NAMES.
+
+    """
+    tables = {table["y.name"]: table for table in tables}
+    missing = [name for name in TABLE_NAMES if name not in tables]
+    if missing and not partial:
+        raise ValueError(f"missing table functions {missing}")
+    unknown = [name for name in tables if name not in TABLE_NAMES]
+    if unknown:
+        raise ValueError(f"unknown table functions {unknown}")
+    functions = {}
+    for name in TABLE_NAMES:
+        if name in tables:
+            x, y = tables[name]["x.values"], tables[name]["y.values"]
+            # one y-vector per run of a World2Ensemble
+            batched = isinstance(y[0], list)
+            functions[name] = (BatchTableFunction if batched else
+                               TableFunction)(x, y)
+    return functions
+
+
+def parse_switch_functions(tables, partial=False):
+    """
+    Compiles switch functions from the content of a json configuration file.
+    A list of years in "trigger.value" defines a multi-stage Schedule.
+
+    Parameters
+    ----------
+    tables : list
+        switches with ``NAME``, ``NAME1``... and "trigger.value" keys, as in
+        "functions_switch_default.json".
+    partial : bool, optional
+        if True, only the given switches are compiled. The default is False,
+        for all switches.
+
+    Returns
+    -------
+    dict
+        Clipper or Schedule by name of SWITCH_NAMES.
+
+    """
+    functions = {}
+    for table in tables:
+        for name in SWITCH_NAMES:
+            if name not in table:
+                continue
+            if isinstance(table["trigger.value"], list):
+                values = [table[name]]
+                values += [table[f"{name}{i + 1}"]
+                           for i in range(len(table["trigger.value"]))]
+                functions[name] = Schedule(values, table["trigger.value"])
+            else:
+                functions[name] = Clipper(table[name], table[f"{name}1"],
+                                          table["trigger.value"])
+    missing = [name for name in SWITCH_NAMES if name not in functions]
+    if missing and not partial:
+        raise ValueError(f"missing switch functions {missing}")
+    return functions
+
+
+def _load(json_file, parse):
+    """
+    Loads and compiles a json file, or returns it from the registry if the
+    file did not change since.
+
+    """
+    path = os.path.abspath(json_file)
+    mtime = os.stat(path).st_mtime_ns
+    key = (parse.__name__, path)
+    if key not in _registry or _registry[key][0] != mtime:
+        with open(path) as fjson:
+            _registry[key] = (mtime, parse(json.load(fjson)))
+    return _registry[key][1]
+
+
+def load_table_functions(json_file=None):
+    """
+    Returns the table functions of a json configuration file, compiled once
+    per process. If json_file is None, the default file is loaded.
+
+    """
+    return _load(DEFAULT_TABLE_FILE if json_file is None else json_file,
+                 parse_table_functions)
+
+
+def load_switch_functions(json_file=None):
+    """
+    Returns the switch functions of a json configuration file, compiled once
+    per process. If json_file is None, the default file is loaded.
+
+    """
+    return _load(DEFAULT_SWITCH_FILE if json_file is None else json_file,
+                 parse_switch_functions)
+
+
+def clear_registry():
+    """
+    Forgets all compiled configuration files.
+
+    """
+    _registry.clear()
+
+
+def bundle_scenarios(directory, bundle_file):
+    """
+    Bundles all json configuration files of a directory into one json file,
+    validated on the way.
+
+    Parameters
+    ----------
+    directory : str
+        directory of "functions_table_*.json" and "functions_switch_*.json"
+        files.
+    bundle_file : str
+        path of the bundle to write.
+
+    """
+    bundle = {}
+    for json_file in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(json_file) as fjson:
+            tables = json.load(fjson)
+        _parse_any(tables)
+        bundle[os.path.basename(json_file)] = tables
+    with open(bundle_file, "w") as fjson:
+        json.dump(bundle, fjson, separators=(",", ":"))
+
+
+def load_bundle(bundle_file):
+    """
+    Returns the compiled functions of all configuration files of a bundle,
+    compiled once per process.
+
+    Returns
+    -------
+    dict
+        by name of bundled file, its table or switch functions by name. Each
+        can be passed to World2.set_table_functions or
+        World2.set_switch_functions.
+
+    """
+    return _load(bundle_file, _parse_bundle)
+
+
+def _parse_bundle(bundle):
+    return {name: _parse_any(tables) for name, tables in bundle.items()}
+
+
+def _parse_any(tables):
+    if all("y.name" in table for table in tables):
+        return parse_table_functions(tables)
+    return parse_switch_functions(tables)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from .config import TABLE_NAMES
+from .utils import BatchTableFunction, Clipper, Schedule, TableFunction
+from .world2 import World2
+
+
+class World2Ensemble(World2):
+    """
+    World2Ensemble runs n_runs simulations of World2 at once. Every constant of
+    the model, initial condition and switch function can be either shared by
+    all runs (scalar) or set per run (array of shape (n_runs,)). Table
+    functions can also be set per run, as BatchTableFunction (see
+    pyworld2.uncertainty).
+
+    The time loop is the one of World2: all runs are advanced together with
+    NumPy operations. Model vectors are stored time-major, with shape
+    (n, n_runs): row k holds the values of all runs at time[k], and column i
+    is the trajectory of the i-th run.
+
+    Examples
+    --------
+    >>> w2 = World2Ensemble(3)
+    >>> w2.set_state_variables(pols=[3.6e9, 4e9, 5e9])
+    >>> w2.set_initial_state()
+    >>> w2.set_table_functions()
+    >>> w2.set_switch_functions()
+    >>> w2.set_switch_function("NRUN", value_after_switch=[1, 0.5, 0.25])
+    >>> w2.run()
+    >>> w2.ql[-1]                  # final quality of life of the 3 runs
+
+    Attributes
+    ----------
+    n_runs : int
+        number of simulations run together.
+
+    """
+
+    def __init__(self, n_runs, year_min=1900, year_max=2100, dt=0.2,
+                 dtype=np.float64, stride=1):
+        """
+        __init__ of class World2Ensemble.
+
+        Parameters
+        ----------
+        n_runs : int
+            number of simulations run together.
+        year_min : int, optional
+            starting year of the simulation. The default is 1900.
+        year_max : int, optional
+            end year of the simulation. The default is 2100.
+        dt : float, optional
+            time step of the numerical integration [year]. The default is 0.2.
+        dtype : numpy.dtype, optional
+            floating-point type of the model vectors. The default is
+            numpy.float64.
+        stride : int, optional
+            number of integration steps per stored point of time. The default
+            is 1.
+
+        """
+        super().__init__(year_min=year_min, year_max=year_max, dt=dt,
+                         dtype=dtype, stride=stride)
+        self.n_runs = n_runs
+
+    def set_state_variables(self, la=135e6, pdn=26.5, ciafn=0.3, ecirn=1,
+                            ciaft=15, pols=3.6e9, fn=1, qls=1):
+        """
+        Sets constant variables. Each constant is either a float or an array
+        of shape (n_runs,). See World2.set_state_variables for the definition
+        of the constants.
+
+        """
+        super().set_state_variables(la=self._per_run(la, "la"),
+                                    pdn=self._per_run(pdn, "pdn"),
+                                    ciafn=self._per_run(ciafn, "ciafn"),
+                                    ecirn=self._per_run(ecirn, "ecirn"),
+                                    ciaft=self._per_run(ciaft, "ciaft"),
+                                    pols=self._per_run(pols, "pols"),
+                                    fn=self._per_run(fn, "fn"),
+                                    qls=self._per_run(qls, "qls"))
+
+    def set_initial_state(self, pi=1.65e9, nri=900e9,
+                          cii=0.4e9, poli=0.2e9, ciafi=0.2):
+        """
+        Sets initial conditions of the state variables. Each condition is
+        either a float or an array of shape (n_runs,). See
+        World2.set_initial_state for the definition of the conditions.
+
+        """
+        super().set_initial_state(pi=self._per_run(pi, "pi"),
+                                  nri=self._per_run(nri, "nri"),
+                                  cii=self._per_run(cii, "cii"),
+                                  poli=self._per_run(poli, "poli"),
+                                  ciafi=self._per_run(ciafi, "ciafi"))
+
+    def set_table_functions(self, json_file=None):
+        """
+        Sets all table functions, see World2.set_table_functions. Each is
+        either a TableFunction shared by all runs, or a BatchTableFunction of
+        n_runs tables.
+
+        """
+        super().set_table_functions(json_file)
+        for func_name in TABLE_NAMES:
+            self._check_table(func_name)
+
+    def set_table_function(self, func_name, y_values, x_values=None):
+        """
+        Overrides one table function, previously set by set_table_functions.
+
+        Parameters
+        ----------
+        func_name : str
+            name of the table function, as in the json configuration file
+            (e.g. "BRMM").
+        y_values : array_like
+            output values, of shape (m,) shared by all runs, or (n_runs, m).
+        x_values : array_like, optional
+            input values, of shape (m,) or (n_runs, m). The default is None,
+            to keep those of the current table function.
+
+        """
+        if x_values is None:
+            x_values = getattr(self, func_name.lower()).x
+        if np.ndim(y_values) == 1 and np.ndim(x_values) == 1:
+            func = TableFunction(x_values, y_values)
+        else:
+            func = BatchTableFunction(x_values, np.broadcast_to(
+                y_values, (self.n_runs, np.shape(x_values)[-1])))
+        setattr(self, func_name.lower(), func)
+        self._check_table(func_name)
+
+    def _check_table(self, func_name):
+        """
+        Checks that a table function is shared by all runs or set for each
+        run.
+
+        """
+        func = getattr(self, func_name.lower())
+        if isinstance(func, BatchTableFunction) and func.n != self.n_runs:
+            raise ValueError(f"{func_name} holds {func.n} tables, expected "
+                             f"{self.n_runs}")
+
+    def set_switch_function(self, func_name, value_before_switch=None,
+                            value_after_switch=None, trigger_value=None):
+        """
+        Overrides one switch function, previously set by set_switch_functions.
+        Each value is either a float or an array of shape (n_runs,). Values
+        left to None are kept from the current switch function, which must
+        be a Clipper.
+
+        Parameters
+        ----------
+        func_name : str
+            name of the switch function, as in the json configuration file
+            (e.g. "NRUN").
+        value_before_switch : float or array_like, optional
+            value until the threshold year.
+        value_after_switch : float or array_like, optional
+            value after the threshold year.
+        trigger_value : float or array_like, optional
+            threshold year.
+
+        """
+        func = getattr(self, func_name.lower())
+        if isinstance(func, Schedule):
+            raise ValueError(f"{func_name} is a multi-stage Schedule: set it "
+                             "with Schedule(values, trigger_values), whose "
+                             "entries can be arrays of shape (n_runs,)")
+        if value_before_switch is None:
+            value_before_switch = func.value_before_switch
+        if value_after_switch is None:
+            value_after_switch = func.value_after_switch
+        if trigger_value is None:
+            trigger_value = func.trigger_value
+        func = Clipper(self._per_run(value_before_switch, f"{func_name}"),
+                       self._per_run(value_after_switch, f"{func_name}1"),
+                       self._per_run(trigger_value, "trigger.value"))
+        setattr(self, func_name.lower(), func)
+
+    def _per_run(self, value, name):
+        """
+        Checks that a parameter is shared by all runs or set for each run.
+
+        """
+        value = np.asarray(value, dtype=float)
+        if value.ndim == 0:
+            return float(value)
+        if value.shape != (self.n_runs,):
+            raise ValueError(f"{name} must be a float or an array of shape "
+                             f"({self.n_runs},), got shape {value.shape}")
+        return value.astype(self.dtype, copy=False)
+
+    def _vector_shape(self, n):
+        """
+        Returns the shape of a model vector on n points of time, for every
+        run.
+
+        """
+        return (n, self.n_runs)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Equilibria of World2: fixed points of its state variables for given
+constants and tables, with switch functions at their values after all
+threshold years.
+
+Fixed points are searched by a root finder on the state scaled by the guess,
+with the exact Jacobian of the piecewise-linear model (see pyworld2.tangent).
+Their stability follows from the eigenvalues of the Jacobian. When the root
+finder fails, or finds a state out of the physical domain, the model is
+integrated over a long horizon instead: it then either settles, and the
+result is polished by the root finder, or it has no equilibrium (e.g. while
+natural resources deplete) and the state at the horizon is returned.
+
+Examples
+--------
+>>> w2 = World2()
+>>> w2.set_all_standard()
+>>> w2.set_switch_functions("functions_switch_scenario_2.json")
+>>> eq = find_equilibrium(w2)
+>>> eq.state, eq.stable, eq.method
+
+"""
+import copy
+
+import numpy as np
+from scipy.optimize import root
+
+from .config import SWITCH_NAMES, TABLE_NAMES
+from .integrators import rk45
+from .tangent import Dual, TangentTable
+from .world2 import INITIAL_STATE_NAMES, STATE_NAMES
+
+
+class Equilibrium:
+    """
+    Result of find_equilibrium.
+
+    Attributes
+    ----------
+    state : dict
+        values of the state variables, by name of STATE_NAMES.
+    variables : dict
+        values of all model variables at the state, see World2.auxiliaries.
+    converged : bool
+        True if the state is an equilibrium, False if it is the state at the
+        horizon of a simulation that did not settle.
+    method : str
+        "root" if found by the root finder from the guess, "time-stepping"
+        if found after integrating the model.
+    residual : float
+        largest relative rate of change of the free state variables at the
+        state [1/year].
+    jacobian : numpy.ndarray
+        Jacobian of the derivatives of the free state variables [1/year].
+    eigenvalues : numpy.ndarray
+        eigenvalues of the Jacobian [1/year].
+    stable : bool
+        True if all nonzero eigenvalues have negative real parts. Zero
+        eigenvalues, e.g. of natural resources that are not used any more,
+        are neutral.
+
+    """
+
+    def __init__(self, state, variables, converged, method, residual,
+                 jacobian):
+        self.state = state
+        self.variables = variables
+        self.converged = converged
+        self.method = method
+        self.residual = residual
+        self.jacobian = jacobian
+        self.eigenvalues = np.linalg.eigvals(jacobian)
+        nonzero = np.abs(self.eigenvalues) > 1e-12
+        self.stable = bool(np.all(self.eigenvalues[nonzero].real < 0))
+
+
+def switch_values(w2):
+    """
+    Returns the values of all switch functions after their threshold years,
+    by lowercase name.
+
+    """
+    return {func_name.lower(): getattr(w2, func_name.lower())(np.inf)
+            for func_name in SWITCH_NAMES}
+
+
+def state_jacobian(w2, state, switches):
+    """
+    Computes the derivatives of the state variables and their exact
+    Jacobian, with dual numbers.
+
+    Parameters
+    ----------
+    w2 : World2
+        simulation with constants and functions set.
+    state : numpy.ndarray
+        values of the state variables, in the order of STATE_NAMES.
+    switches : dict
+        values of the switch functions, by lowercase name.
+
+    Returns
+    -------
+    derivatives : numpy.ndarray
+        time derivatives of the state variables, of shape (5,).
+    jacobian : numpy.ndarray
+        their derivatives with respect to the state, of shape (5, 5).
+
+    """
+    dual = copy.copy(w2)
+    for func_name in TABLE_NAMES:
+        setattr(dual, func_name.lower(),
+                TangentTable(getattr(w2, func_name.lower())))
+    identity = np.eye(len(STATE_NAMES))
+    var = dual.auxiliaries([Dual(float(x), grad)
+                            for x, grad in zip(state, identity)], switches)
+    derivatives = [var["br"] - var["dr"], -var["nrur"],
+                   var["cig"] - var["cid"], var["polg"] - var["pola"],
+                   var["dciaf"]]
+    return (np.array([x.value for x in derivatives]),
+            np.array([x.grad for x in derivatives]))
+
+
+def find_equilibrium(w2, x0=None, frozen=(), tol=1e-10, horizon=2000.,
+                     steady_tol=1e-6):
+    """
+    Finds an equilibrium of World2 for its constants, tables and switch
+    values after all threshold years.
+
+    Parameters
+    ----------
+    w2 : World2
+        single simulation with constants, initial state, table and switch
+        functions set.
+    x0 : array_like, optional
+        guess of the state, in the order of STATE_NAMES. The default is None,
+        for the initial state of w2.
+    frozen : sequence, optional
+        names of state variables held at their value of x0, e.g. ["nr"] for
+        the quasi-equilibrium of the other variables while resources deplete
+        slowly. The default is ().
+    tol : float, optional
+        tolerance of the root finder, on the scaled state. The default is
+        1e-10.
+    horizon : float, optional
+        time span of the fallback simulation [years]. The default is 2000.
+    steady_tol : float, optional
+        largest relative rate of change of a settled state [1/year]. The
+        default is 1e-6.
+
+    Returns
+    -------
+    Equilibrium
+
+    """
+    if x0 is None:
+        x0 = [getattr(w2, name) for name in INITIAL_STATE_NAMES]
+    x0 = np.array(x0, dtype=float)
+    if x0.shape != (len(STATE_NAMES),):
+        raise ValueError("equilibria are found for single simulations only")
+    free = np.array([name not in frozen for name in STATE_NAMES])
+    switches = switch_values(w2)
+    scale = np.where(x0 != 0, np.abs(x0), 1.)
+
+    def solve(guess):
+        def residual(z):
+            state = x0.copy()
+            state[free] = z * scale[free]
+            derivatives, jacobian = state_jacobian(w2, state, switches)
+            jacobian = jacobian[np.ix_(free, free)] * scale[free]
+            return (derivatives[free] / scale[free],
+                    jacobian / scale[free][:, None])
+        sol = root(residual, guess[free] / scale[free], jac=True,
+                   method="hybr", tol=tol)
+        state = x0.copy()
+        state[free] = sol.x * scale[free]
+        return sol.success, state
+
+    def describe(state, converged, method):
+        derivatives, jacobian = state_jacobian(w2, state, switches)
+        residual = float(np.max(np.abs(derivatives[free]) /
+                                np.maximum(np.abs(state[free]), 1e-300)))
+        var = w2.auxiliaries(state.tolist(), switches)
+        return Equilibrium(dict(zip(STATE_NAMES, state.tolist())),
+                           {name: float(value) for name, value in var.items()},
+                           converged, method, residual,
+                           jacobian[np.ix_(free, free)])
+
+    success, state = solve(x0)
+    if success and _is_physical(state, w2):
+        return describe(state, True, "root")
+
+    # fallback: long simulation from the guess, with constant switches
+    def f(t, y):
+        return np.where(free, w2.derivatives(np.inf, y), 0.)
+
+    with np.errstate(all="ignore"):
+        trajectory, _ = rk45(f, np.array([0., horizon]), x0, rtol=1e-6)
+    state = trajectory[-1]
+    eq = describe(state, False, "time-stepping")
+    if np.all(np.isfinite(state)):
+        # polishes a settled state, or finds the unstable equilibrium around
+        # which the simulation oscillates
+        success, polished = solve(state)
+        if success and _is_physical(polished, w2):
+            return describe(polished, True, "time-stepping")
+    if np.isfinite(eq.residual) and eq.residual < steady_tol:
+        eq.converged = True
+    return eq
+
+
+def _is_physical(state, w2):
+    """
+    Checks that a state is in the physical domain of the model: positive
+    population and capital, non-negative resources (up to round-off) and
+    pollution, and a fraction of capital in agriculture within [0, 1].
+
+    """
+    p, nr, ci, pol, ciaf = state
+    return bool(np.all(np.isfinite(state)) and p > 0 and ci > 0 and
+                nr >= -1e-6 * w2.nri and pol >= 0 and 0 <= ciaf <= 1)
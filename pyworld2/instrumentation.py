@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in instrumentation of the simulation loop of World2: timing of each group
+of equations, call counts of table and switch functions, per-step callbacks
+and detection of the first NaN.
+
+Instrumentation patches one instance while it is attached, and restores it
+when detached: uninstrumented runs are left unchanged, without any overhead.
+It applies to the "python" backend, the "numba" backend runs without step.
+
+Examples
+--------
+>>> w2 = World2()
+>>> w2.set_all_standard()
+>>> with Instrumentation(w2) as instrumentation:
+...     w2.run()
+>>> instrumentation.report()["groups"]
+>>> instrumentation.to_json("report.json")
+
+"""
+import json
+import time
+
+import numpy as np
+
+from .config import SWITCH_NAMES, TABLE_NAMES
+from .world2 import STEP_GROUPS, VARIABLE_NAMES
+
+
+class CountingTable:
+    """
+    Class helper. Wraps a table function to count its calls.
+
+    """
+
+    def __init__(self, func, counts, name):
+        self.func = func
+        self.counts = counts
+        self.name = name
+
+    def __call__(self, x):
+        self.counts[self.name] += 1
+        return self.func(x)
+
+    def __getattr__(self, attr):
+        return getattr(self.func, attr)
+
+
+class CountingArray:
+    """
+    Class helper. Wraps the sampled values of a switch function to count
+    their reads.
+
+    """
+
+    def __init__(self, values, counts, name):
+        self.values = values
+        self.counts = counts
+        self.name = name
+
+    def __getitem__(self, k):
+        self.counts[self.name] += 1
+        return self.values[k]
+
+    def __getattr__(self, attr):
+        return getattr(self.values, attr)
+
+
+class Instrumentation:
+    """
+    Instruments the runs of a World2 (or World2Ensemble) while attached, as a
+    context manager or with attach and detach. Counters add up over all runs
+    until reset.
+
+    Attributes
+    ----------
+    w2 : World2
+        instrumented simulation.
+    callbacks : list
+        functions called as callback(w2, k) after step_init (k = 0) and after
+        each integration step k.
+    n_steps : int
+        number of steps run.
+    group_times : dict
+        time spent in each group of equations of STEP_GROUPS, and in "init"
+        for step_init [s].
+    table_calls : dict
+        number of calls of each table function, by name of TABLE_NAMES.
+    switch_reads : dict
+        number of reads of each switch function, by name of SWITCH_NAMES.
+    first_nan : dict
+        "k", "time" and "variables" of the first integration step that
+        produced a NaN, or None.
+
+    """
+
+    def __init__(self, w2, callbacks=None):
+        """
+        __init__ of class Instrumentation.
+
+        Parameters
+        ----------
+        w2 : World2
+            simulation to instrument, with table and switch functions set.
+        callbacks : list, optional
+            functions called as callback(w2, k) after each step. The default
+            is None.
+
+        """
+        self.w2 = w2
+        self.callbacks = [] if callbacks is None else list(callbacks)
+        self.attached = False
+        self.reset()
+
+    def reset(self):
+        """
+        Sets all counters to zero.
+
+        """
+        self.n_steps = 0
+        self.wall_time = 0.
+        self.group_times = dict.fromkeys(["init"] + STEP_GROUPS, 0.)
+        self.table_calls = dict.fromkeys(TABLE_NAMES, 0)
+        self.switch_reads = dict.fromkeys(SWITCH_NAMES, 0)
+        self.first_nan = None
+
+    def attach(self):
+        """
+        Patches the simulation with instrumented methods and functions. The
+        methods are those of a subclass of its class, so that copies made
+        during the run, e.g. the moving window of iter_run, are instrumented
+        as well.
+
+        """
+        if self.attached:
+            return
+        w2 = self.w2
+        self._class = type(w2)
+        for func_name in TABLE_NAMES:
+            setattr(w2, func_name.lower(),
+                    CountingTable(getattr(w2, func_name.lower()),
+                                  self.table_calls, func_name))
+        w2.__class__ = type(self._class.__name__, (self._class,), {
+            "step_init": lambda world: self._instrumented_step_init(world),
+            "step": lambda world, k: self._instrumented_step(world, k),
+            "sample_switch_functions":
+                lambda world: self._instrumented_sample(world)})
+        if hasattr(w2, f"{SWITCH_NAMES[0].lower()}_values"):
+            self._wrap_switch_values(w2)
+        self.attached = True
+
+    def detach(self):
+        """
+        Restores the simulation as it was before attach.
+
+        """
+        if not self.attached:
+            return
+        w2 = self.w2
+        for func_name in TABLE_NAMES:
+            setattr(w2, func_name.lower(), getattr(w2, func_name.lower()).func)
+        for func_name in SWITCH_NAMES:
+            values = getattr(w2, f"{func_name.lower()}_values", None)
+            if isinstance(values, CountingArray):
+                setattr(w2, f"{func_name.lower()}_values", values.values)
+        w2.__class__ = self._class
+        self.attached = False
+
+    def __enter__(self):
+        self.attach()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.detach()
+
+    def _wrap_switch_values(self, world):
+        for func_name in SWITCH_NAMES:
+            values = getattr(world, f"{func_name.lower()}_values")
+            setattr(world, f"{func_name.lower()}_values",
+                    CountingArray(values, self.switch_reads, func_name))
+
+    def _instrumented_sample(self, world):
+        self._class.sample_switch_functions(world)
+        self._wrap_switch_values(world)
+
+    def _instrumented_step_init(self, world):
+        t_start = time.perf_counter()
+        self._class.step_init(world)
+        elapsed = time.perf_counter() - t_start
+        self.group_times["init"] += elapsed
+        self.wall_time += elapsed
+        for callback in self.callbacks:
+            callback(self.w2, 0)
+
+    def _instrumented_step(self, world, k):
+        t_step = time.perf_counter()
+        for group in STEP_GROUPS:
+            t_start = time.perf_counter()
+            getattr(self._class, f"step_{group}")(world, k)
+            self.group_times[group] += time.perf_counter() - t_start
+        self.wall_time += time.perf_counter() - t_step
+        self.n_steps += 1
+        # k indexes the vectors of world, a moving window of the run under
+        # stride > 1 or iter_run: the integration step is read from its time
+        k_run = round((world.time[k] - world.year_min) / world.dt)
+        if self.first_nan is None:
+            is_nan = np.isnan(world.trajectories[:, k])
+            if is_nan.any():
+                is_nan = is_nan.reshape(len(VARIABLE_NAMES), -1).any(axis=1)
+                self.first_nan = {"k": k_run, "time": float(world.time[k]),
+                                  "variables": [var_name for var_name, nan
+                                                in zip(VARIABLE_NAMES, is_nan)
+                                                if nan]}
+        for callback in self.callbacks:
+            callback(self.w2, k_run)
+
+    def report(self):
+        """
+        Summarizes the counters.
+
+        Returns
+        -------
+        dict
+            "n_steps", "wall_time" [s], "groups" (time [s] and fraction of
+            the wall time of each group of equations), "table_calls",
+            "switch_reads" and "first_nan".
+
+        """
+        wall_time = self.wall_time if self.wall_time > 0 else 1.
+        groups = {group: {"time": elapsed, "fraction": elapsed / wall_time}
+                  for group, elapsed in self.group_times.items()}
+        return {"n_steps": self.n_steps, "wall_time": self.wall_time,
+                "groups": groups, "table_calls": dict(self.table_calls),
+                "switch_reads": dict(self.switch_reads),
+                "first_nan": self.first_nan}
+
+    def to_json(self, json_file):
+        """
+        Writes the report in a json file.
+
+        """
+        with open(json_file, "w") as fjson:
+            json.dump(self.report(), fjson, indent=1)
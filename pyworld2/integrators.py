@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+Numerical integrators of the state variables of World2, as alternatives to
+the explicit Euler scheme of World2.step. They solve dy/dt = f(t, y) over a
+time grid, with internal steps independent of the grid: the output on the
+grid is interpolated by cubic Hermite polynomials.
+
+    - "rk4": classical Runge-Kutta of order 4 with a fixed step,
+
+    - "rk45": adaptive Dormand-Prince pair of orders 5 and 4, with error
+      control. Steps end on the breakpoints of the right-hand side (switch
+      times), where it is discontinuous.
+
+Examples
+--------
+>>> w2 = World2()
+>>> w2.set_all_standard()
+>>> w2.run(method="rk45", rtol=1e-6)
+>>> w2.integration_stats
+>>> error_report(w2)
+
+"""
+import copy
+
+import numpy as np
+
+from .world2 import STATE_NAMES
+
+# Dormand-Prince 5(4) tableau
+DP_C = [0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1, 1]
+DP_A = [[],
+        [1 / 5],
+        [3 / 40, 9 / 40],
+        [44 / 45, -56 / 15, 32 / 9],
+        [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+        [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+        [35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84]]
+# difference between the 5th and 4th order weights
+DP_E = [71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525,
+        -1 / 40]
+
+
+def hermite(t, t0, t1, y0, y1, f0, f1):
+    """
+    Evaluates the cubic Hermite interpolant of y between t0 and t1, from the
+    values y0, y1 and derivatives f0, f1 at both ends.
+
+    """
+    h = t1 - t0
+    s = (t - t0) / h
+    h00 = (1 + 2 * s) * (1 - s) ** 2
+    h10 = s * (1 - s) ** 2
+    h01 = s ** 2 * (3 - 2 * s)
+    h11 = s ** 2 * (s - 1)
+    return h00 * y0 + h10 * h * f0 + h01 * y1 + h11 * h * f1
+
+
+def _dense_output(out, time, i, t0, t1, y0, y1, f0, f1):
+    """
+    Writes the interpolated solution at the points of time in ]t0, t1] from
+    index i, and returns the index of the next point to write.
+
+    """
+    tol = 1e-9 * (t1 - t0)
+    while i < time.size and time[i] <= t1 + tol:
+        if abs(time[i] - t1) <= tol:
+            out[i] = y1
+        else:
+            out[i] = hermite(time[i], t0, t1, y0, y1, f0, f1)
+        i += 1
+    return i
+
+
+def rk4(f, time, y0, h=None):
+    """
+    Integrates dy/dt = f(t, y) with the classical Runge-Kutta scheme, with a
+    fixed step.
+
+    Parameters
+    ----------
+    f : callable
+        right-hand side f(t, y), returning an array of the shape of y.
+    time : numpy.ndarray
+        increasing points of time of the output, from the initial time.
+    y0 : numpy.ndarray
+        initial state.
+    h : float, optional
+        step, shortened to fit the time span in a whole number of steps. The
+        default is None, for the step of the time grid.
+
+    Returns
+    -------
+    y : numpy.ndarray
+        state at each point of time, of shape (time.size,) + y0.shape.
+    stats : dict
+        "n_steps", "n_rejected" and "n_evaluations" of f.
+
+    """
+    if h is None:
+        h = time[1] - time[0]
+    span = time[-1] - time[0]
+    n_steps = max(int(np.ceil(span / h - 1e-9)), 1)
+    h = span / n_steps
+    out = np.empty((time.size,) + np.shape(y0))
+    out[0] = y0
+    y, fy = np.asarray(y0, dtype=float), f(time[0], y0)
+    i = 1
+    for step in range(n_steps):
+        t = time[0] + step * h
+        k2 = f(t + h / 2, y + h / 2 * fy)
+        k3 = f(t + h / 2, y + h / 2 * k2)
+        k4 = f(t + h, y + h * k3)
+        y_new = y + h / 6 * (fy + 2 * k2 + 2 * k3 + k4)
+        f_new = f(t + h, y_new)
+        i = _dense_output(out, time, i, t, t + h, y, y_new, fy, f_new)
+        y, fy = y_new, f_new
+    stats = {"n_steps": n_steps, "n_rejected": 0,
+             "n_evaluations": 1 + 4 * n_steps}
+    return out, stats
+
+
+def rk45(f, time, y0, rtol=1e-6, atol=None, h=None, max_step=np.inf,
+         breakpoints=()):
+    """
+    Integrates dy/dt = f(t, y) with the adaptive Dormand-Prince scheme. The
+    error of each step is kept under atol + rtol * abs(y), component-wise.
+
+    Parameters
+    ----------
+    f : callable
+        right-hand side f(t, y), returning an array of the shape of y.
+    time : numpy.ndarray
+        increasing points of time of the output, from the initial time.
+    y0 : numpy.ndarray
+        initial state.
+    rtol : float, optional
+        relative tolerance. The default is 1e-6.
+    atol : float or numpy.ndarray, optional
+        absolute tolerance. The default is None, for rtol * abs(y0).
+    h : float, optional
+        first step. The default is None, for the step of the time grid.
+    max_step : float, optional
+        maximum step. The default is numpy.inf.
+    breakpoints : sequence, optional
+        times where f is discontinuous. Steps end on them, and f is evaluated
+        again just after them. The default is ().
+
+    Returns
+    -------
+    y : numpy.ndarray
+        state at each point of time, of shape (time.size,) + y0.shape.
+    stats : dict
+        "n_steps", "n_rejected" and "n_evaluations" of f.
+
+    """
+    y = np.asarray(y0, dtype=float)
+    if atol is None:
+        atol = rtol * np.abs(y)
+    if h is None:
+        h = time[1] - time[0]
+    t_end = time[-1]
+    breaks = sorted(float(t) for t in np.unique(np.ravel(breakpoints))
+                    if time[0] < t < t_end)
+    out = np.empty((time.size,) + y.shape)
+    out[0] = y
+    t, fy = float(time[0]), f(time[0], y)
+    stats = {"n_steps": 0, "n_rejected": 0, "n_evaluations": 1}
+    i = 1
+    while t < t_end:
+        t_stop = breaks[0] if breaks else t_end
+        h = min(h, max_step)
+        at_stop = t + h >= t_stop - 1e-12 * abs(t_stop)
+        if at_stop:
+            h = t_stop - t
+        k = [fy]
+        for c, a in zip(DP_C[1:], DP_A[1:]):
+            y_stage = y + h * sum(a_j * k_j for a_j, k_j in zip(a, k) if a_j)
+            k.append(f(t + c * h, y_stage))
+        stats["n_evaluations"] += 6
+        y_new = y_stage
+        error = h * sum(e * k_j for e, k_j in zip(DP_E, k) if e)
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+        err = np.sqrt(np.mean((error / scale) ** 2))
+        if err <= 1:
+            t_new = t_stop if at_stop else t + h
+            i = _dense_output(out, time, i, t, t_new, y, y_new, fy, k[6])
+            t, y, fy = t_new, y_new, k[6]
+            stats["n_steps"] += 1
+            if at_stop and breaks:
+                breaks.pop(0)
+                fy = f(np.nextafter(t, np.inf), y)
+                stats["n_evaluations"] += 1
+        else:
+            stats["n_rejected"] += 1
+        factor = 5. if err == 0 else 0.9 * err ** -0.2
+        h *= min(5., max(0.2, factor))
+    return out, stats
+
+
+INTEGRATORS = {"rk4": rk4, "rk45": rk45}
+
+
+def error_report(w2, reference_dt=0.01):
+    """
+    Compares the state variables of a run with a reference run of the same
+    configuration, integrated by the Euler scheme with a fine step.
+
+    Parameters
+    ----------
+    w2 : World2
+        simulation after its run.
+    reference_dt : float, optional
+        step of the reference run [year]. The default is 0.01.
+
+    Returns
+    -------
+    dict
+        "method" and "n_evaluations" of both runs, and "max_relative_error"
+        of each state variable: maximum absolute error over time divided by
+        the maximum absolute value of the reference.
+
+    """
+    reference = copy.copy(w2)
+    reference.set_time_grid(w2.year_min, w2.year_max, reference_dt)
+    reference.run()
+
+    values = reference.interpolate(w2.time, STATE_NAMES)
+    errors = {}
+    for var_name in STATE_NAMES:
+        errors[var_name] = float(np.max(np.abs(getattr(w2, var_name) -
+                                               values[var_name])) /
+                                 np.max(np.abs(values[var_name])))
+    return {"method": w2.integration_stats["method"],
+            "n_evaluations": w2.integration_stats["n_evaluations"],
+            "reference_method": "euler", "reference_dt": reference_dt,
+            "reference_evaluations":
+                reference.integration_stats["n_evaluations"],
+            "max_relative_error": errors}
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled backend of World2.run: step_init and step fused in one loop over
+plain arrays, compiled with numba if it is installed.
+
+Buffers are packed by World2._run_kernel, in the order of the lists of names
+defined in pyworld2.world2.
+
+"""
+from math import nan
+
+from .world2 import (CONSTANT_NAMES, INITIAL_STATE_NAMES, SWITCH_NAMES,
+                     TABLE_NAMES, VARIABLE_NAMES)
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# rows of the buffers, compile-time constants for numba
+(P, BR, DR, CR, NR, NRUR, NRFR, CI, CIR, CIG, CID, CIRA, MSL, ECIR,
+ CIAF, FR, POL, POLR, POLG, POLA, QL) = [VARIABLE_NAMES.index(name) for name
+                                         in ["p", "br", "dr", "cr", "nr",
+                                             "nrur", "nrfr", "ci", "cir",
+                                             "cig", "cid", "cira", "msl",
+                                             "ecir", "ciaf", "fr", "pol",
+                                             "polr", "polg", "pola", "ql"]]
+(LA, PDN, CIAFN, ECIRN, CIAFT, POLS, FN, QLS,
+ PI, NRI, CII, POLI, CIAFI) = [(CONSTANT_NAMES + INITIAL_STATE_NAMES).index(
+     name) for name in ["la", "pdn", "ciafn", "ecirn", "ciaft", "pols", "fn",
+                        "qls", "pi", "nri", "cii", "poli", "ciafi"]]
+(BRCM, BRFM, BRMM, BRPM, DRCM, DRFM, DRMM, DRPM, CFIFR, CIM, CIQR, FCM,
+ FPCI, FPM, NREM, NRMM, POLAT, POLCM, QLC, QLF, QLM,
+ QLP) = [TABLE_NAMES.index(name) for name in
+         ["BRCM", "BRFM", "BRMM", "BRPM", "DRCM", "DRFM", "DRMM", "DRPM",
+          "CFIFR", "CIM", "CIQR", "FCM", "FPCI", "FPM", "NREM", "NRMM",
+          "POLAT", "POLCM", "QLC", "QLF", "QLM", "QLP"]]
+BRN, DRN, CIDN, CIGN, FC, NRUN, POLN = [SWITCH_NAMES.index(name) for name in
+                                        ["BRN", "DRN", "CIDN", "CIGN", "FC",
+                                         "NRUN", "POLN"]]
+
+
+def interp(i, x, tables, sizes):
+    """
+    Evaluates the i-th table function at x, as TableFunction does.
+
+    """
+    size = sizes[i]
+    if x <= tables[0, i, 0]:
+        return tables[1, i, 0]
+    if x >= tables[0, i, size - 1]:
+        return tables[1, i, size - 1]
+    if x != x:
+        return x
+    s = 0
+    while tables[0, i, s + 1] <= x:
+        s += 1
+    return tables[1, i, s] + tables[2, i, s] * (x - tables[0, i, s])
+
+
+def run(out, dt, constants, tables, sizes, switches, k_start):
+    """
+    Runs the simulation, writing all model vectors in out.
+
+    Parameters
+    ----------
+    out : numpy.ndarray
+        model vectors, of shape (len(VARIABLE_NAMES), n).
+    dt : float
+        time step of the numerical integration [year].
+    constants : numpy.ndarray
+        values of CONSTANT_NAMES followed by INITIAL_STATE_NAMES.
+    tables : numpy.ndarray
+        x values, y values and slopes of the tables of TABLE_NAMES, of shape
+        (3, len(TABLE_NAMES), size of the largest table).
+    sizes : numpy.ndarray
+        number of points of each table.
+    switches : numpy.ndarray
+        switch functions of SWITCH_NAMES sampled over time, one per row.
+    k_start : int
+        time step to continue from. If 0, the initial state is computed.
+
+    """
+    n = out.shape[1]
+    tb, sz = tables, sizes
+    la, pdn = constants[LA], constants[PDN]
+    ciafn, ecirn, ciaft = constants[CIAFN], constants[ECIRN], constants[CIAFT]
+    pols, fn, qls = constants[POLS], constants[FN], constants[QLS]
+    pi, nri, cii = constants[PI], constants[NRI], constants[CII]
+    poli, ciafi = constants[POLI], constants[CIAFI]
+
+    if k_start == 0:
+        # step_init
+        out[P, 0] = pi
+        out[BR, 0] = out[DR, 0] = nan
+        out[NR, 0] = nri
+        out[NRFR, 0] = nri / nri
+        out[CI, 0] = cii
+        out[CR, 0] = pi / (la * pdn)
+        out[CIR, 0] = cii / pi
+        out[POL, 0] = poli
+        out[POLG, 0] = (pi * switches[POLN, 0] *
+                        interp(POLCM, out[CIR, 0], tb, sz))
+        out[POLR, 0] = poli / pols
+        out[POLA, 0] = poli / interp(POLAT, out[POLR, 0], tb, sz)
+        out[CIAF, 0] = ciafi
+        out[CID, 0] = out[CIG, 0] = nan
+        out[CIRA, 0] = out[CIR, 0] * ciafi / ciafn
+        out[FR, 0] = (interp(FPCI, out[CIRA, 0], tb, sz) *
+                      interp(FCM, out[CR, 0], tb, sz) *
+                      interp(FPM, out[POLR, 0], tb, sz) *
+                      switches[FC, 0]) / fn
+        out[ECIR, 0] = (out[CIR, 0] * (1 - out[CIAF, 0]) *
+                        interp(NREM, out[NRFR, 0], tb, sz)) / (1 - ciafn)
+        out[MSL, 0] = out[ECIR, 0] / ecirn
+        out[QL, 0] = nan
+
+    # step
+    for k in range(k_start + 1, n):
+        j = k - 1
+        p, msl, cr = out[P, j], out[MSL, j], out[CR, j]
+        fr, polr = out[FR, j], out[POLR, j]
+
+        out[BR, k] = (p * switches[BRN, j] *
+                      interp(BRMM, msl, tb, sz) * interp(BRCM, cr, tb, sz) *
+                      interp(BRFM, fr, tb, sz) * interp(BRPM, polr, tb, sz))
+        out[DR, k] = (p * switches[DRN, j] *
+                      interp(DRMM, msl, tb, sz) * interp(DRPM, polr, tb, sz) *
+                      interp(DRFM, fr, tb, sz) * interp(DRCM, cr, tb, sz))
+        out[P, k] = p + (out[BR, k] - out[DR, k]) * dt
+
+        out[NRUR, k] = p * switches[NRUN, j] * interp(NRMM, msl, tb, sz)
+        out[NR, k] = out[NR, j] - out[NRUR, k] * dt
+        out[NRFR, k] = out[NR, k] / nri
+
+        out[CID, k] = out[CI, j] * switches[CIDN, j]
+        out[CIG, k] = p * interp(CIM, msl, tb, sz) * switches[CIGN, j]
+        out[CI, k] = out[CI, j] + dt * (out[CIG, k] - out[CID, k])
+        out[CR, k] = out[P, k] / (la * pdn)
+        out[CIR, k] = out[CI, k] / out[P, k]
+
+        out[POLG, k] = (p * switches[POLN, j] *
+                        interp(POLCM, out[CIR, j], tb, sz))
+        out[POLA, k] = out[POL, j] / interp(POLAT, polr, tb, sz)
+        out[POL, k] = out[POL, j] + (out[POLG, k] - out[POLA, k]) * dt
+        out[POLR, k] = out[POL, k] / pols
+
+        out[CIAF, k] = (out[CIAF, j] +
+                        (interp(CFIFR, fr, tb, sz) *
+                         interp(CIQR, interp(QLM, msl, tb, sz) /
+                                interp(QLF, fr, tb, sz), tb, sz) -
+                         out[CIAF, j]) *
+                        (dt / ciaft))
+
+        out[CIRA, k] = out[CIR, k] * out[CIAF, k] / ciafn
+        out[FR, k] = (interp(FCM, out[CR, k], tb, sz) *
+                      interp(FPCI, out[CIRA, k], tb, sz) *
+                      interp(FPM, out[POLR, k], tb, sz) *
+                      switches[FC, k]) / fn
+        out[ECIR, k] = (out[CIR, k] *
+                        (1 - out[CIAF, k]) *
+                        interp(NREM, out[NRFR, k], tb, sz)) / (1 - ciafn)
+        out[MSL, k] = out[ECIR, k] / ecirn
+        out[QL, k] = (qls * interp(QLM, out[MSL, k], tb, sz) *
+                      interp(QLC, out[CR, k], tb, sz) *
+                      interp(QLF, out[FR, k], tb, sz) *
+                      interp(QLP, out[POLR, k], tb, sz))
+
+
+if njit is not None:
+    interp = njit(cache=True)(interp)
+    run_kernel = njit(cache=True)(run)
+else:
+    run_kernel = run
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Plotting of World2 results with matplotlib. The simulation core does not
+import this module, so that it runs without loading matplotlib.
+
+Ensembles (e.g. World2Ensemble results, of shape (n, n_runs)) are drawn as
+percentile bands, with optionally a subset of decimated members in one
+LineCollection. Many figures can be rendered to files across processes.
+
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.ticker import EngFormatter
+
+COLORS = ["black", "#e7298a", "#d95f02", "#7570b3", "#1b9e77"]
+
+
+def make_patch_spines_invisible(ax):
+    """
+    Helper from matplotlib gallery (Multiple Yaxis With Spines)
+
+    """
+    ax.set_frame_on(True)
+    ax.patch.set_visible(False)
+    for sp in ax.spines.values():
+        sp.set_visible(False)
+
+
+def plot_world_variables(time, var_data, var_names, var_lims,
+                         title=None,
+                         figsize=None,
+                         dist_spines=0.09,
+                         grid=False):
+    """
+    Plots world state from an instance of World2.
+
+    """
+    var_number = len(var_data)
+
+    fig, host = plt.subplots(figsize=figsize)
+    axs = [host, ]
+    for i in range(var_number-1):
+        axs.append(host.twinx())
+
+    fig.subplots_adjust(left=dist_spines*2)
+    for i, ax in enumerate(axs[1:]):
+        ax.spines["left"].set_position(("axes", -(i + 1)*dist_spines))
+        ax.spines["left"].set_visible(True)
+        ax.yaxis.set_label_position('left')
+        ax.yaxis.set_ticks_position('left')
+
+    ps = []
+    for ax, label, ydata, color in zip(axs, var_names, var_data, COLORS):
+        ps.append(ax.plot(time, ydata, label=label, color=color, linewidth=3,
+                          alpha=0.7)[0])
+    axs[0].grid(grid)
+    axs[0].set_xlim(time[0], time[-1])
+
+    for ax, lim in zip(axs, var_lims):
+        ax.set_ylim(lim[0], lim[1])
+
+    for ax_ in axs:
+        formatter_ = EngFormatter(places=0, sep="\N{THIN SPACE}")
+        ax_.tick_params(axis='y', rotation=90)
+        ax_.yaxis.set_major_locator(plt.MaxNLocator(5))
+        ax_.yaxis.set_major_formatter(formatter_)
+
+    tkw = dict(size=4, width=1.5)
+    axs[0].set_xlabel("time [years]")
+    axs[0].tick_params(axis='x', **tkw)
+    for i, (ax, p) in enumerate(zip(axs, ps)):
+        ax.set_ylabel(p.get_label(), rotation="horizontal")
+        ax.yaxis.label.set_color(p.get_color())
+        ax.tick_params(axis='y', colors=p.get_color(), **tkw)
+        ax.yaxis.set_label_coords(-i*dist_spines, 1.01)
+
+    if title is not None:
+        fig.suptitle(title, x=0.95, ha="right", fontsize=10)
+
+    plt.tight_layout()
+    return axs
+
+
+def decimate(time, data, max_points):
+    """
+    Keeps at most about max_points points of time, evenly strided, and the
+    last one.
+
+    """
+    stride = max(1, int(np.ceil(len(time) / max_points)))
+    index = np.arange(0, len(time), stride)
+    if index[-1] != len(time) - 1:
+        index = np.append(index, len(time) - 1)
+    return time[index], data[index]
+
+
+def plot_ensemble(ax, time, data, bands=(50, 90), median=True, members=0,
+                  max_points=300, color="black", label=None, seed=0):
+    """
+    Plots an ensemble of trajectories of one variable as percentile bands.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        axes to draw on.
+    time : numpy.ndarray
+        time [year], of shape (n,).
+    data : numpy.ndarray
+        trajectories, of shape (n, n_runs) as in World2Ensemble.
+    bands : sequence, optional
+        central coverages of the bands [%]: 90 fills between the 5th and 95th
+        percentiles. The default is (50, 90).
+    median : bool, optional
+        draws the median line. The default is True.
+    members : int, optional
+        number of members drawn as thin lines, chosen at random. The default
+        is 0.
+    max_points : int, optional
+        maximum number of points of time drawn, see decimate. Percentiles are
+        only computed at these points. The default is 300.
+    color : str, optional
+        color of the bands and lines. The default is "black".
+    label : str, optional
+        label of the median line. The default is None.
+    seed : int, optional
+        seed of the choice of members. The default is 0.
+
+    """
+    time, data = decimate(time, data, max_points)
+    bands = sorted(bands, reverse=True)
+    q = [50] + [p for band in bands for p in (50 - band / 2, 50 + band / 2)]
+    percentiles = np.percentile(data, q, axis=1)
+    # nanpercentile is slower, and only needed where some runs are NaN
+    is_nan = np.isnan(data)
+    partial = is_nan.any(axis=1) & ~is_nan.all(axis=1)
+    if partial.any():
+        percentiles[:, partial] = np.nanpercentile(data[partial], q, axis=1)
+    for i, band in enumerate(bands):
+        ax.fill_between(time, percentiles[1 + 2 * i], percentiles[2 + 2 * i],
+                        color=color, alpha=0.15 + 0.25 * i / len(bands),
+                        linewidth=0, label=f"{band}%")
+    if members:
+        rng = np.random.default_rng(seed)
+        runs = rng.choice(data.shape[1], min(members, data.shape[1]),
+                          replace=False)
+        segments = np.empty((len(runs), len(time), 2))
+        segments[:, :, 0] = time
+        segments[:, :, 1] = data[:, runs].T
+        ax.add_collection(LineCollection(segments, colors=color,
+                                         linewidths=0.5,
+                                         alpha=min(1., 20 / len(runs))))
+    if median:
+        ax.plot(time, percentiles[0], color=color, linewidth=2, label=label)
+    ax.set_xlim(time[0], time[-1])
+
+
+def plot_ensemble_variables(time, var_data, var_names, var_lims=None,
+                            title=None, figsize=None, fig=None, grid=True,
+                            **kwargs):
+    """
+    Plots ensembles of some World2 variables, one panel per variable.
+
+    Parameters
+    ----------
+    time : numpy.ndarray
+        time [year], of shape (n,).
+    var_data : list
+        trajectories of each variable, of shape (n, n_runs).
+    var_names : list
+        names of the variables.
+    var_lims : list, optional
+        y limits of each panel. The default is None, for automatic limits.
+    title : str, optional
+        title of the figure. The default is None.
+    figsize : tuple, optional
+        size of a new figure. The default is None.
+    fig : matplotlib.figure.Figure, optional
+        figure to draw on. The default is None, for a new pyplot figure.
+    grid : bool, optional
+        draws grids. The default is True.
+    **kwargs
+        options of plot_ensemble.
+
+    Returns
+    -------
+    list
+        axes of the panels.
+
+    """
+    if fig is None:
+        fig = plt.figure(figsize=figsize)
+    axs = np.atleast_1d(fig.subplots(len(var_data), 1, sharex=True))
+    for i, (ax, ydata, name) in enumerate(zip(axs, var_data, var_names)):
+        plot_ensemble(ax, time, ydata, color=COLORS[i % len(COLORS)],
+                      **kwargs)
+        ax.set_ylabel(name)
+        ax.grid(grid)
+        ax.yaxis.set_major_formatter(EngFormatter(places=0,
+                                                  sep="\N{THIN SPACE}"))
+        if var_lims is not None:
+            ax.set_ylim(var_lims[i])
+    axs[-1].set_xlabel("time [years]")
+    if title is not None:
+        fig.suptitle(title, x=0.95, ha="right", fontsize=10)
+    fig.tight_layout()
+    return list(axs)
+
+
+def render_figure(job):
+    """
+    Renders one figure of plot_ensemble_variables to a file, on a figure
+    independent of pyplot and of the interactive backend.
+
+    Parameters
+    ----------
+    job : dict
+        "fig_file", optionally "figsize" and "dpi", and the other arguments
+        of plot_ensemble_variables.
+
+    Returns
+    -------
+    str
+        path of the figure.
+
+    """
+    job = dict(job)
+    fig_file = job.pop("fig_file")
+    dpi = job.pop("dpi", 100)
+    fig = Figure(figsize=job.pop("figsize", None))
+    plot_ensemble_variables(fig=fig, **job)
+    fig.savefig(fig_file, dpi=dpi)
+    return fig_file
+
+
+def render_figures(jobs, n_workers=None):
+    """
+    Renders many figures of plot_ensemble_variables to files, over a pool of
+    processes.
+
+    Parameters
+    ----------
+    jobs : list
+        one dict per figure, see render_figure.
+    n_workers : int, optional
+        number of processes. If 1, figures are rendered in the current
+        process. The default is None, for os.cpu_count().
+
+    Returns
+    -------
+    list
+        paths of the figures.
+
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count()
+    if n_workers == 1:
+        return [render_figure(job) for job in jobs]
+    with ProcessPoolExecutor(n_workers) as pool:
+        return list(pool.map(render_figure, jobs))
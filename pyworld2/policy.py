@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-objective search of policies over the switch functions of World2, with
+the NSGA-II genetic algorithm.
+
+A policy sets the value after switch (``NAME1``) and the threshold year
+(``NAME.trigger``) of some switch functions. Each generation is evaluated as
+one batch of World2Ensemble runs, possibly spread over processes, and
+policies already evaluated are not run again. The search returns the Pareto
+front of the objectives: final QL (maximized), peak POLR (minimized) and
+minimum NR (maximized).
+
+Examples
+--------
+>>> bounds = {"NRUN1": (0.25, 1), "NRUN.trigger": (1970, 2000),
+...           "POLN1": (0.25, 1), "CIGN1": (0.02, 0.06)}
+>>> front = search_policies(bounds, pop_size=40, n_generations=25, seed=0)
+>>> front.objectives           # one row per Pareto-optimal policy
+>>> front.export("policies")   # one switch json file per policy
+
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import numpy as np
+
+from .config import SWITCH_NAMES
+from .ensemble import World2Ensemble
+from .utils import Schedule
+from .world2 import World2
+
+OBJECTIVE_NAMES = ["QL_final", "POLR_peak", "NR_min"]
+# +1 to minimize, -1 to maximize
+OBJECTIVE_SENSES = np.array([-1., 1., -1.])
+
+
+class PolicyFront:
+    """
+    Pareto front of a policy search.
+
+    Attributes
+    ----------
+    names : list
+        names of the decision variables, as "NAME1" or "NAME.trigger".
+    x : numpy.ndarray
+        Pareto-optimal policies, of shape (n_policies, len(names)).
+    objectives : numpy.ndarray
+        their objectives, of shape (n_policies, 3), in the order of
+        OBJECTIVE_NAMES.
+    n_evaluations : int
+        number of distinct policies run during the search.
+    configuration : dict
+        configuration of the base simulation, see World2.get_configuration.
+
+    """
+
+    def __init__(self, names, x, objectives, n_evaluations, configuration):
+        self.names = names
+        self.x = x
+        self.objectives = objectives
+        self.n_evaluations = n_evaluations
+        self.configuration = configuration
+
+    def switch_functions(self, i):
+        """
+        Returns the i-th policy of the front, as the content of a json
+        configuration file of switch functions.
+
+        """
+        policy = dict(zip(self.names, self.x[i].tolist()))
+        tables = []
+        for table in self.configuration["switch_functions"]:
+            table = dict(table)
+            for func_name in SWITCH_NAMES:
+                if func_name in table:
+                    if f"{func_name}1" in policy:
+                        table[f"{func_name}1"] = policy[f"{func_name}1"]
+                    if f"{func_name}.trigger" in policy:
+                        table["trigger.value"] = policy[f"{func_name}.trigger"]
+            tables.append(table)
+        return tables
+
+    def export(self, directory):
+        """
+        Writes each policy of the front in "functions_switch_policy_<i>.json"
+        and the objectives of all policies in "front.json".
+
+        Returns
+        -------
+        list
+            paths of the json files of switch functions.
+
+        """
+        os.makedirs(directory, exist_ok=True)
+        json_files = []
+        for i in range(len(self.x)):
+            json_file = os.path.join(directory,
+                                     f"functions_switch_policy_{i}.json")
+            with open(json_file, "w") as fjson:
+                json.dump(self.switch_functions(i), fjson, indent=1)
+            json_files.append(json_file)
+        front = [dict(policy=os.path.basename(json_file),
+                      **dict(zip(OBJECTIVE_NAMES, objectives.tolist())))
+                 for json_file, objectives in zip(json_files,
+                                                  self.objectives)]
+        with open(os.path.join(directory, "front.json"), "w") as fjson:
+            json.dump(front, fjson, indent=1)
+        return json_files
+
+
+def evaluate_policies(config, names, x):
+    """
+    Runs policies together as a World2Ensemble.
+
+    Parameters
+    ----------
+    config : dict
+        configuration of the base simulation, see World2.get_configuration.
+    names : list
+        names of the decision variables, as "NAME1" or "NAME.trigger".
+    x : numpy.ndarray
+        policies, of shape (n_policies, len(names)).
+
+    Returns
+    -------
+    numpy.ndarray
+        objectives of the policies, of shape (n_policies, 3), in the order of
+        OBJECTIVE_NAMES.
+
+    """
+    w2 = World2Ensemble(len(x), config["year_min"], config["year_max"],
+                        config["dt"], config.get("dtype", "float64"),
+                        config.get("stride", 1))
+    w2.set_state_variables(**config["state_variables"])
+    w2.set_initial_state(**config["initial_state"])
+    w2.set_table_functions(config["table_functions"])
+    w2.set_switch_functions(config["switch_functions"])
+    for func_name in SWITCH_NAMES:
+        kwargs = {}
+        if f"{func_name}1" in names:
+            kwargs["value_after_switch"] = x[:, names.index(f"{func_name}1")]
+        if f"{func_name}.trigger" in names:
+            kwargs["trigger_value"] = x[:, names.index(f"{func_name}.trigger")]
+        if kwargs:
+            w2.set_switch_function(func_name, **kwargs)
+    with np.errstate(all="ignore"):
+        w2.run()
+    return np.stack([w2.ql[-1], np.nanmax(w2.polr, axis=0),
+                     np.nanmin(w2.nr, axis=0)], axis=1)
+
+
+def non_dominated_sort(f):
+    """
+    Ranks points by Pareto fronts, 0 for the non-dominated ones.
+
+    Parameters
+    ----------
+    f : numpy.ndarray
+        objectives to minimize, of shape (n_points, n_objectives).
+
+    Returns
+    -------
+    numpy.ndarray
+        rank of each point.
+
+    """
+    # dominates[i, j] if point i dominates point j
+    dominates = (np.all(f[:, None] <= f[None], axis=2) &
+                 np.any(f[:, None] < f[None], axis=2))
+    count = dominates.sum(axis=0)
+    ranks = np.empty(len(f), dtype=int)
+    front = np.flatnonzero(count == 0)
+    rank = 0
+    while front.size:
+        ranks[front] = rank
+        count[front] = -1
+        count -= dominates[front].sum(axis=0)
+        front = np.flatnonzero(count == 0)
+        rank += 1
+    return ranks
+
+
+def crowding_distance(f):
+    """
+    Crowding distance of points of one front, infinite at its ends.
+
+    """
+    distance = np.zeros(len(f))
+    for column in f.T:
+        order = np.argsort(column)
+        span = column[order[-1]] - column[order[0]]
+        distance[order[[0, -1]]] = np.inf
+        if np.isfinite(span) and span > 0:
+            distance[order[1:-1]] += (column[order[2:]] -
+                                      column[order[:-2]]) / span
+    return distance
+
+
+def _select(f, size):
+    """
+    Returns the indices of the size best points, by rank then by crowding
+    distance, with their rank and distance.
+
+    """
+    ranks = non_dominated_sort(f)
+    distance = np.zeros(len(f))
+    for rank in np.unique(ranks):
+        front = ranks == rank
+        distance[front] = crowding_distance(f[front])
+    order = np.lexsort((-distance, ranks))[:size]
+    return order, ranks[order], distance[order]
+
+
+def _offspring(x, ranks, distance, low, high, rng, eta_c=15., eta_m=20.):
+    """
+    Breeds len(x) children by binary tournaments, simulated binary crossover
+    and polynomial mutation.
+
+    """
+    n, d = x.shape
+    a, b = rng.integers(n, size=(2, n))
+    better = (ranks[a] < ranks[b]) | ((ranks[a] == ranks[b]) &
+                                      (distance[a] > distance[b]))
+    parents = x[np.where(better, a, b)]
+    parents_1, parents_2 = parents[0::2], parents[1::2]
+    m = min(len(parents_1), len(parents_2))
+    parents_1, parents_2 = parents_1[:m], parents_2[:m]
+
+    u = rng.random((m, d))
+    beta = np.where(u <= 0.5, (2 * u) ** (1 / (eta_c + 1)),
+                    (1 / (2 * (1 - u))) ** (1 / (eta_c + 1)))
+    beta[rng.random((m, d)) < 0.5] = 1
+    children = np.concatenate([
+        0.5 * ((1 + beta) * parents_1 + (1 - beta) * parents_2),
+        0.5 * ((1 - beta) * parents_1 + (1 + beta) * parents_2)])
+    children = np.concatenate([children, parents[2 * m:]])
+
+    u = rng.random(children.shape)
+    delta = np.where(u < 0.5, (2 * u) ** (1 / (eta_m + 1)) - 1,
+                     1 - (2 * (1 - u)) ** (1 / (eta_m + 1)))
+    mutate = rng.random(children.shape) < 1 / d
+    children = children + mutate * delta * (high - low)
+    return np.clip(children, low, high)
+
+
+def search_policies(bounds, w2=None, pop_size=40, n_generations=25,
+                    seed=None, n_workers=1):
+    """
+    Searches the Pareto front of policies with NSGA-II.
+
+    Parameters
+    ----------
+    bounds : dict
+        lower and upper bounds of each decision variable, by name: "NAME1"
+        for the value after switch, or "NAME.trigger" for the threshold year
+        of a switch function NAME.
+    w2 : World2, optional
+        base simulation, with constants, initial state, table and switch
+        functions set. Its switch functions must switch once. The default is
+        None, for a standard run.
+    pop_size : int, optional
+        number of policies per generation. The default is 40.
+    n_generations : int, optional
+        number of generations. The default is 25.
+    seed : int, optional
+        seed of the random generator. The default is None.
+    n_workers : int, optional
+        number of processes among which each generation is split. The
+        default is 1, to run in the current process.
+
+    Returns
+    -------
+    PolicyFront
+
+    """
+    names = list(bounds)
+    for name in names:
+        func_name, _, suffix = name.partition(".")
+        if name.endswith("1") and name[:-1] in SWITCH_NAMES:
+            continue
+        if func_name in SWITCH_NAMES and suffix == "trigger":
+            continue
+        raise ValueError(f"unknown decision variable {name!r}, expected "
+                         "NAME1 or NAME.trigger for NAME in SWITCH_NAMES")
+    if w2 is None:
+        w2 = World2()
+        w2.set_all_standard()
+    if any(isinstance(getattr(w2, func_name.lower()), Schedule)
+           for func_name in SWITCH_NAMES):
+        raise ValueError("policies are searched over switch functions that "
+                         "switch once")
+    config = w2.get_configuration()
+    low, high = np.array([bounds[name] for name in names], dtype=float).T
+    rng = np.random.default_rng(seed)
+    memo = {}
+    # one pool of processes for all generations
+    pool = ProcessPoolExecutor(n_workers) if n_workers > 1 else None
+
+    def evaluate(x):
+        new = [xi for xi in x if tuple(xi) not in memo]
+        new = np.unique(np.array(new), axis=0) if new else np.empty((0,))
+        if len(new):
+            if pool is None:
+                objectives = evaluate_policies(config, names, new)
+            else:
+                chunks = np.array_split(new, n_workers)
+                objectives = np.concatenate(list(pool.map(
+                    evaluate_policies, [config] * n_workers,
+                    [names] * n_workers, chunks)))
+            memo.update(zip(map(tuple, new), objectives))
+        f = np.array([memo[tuple(xi)] for xi in x]) * OBJECTIVE_SENSES
+        # failed runs are dominated by all others
+        return np.where(np.isfinite(f), f, np.inf)
+
+    with pool if pool is not None else nullcontext():
+        x = low + rng.random((pop_size, len(names))) * (high - low)
+        f = evaluate(x)
+        order, ranks, distance = _select(f, pop_size)
+        x, f = x[order], f[order]
+        for _ in range(n_generations):
+            children = _offspring(x, ranks, distance, low, high, rng)
+            x = np.concatenate([x, children])
+            f = np.concatenate([f, evaluate(children)])
+            order, ranks, distance = _select(f, pop_size)
+            x, f = x[order], f[order]
+
+    # Pareto front of all policies run, without duplicates
+    x_all = np.array(list(memo))
+    f_all = np.array(list(memo.values()))
+    valid = np.all(np.isfinite(f_all), axis=1)
+    x_all, f_all = x_all[valid], f_all[valid]
+    front = non_dominated_sort(f_all * OBJECTIVE_SENSES) == 0
+    order = np.argsort(-f_all[front, 0])
+    return PolicyFront(names, x_all[front][order], f_all[front][order],
+                       len(memo), config)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Accuracy of World2 runs in reduced precision, e.g. numpy.float32, against
+float64.
+
+In float32, all model vectors take half the memory, and the integration runs
+in float32 as well. Magnitudes need no rescaling: the largest ones (NR about
+9e11, POL and POLS about 1e9 to 1e11) are far within the range of float32,
+and scaling a variable does not change its relative rounding error, which
+is what precision_report measures.
+
+Examples
+--------
+>>> report = precision_report()            # standard run, float32
+>>> report["max_relative_error"]["ql"]
+>>> report["worst"]
+
+"""
+import copy
+
+import numpy as np
+
+from .world2 import CONSTANT_NAMES, INITIAL_STATE_NAMES, VARIABLE_NAMES, World2
+
+
+def with_dtype(w2, dtype):
+    """
+    Copies a simulation with the floating-point type dtype, its constants
+    and initial conditions set per run (in ensembles) cast to it.
+
+    """
+    world = copy.copy(w2)
+    world.dtype = np.dtype(dtype)
+    world.trajectories = None
+    for name in CONSTANT_NAMES + INITIAL_STATE_NAMES:
+        value = getattr(w2, name)
+        if isinstance(value, np.ndarray):
+            setattr(world, name, value.astype(world.dtype))
+    return world
+
+
+def precision_report(w2=None, dtype=np.float32, **run_options):
+    """
+    Runs a configuration in dtype and in float64, and compares their model
+    vectors.
+
+    Parameters
+    ----------
+    w2 : World2, optional
+        simulation with constants, initial state, table and switch functions
+        set, possibly a World2Ensemble. It is left unchanged. The default is
+        None, for the standard run.
+    dtype : numpy.dtype, optional
+        reduced floating-point type. The default is numpy.float32.
+    **run_options
+        arguments of World2.run, e.g. method.
+
+    Returns
+    -------
+    dict
+        "dtype", "max_relative_error" of each variable of VARIABLE_NAMES:
+        maximum absolute deviation over time (and runs) divided by the
+        maximum absolute value in float64, "worst" variable, and
+        "memory_ratio" of the trajectories.
+
+    """
+    if w2 is None:
+        w2 = World2()
+        w2.set_all_standard()
+    runs = []
+    for run_dtype in [dtype, np.float64]:
+        world = with_dtype(w2, run_dtype)
+        with np.errstate(all="ignore"):
+            world.run(**run_options)
+        runs.append(world)
+    reduced, reference = runs
+
+    errors = {}
+    for var_name in VARIABLE_NAMES:
+        values = getattr(reference, var_name)
+        deviation = np.abs(getattr(reduced, var_name) - values)
+        scale = np.nanmax(np.abs(values))
+        errors[var_name] = (float(np.nanmax(deviation) / scale)
+                            if scale > 0 else 0.)
+    return {"dtype": np.dtype(dtype).name, "max_relative_error": errors,
+            "worst": max(errors, key=errors.get),
+            "memory_ratio": (reduced.trajectories.nbytes /
+                             reference.trajectories.nbytes)}
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Global sensitivity analysis of World2 to its constants and initial conditions,
+with Sobol indices estimated from Saltelli samples.
+
+Examples
+--------
+>>> bounds = {"pols": (3e9, 4.5e9), "nri": (600e9, 1200e9)}
+>>> res = sobol_analysis(bounds, 256)
+>>> res.s1["QL"]               # first-order indices over time, per parameter
+
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+from scipy.stats import qmc
+
+from .ensemble import World2Ensemble
+from .world2 import CONSTANT_NAMES, INITIAL_STATE_NAMES, World2
+
+OUTPUT_NAMES = ["P", "QL", "POLR", "NR", "CI"]
+
+
+class SobolResult:
+    """
+    Sobol indices of some World2 outputs, over time.
+
+    Attributes
+    ----------
+    names : list
+        names of the parameters.
+    time : numpy.ndarray
+        time of the simulations [year].
+    samples : numpy.ndarray
+        Saltelli samples of the parameters, of shape (n_samples, len(names)).
+    outputs : dict
+        trajectories of each output, of shape (n_samples, time.size).
+    s1 : dict
+        first-order indices of each output, of shape (len(names), time.size).
+    st : dict
+        total indices of each output, of shape (len(names), time.size).
+
+    """
+
+    def __init__(self, names, time, samples, outputs, s1, st):
+        self.names = names
+        self.time = time
+        self.samples = samples
+        self.outputs = outputs
+        self.s1 = s1
+        self.st = st
+
+
+def saltelli_sample(bounds, n, seed=None):
+    """
+    Generates Saltelli samples from a scrambled Sobol sequence.
+
+    Parameters
+    ----------
+    bounds : dict
+        lower and upper bounds of each parameter, by name. Names are
+        arguments of World2.set_state_variables or World2.set_initial_state.
+    n : int
+        base sample size, preferably a power of 2.
+    seed : int, optional
+        seed of the scrambling. The default is None.
+
+    Returns
+    -------
+    names : list
+        names of the d parameters.
+    samples : numpy.ndarray
+        samples of shape (n * (d + 2), d), made of the blocks A, B, then the
+        d blocks AB_i where the i-th column of A is taken from B.
+
+    """
+    names = list(bounds)
+    unknown = set(names) - set(CONSTANT_NAMES + INITIAL_STATE_NAMES)
+    if unknown:
+        raise ValueError(f"unknown parameters {sorted(unknown)}")
+    d = len(names)
+    base = qmc.Sobol(2 * d, scramble=True, seed=seed).random(n)
+    a, b = base[:, :d], base[:, d:]
+    blocks = [a, b]
+    for i in range(d):
+        ab = a.copy()
+        ab[:, i] = b[:, i]
+        blocks.append(ab)
+    low, high = np.array([bounds[name] for name in names], dtype=float).T
+    return names, low + np.concatenate(blocks) * (high - low)
+
+
+def run_samples(names, samples, outputs=OUTPUT_NAMES, year_min=1900,
+                year_max=2100, dt=0.2, n_workers=None, chunk_size=256):
+    """
+    Runs World2 for every sample of parameters. Chunks of samples are run as
+    World2Ensemble in a pool of processes, which write their outputs straight
+    into shared memory.
+
+    Parameters
+    ----------
+    names : list
+        names of the parameters.
+    samples : numpy.ndarray
+        values of the parameters, of shape (n_samples, len(names)).
+    outputs : list, optional
+        names of the World2 variables to keep. The default is OUTPUT_NAMES.
+    year_min, year_max, dt : optional
+        time limits and step, as in World2.
+    n_workers : int, optional
+        number of processes. If 1, samples are run in the current process. The
+        default is None, for os.cpu_count().
+    chunk_size : int, optional
+        number of samples run together. The default is 256.
+
+    Returns
+    -------
+    dict
+        trajectories of each output, of shape (n_samples, n).
+
+    """
+    n = World2(year_min, year_max, dt).n
+    shape = (len(outputs), len(samples), n)
+    chunks = [(start, min(start + chunk_size, len(samples)))
+              for start in range(0, len(samples), chunk_size)]
+    config = (names, outputs, year_min, year_max, dt)
+
+    if n_workers is None:
+        n_workers = os.cpu_count()
+    if n_workers == 1:
+        data = np.empty(shape)
+        for start, stop in chunks:
+            _run_chunk(data, start, samples[start:stop], *config)
+    else:
+        shm = SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+        try:
+            with ProcessPoolExecutor(n_workers) as pool:
+                futures = [pool.submit(_run_chunk_shared, shm.name, shape,
+                                       start, samples[start:stop], *config)
+                           for start, stop in chunks]
+                for future in futures:
+                    future.result()
+            data = np.ndarray(shape, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+    return dict(zip(outputs, data))
+
+
+def _run_chunk_shared(shm_name, shape, start, samples, *config):
+    """
+    Runs a chunk of samples in a worker process, into shared memory.
+
+    """
+    shm = SharedMemory(name=shm_name)
+    try:
+        _run_chunk(np.ndarray(shape, buffer=shm.buf), start, samples, *config)
+    finally:
+        shm.close()
+
+
+def _run_chunk(data, start, samples, names, outputs, year_min, year_max, dt):
+    """
+    Runs a chunk of samples with World2Ensemble, into data[:, start:].
+
+    """
+    params = dict(zip(names, samples.T))
+    w2 = World2Ensemble(len(samples), year_min, year_max, dt)
+    w2.set_state_variables(**{name: value for name, value in params.items()
+                              if name in CONSTANT_NAMES})
+    w2.set_initial_state(**{name: value for name, value in params.items()
+                            if name in INITIAL_STATE_NAMES})
+    w2.set_table_functions()
+    w2.set_switch_functions()
+    w2.run()
+    for i, output in enumerate(outputs):
+        data[i, start:start + len(samples)] = getattr(w2, output.lower()).T
+
+
+def sobol_indices(y, n, d):
+    """
+    Estimates first-order (Saltelli 2010) and total (Jansen) Sobol indices.
+
+    Parameters
+    ----------
+    y : numpy.ndarray
+        model outputs for Saltelli samples, of shape (n * (d + 2), ...).
+    n : int
+        base sample size.
+    d : int
+        number of parameters.
+
+    Returns
+    -------
+    s1, st : numpy.ndarray
+        first-order and total indices, of shape (d, ...). They are NaN where
+        the output does not vary.
+
+    """
+    y_a, y_b = y[:n], y[n:2 * n]
+    y_ab = y[2 * n:].reshape((d, n) + y.shape[1:])
+    var = np.var(np.concatenate([y_a, y_b]), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s1 = np.mean(y_b * (y_ab - y_a), axis=1) / var
+        st = 0.5 * np.mean((y_a - y_ab) ** 2, axis=1) / var
+    return s1, st
+
+
+def sobol_analysis(bounds, n, outputs=OUTPUT_NAMES, seed=None,
+                   year_min=1900, year_max=2100, dt=0.2, n_workers=None):
+    """
+    Computes first-order and total Sobol indices of World2 outputs over time.
+    The model runs n * (len(bounds) + 2) times.
+
+    Parameters
+    ----------
+    bounds : dict
+        lower and upper bounds of each parameter, see saltelli_sample.
+    n : int
+        base sample size, preferably a power of 2.
+    outputs : list, optional
+        names of the World2 variables to analyze. The default is OUTPUT_NAMES.
+    seed : int, optional
+        seed of the sampling. The default is None.
+    year_min, year_max, dt : optional
+        time limits and step, as in World2.
+    n_workers : int, optional
+        number of processes, see run_samples. The default is None.
+
+    Returns
+    -------
+    SobolResult
+
+    """
+    names, samples = saltelli_sample(bounds, n, seed=seed)
+    trajectories = run_samples(names, samples, outputs, year_min, year_max,
+                               dt, n_workers=n_workers)
+    s1, st = {}, {}
+    for output, y in trajectories.items():
+        s1[output], st[output] = sobol_indices(y, n, len(names))
+    time = World2(year_min, year_max, dt).time
+    return SobolResult(names, time, samples, trajectories, s1, st)
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+"""
+Local HTTP/JSON service of World2 simulations, with asyncio and only the
+standard library.
+
+Clients post scenario specs to ``/run``. A spec holds any keys of
+World2.from_configuration ("year_min", "year_max", "dt", "stride", "dtype",
+"state_variables", "initial_state"), overrides of some table and switch
+functions ("table_functions", "switch_functions": lists of tables with the
+structure of the json configuration files), and optionally "method" and the
+"variables" to return. Everything missing takes its standard value.
+
+Specs run in a pool of processes started once, where the default table and
+switch functions are compiled at startup. Identical specs in flight at the
+same time run once: later requests wait for the result of the first one.
+Results are streamed back in the binary format of encode_result: a json
+header, then the raw values of each variable.
+
+``GET /health`` returns the counters of the service.
+
+Examples
+--------
+Serves on localhost:8642 from a shell:
+
+    pyworld2 serve --port 8642 -j 4
+
+then from Python:
+
+>>> result = request_run({"state_variables": {"pols": 5e9}}, port=8642)
+>>> result["time"], result["ql"]
+
+"""
+import asyncio
+import hashlib
+import http.client
+import json
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .config import (load_switch_functions, load_table_functions,
+                     parse_switch_functions, parse_table_functions)
+from .world2 import VARIABLE_NAMES, World2
+
+MAGIC = b"PW2R"
+# magic, length of the json header
+HEADER_FORMAT = "<4sI"
+GRID_KEYS = ["year_min", "year_max", "dt", "stride", "dtype"]
+SPEC_KEYS = GRID_KEYS + ["state_variables", "initial_state",
+                         "table_functions", "switch_functions", "method",
+                         "variables"]
+MAX_BODY_SIZE = 1 << 20
+CHUNK_SIZE = 1 << 16
+
+
+def spec_key(spec):
+    """
+    Returns a hash of a spec, identical for specs equal as json.
+
+    """
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def build_simulation(spec):
+    """
+    Builds a simulation ready to run from a spec. Tables and switches not
+    overridden are the compiled default ones of the process.
+
+    Parameters
+    ----------
+    spec : dict
+        scenario spec, see the module docstring.
+
+    Returns
+    -------
+    World2
+
+    """
+    unknown = [key for key in spec if key not in SPEC_KEYS]
+    if unknown:
+        raise ValueError(f"unknown keys {unknown} in spec, expected some of "
+                         f"{SPEC_KEYS}")
+    for key in ["table_functions", "switch_functions"]:
+        if not isinstance(spec.get(key, []), list):
+            raise ValueError(f"{key} must be a list of tables, files are not "
+                             "read by the service")
+    w2 = World2(**{key: spec[key] for key in GRID_KEYS if key in spec})
+    w2.set_state_variables(**spec.get("state_variables", {}))
+    w2.set_initial_state(**spec.get("initial_state", {}))
+    functions = dict(load_table_functions())
+    functions.update(parse_table_functions(spec.get("table_functions", []),
+                                           partial=True))
+    w2.set_table_functions(functions)
+    functions = dict(load_switch_functions())
+    functions.update(parse_switch_functions(spec.get("switch_functions", []),
+                                            partial=True))
+    w2.set_switch_functions(functions)
+    return w2
+
+
+def encode_result(w2, var_names=VARIABLE_NAMES, **info):
+    """
+    Encodes the result of a run: MAGIC, the length of a json header as a
+    little-endian uint32, the header, then the values of each variable in
+    the order of the header, as little-endian arrays of its dtype. Time is
+    not sent, it follows from "year_min", "step" and "n".
+
+    Parameters
+    ----------
+    w2 : World2
+        simulation after its run.
+    var_names : list, optional
+        names of the variables to encode. The default is VARIABLE_NAMES.
+    **info
+        other entries of the header.
+
+    Returns
+    -------
+    bytes
+
+    """
+    dtype = w2.dtype.newbyteorder("<")
+    header = json.dumps(dict(info, year_min=float(w2.time[0]),
+                             step=w2.dt * w2.stride, n=len(w2.time),
+                             dtype=dtype.str, variables=list(var_names)),
+                        separators=(",", ":")).encode()
+    return b"".join([struct.pack(HEADER_FORMAT, MAGIC, len(header)), header]
+                    + [np.ascontiguousarray(getattr(w2, var_name),
+                                            dtype=dtype).tobytes()
+                       for var_name in var_names])
+
+
+def decode_result(data):
+    """
+    Decodes a result of encode_result.
+
+    Returns
+    -------
+    dict
+        "time", each variable by name, and "header".
+
+    """
+    magic, size = struct.unpack_from(HEADER_FORMAT, data)
+    if magic != MAGIC:
+        raise ValueError("not a pyworld2 result")
+    offset = struct.calcsize(HEADER_FORMAT)
+    header = json.loads(data[offset:offset + size])
+    offset += size
+    dtype = np.dtype(header["dtype"])
+    result = {"header": header,
+              "time": header["year_min"] +
+              header["step"] * np.arange(header["n"])}
+    for var_name in header["variables"]:
+        result[var_name] = np.frombuffer(data, dtype, header["n"], offset)
+        offset += header["n"] * dtype.itemsize
+    return result
+
+
+def run_spec(spec):
+    """
+    Runs a spec and encodes its result, in a worker process.
+
+    """
+    t_start = time.perf_counter()
+    var_names = spec.get("variables", VARIABLE_NAMES)
+    unknown = [name for name in var_names if name not in VARIABLE_NAMES]
+    if unknown:
+        raise ValueError(f"unknown variables {unknown}")
+    w2 = build_simulation({key: value for key, value in spec.items()
+                           if key != "variables"})
+    w2.run(method=spec.get("method", "euler"))
+    return encode_result(w2, var_names,
+                         wall_time=time.perf_counter() - t_start)
+
+
+def _init_worker():
+    """
+    Compiles the default table and switch functions once per worker.
+
+    """
+    load_table_functions()
+    load_switch_functions()
+
+
+class SimulationService:
+    """
+    HTTP/JSON service of World2 simulations on a pool of processes.
+
+    Attributes
+    ----------
+    host : str
+        address served.
+    port : int
+        port served, chosen by the system if 0 is given.
+    stats : dict
+        "requests" received on /run, "runs" dispatched to the pool,
+        "coalesced" requests that waited for an identical run, and "errors".
+
+    """
+
+    def __init__(self, host="127.0.0.1", port=8642, n_workers=None):
+        """
+        __init__ of class SimulationService.
+
+        Parameters
+        ----------
+        host : str, optional
+            address to serve. The default is "127.0.0.1".
+        port : int, optional
+            port to serve, 0 for any free port. The default is 8642.
+        n_workers : int, optional
+            number of processes. The default is None, for os.cpu_count().
+
+        """
+        self.host = host
+        self.port = port
+        self.n_workers = n_workers or os.cpu_count()
+        self.stats = dict.fromkeys(["requests", "runs", "coalesced",
+                                    "errors"], 0)
+        self._in_flight = {}
+        self._pool = None
+        self._server = None
+
+    async def start(self):
+        """
+        Starts the pool of processes and listens.
+
+        """
+        self._pool = ProcessPoolExecutor(self.n_workers,
+                                         initializer=_init_worker)
+        # starts the workers now, rather than on the first request
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self._pool,
+                                                    _init_worker)
+                               for _ in range(self.n_workers)])
+        self._server = await asyncio.start_server(self._handle, self.host,
+                                                  self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """
+        Stops listening and shuts the pool down.
+
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    async def serve_forever(self):
+        """
+        Starts, and serves until cancelled.
+
+        """
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def run(self, spec):
+        """
+        Runs a spec on the pool, or waits for an identical spec in flight.
+
+        Returns
+        -------
+        bytes
+            result, see encode_result.
+
+        """
+        self.stats["requests"] += 1
+        key = spec_key(spec)
+        future = self._in_flight.get(key)
+        if future is None:
+            self.stats["runs"] += 1
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._pool, run_spec, spec)
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key))
+        else:
+            self.stats["coalesced"] += 1
+        # a cancelled request does not cancel the run of the others
+        return await asyncio.shield(future)
+
+    async def _handle(self, reader, writer):
+        try:
+            status, content_type, body = await self._respond(reader)
+        except Exception as error:
+            self.stats["errors"] += 1
+            status, content_type = 500, "application/json"
+            body = json.dumps({"error": repr(error)}).encode()
+        try:
+            writer.write(f"HTTP/1.1 {status} {http.client.responses[status]}"
+                         f"\r\nContent-Type: {content_type}\r\n"
+                         "Transfer-Encoding: chunked\r\n"
+                         "Connection: close\r\n\r\n".encode())
+            for i in range(0, len(body), CHUNK_SIZE):
+                chunk = body[i:i + CHUNK_SIZE]
+                writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, reader):
+        """
+        Reads a request, and returns the status, content type and body of
+        its response.
+
+        """
+        request_line = (await reader.readline()).decode("latin-1").split()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if len(request_line) != 3:
+            return _error(400, "malformed request")
+        method, path, _ = request_line
+
+        if path == "/health":
+            return (200, "application/json",
+                    json.dumps({"status": "ok", "stats": self.stats,
+                                "n_workers": self.n_workers}).encode())
+        if path != "/run":
+            return _error(404, f"unknown path {path}")
+        if method != "POST":
+            return _error(405, "/run accepts POST requests only")
+        size = int(headers.get("content-length", 0))
+        if size > MAX_BODY_SIZE:
+            return _error(413, f"spec larger than {MAX_BODY_SIZE} bytes")
+        try:
+            spec = json.loads(await reader.readexactly(size) or b"{}")
+            if not isinstance(spec, dict):
+                raise ValueError("the spec must be a json object")
+            result = await self.run(spec)
+        except (ValueError, TypeError, KeyError) as error:
+            self.stats["errors"] += 1
+            return _error(400, str(error))
+        return 200, "application/octet-stream", result
+
+
+def _error(status, message):
+    return status, "application/json", json.dumps({"error":
+                                                   message}).encode()
+
+
+def serve(host="127.0.0.1", port=8642, n_workers=None):
+    """
+    Runs a SimulationService until interrupted.
+
+    """
+    service = SimulationService(host, port, n_workers)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+def request_run(spec, host="127.0.0.1", port=8642, timeout=60):
+    """
+    Posts a spec to a SimulationService and decodes its result.
+
+    Returns
+    -------
+    dict
+        see decode_result.
+
+    """
+    connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        connection.request("POST", "/run", json.dumps(spec),
+                           {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        data = response.read()
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise RuntimeError(f"{response.status} "
+                           f"{json.loads(data)['error']}")
+    return decode_result(data)
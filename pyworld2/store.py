@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import socket
+import time
+
+import numpy as np
+
+from .world2 import CONSTANT_NAMES, INITIAL_STATE_NAMES, VARIABLE_NAMES
+
+
+class ResultStore:
+    """
+    On-disk store of World2 results, for ensembles that do not fit in memory.
+    A store is a directory holding:
+
+        - metadata.json: time, variable and parameter names, and the
+          configuration of the simulation (see World2.get_configuration),
+
+        - trajectories.npy: all trajectories, of shape (number of variables,
+          n_runs, number of time steps), so that each variable is contiguous,
+
+        - parameters.npy: constants and initial conditions of each run, of
+          shape (n_runs, number of parameters),
+
+        - written.npy: flags of the runs written so far.
+
+    Arrays are memory-mapped: reads are lazy, and several processes can write
+    into the same store, each into its own runs.
+
+    Examples
+    --------
+    >>> store = ResultStore.create("results", 100000, w2)
+    >>> # in each worker process:
+    >>> store = ResultStore("results", mode="r+")
+    >>> start = store.reserve(w2_ens.n_runs)
+    >>> store.write(start, w2_ens)
+    >>> # later on:
+    >>> ResultStore("results").read("ql", runs=slice(0, 10),
+    ...                             time_window=(2000, 2100))
+
+    Attributes
+    ----------
+    path : str
+        directory of the store.
+    metadata : dict
+        content of metadata.json.
+    time : numpy.ndarray
+        time of the simulations [year].
+    variables : list
+        names of the stored variables.
+    parameter_names : list
+        names of the stored constants and initial conditions.
+    n_runs : int
+        capacity of the store, in runs.
+
+    """
+
+    def __init__(self, path, mode="r"):
+        """
+        Opens an existing store.
+
+        Parameters
+        ----------
+        path : str
+            directory of the store.
+        mode : str, optional
+            "r" to read only, "r+" to write. The default is "r".
+
+        """
+        self.path = path
+        with open(os.path.join(path, "metadata.json")) as fjson:
+            self.metadata = json.load(fjson)
+        self.time = np.array(self.metadata["time"])
+        self.variables = self.metadata["variables"]
+        self.parameter_names = self.metadata["parameters"]
+        self.n_runs = self.metadata["n_runs"]
+        self._trajectories = np.load(os.path.join(path, "trajectories.npy"),
+                                     mmap_mode=mode)
+        self._parameters = np.load(os.path.join(path, "parameters.npy"),
+                                   mmap_mode=mode)
+        self._written = np.load(os.path.join(path, "written.npy"),
+                                mmap_mode=mode)
+
+    @classmethod
+    def create(cls, path, n_runs, w2, variables=VARIABLE_NAMES, dtype=None,
+               metadata=None):
+        """
+        Creates an empty store.
+
+        Parameters
+        ----------
+        path : str
+            directory of the store, which must not exist.
+        n_runs : int
+            capacity of the store, in runs.
+        w2 : World2
+            configured simulation, which sets the time and the configuration
+            recorded in the metadata.
+        variables : list, optional
+            names of the variables to store. The default is VARIABLE_NAMES.
+        dtype : numpy.dtype, optional
+            type of the trajectories. The default is None, for w2.dtype.
+        metadata : dict, optional
+            other entries of metadata.json. The default is None.
+
+        Returns
+        -------
+        ResultStore
+            the store, opened to write.
+
+        """
+        dtype = np.dtype(w2.dtype if dtype is None else dtype)
+        parameters = CONSTANT_NAMES + INITIAL_STATE_NAMES
+        os.makedirs(path)
+        np.lib.format.open_memmap(os.path.join(path, "trajectories.npy"),
+                                  mode="w+", dtype=dtype,
+                                  shape=(len(variables), n_runs, w2.n))
+        np.lib.format.open_memmap(os.path.join(path, "parameters.npy"),
+                                  mode="w+", dtype=np.float64,
+                                  shape=(n_runs, len(parameters)))
+        np.lib.format.open_memmap(os.path.join(path, "written.npy"),
+                                  mode="w+", dtype=np.uint8, shape=(n_runs,))
+        with open(os.path.join(path, "next_run"), "w") as fcount:
+            fcount.write("0")
+        metadata = dict(metadata or {})
+        metadata.update({"n_runs": n_runs, "variables": list(variables),
+                         "parameters": parameters, "dtype": dtype.str,
+                         "dt": w2.dt, "time": w2.time.tolist(),
+                         "configuration": w2.get_configuration()})
+        with open(os.path.join(path, "metadata.json"), "w") as fjson:
+            json.dump(metadata, fjson)
+        return cls(path, mode="r+")
+
+    def reserve(self, count, timeout=60, stale_after=10):
+        """
+        Reserves the next count runs of the store, atomically across the
+        processes that share it.
+
+        Parameters
+        ----------
+        count : int
+            number of runs to reserve.
+        timeout : float, optional
+            maximum time to wait for other processes [s]. The default is 60.
+        stale_after : float, optional
+            age of a lock held by a process that may have died, broken by
+            the next process that waits for it [s]. The default is 10.
+
+        Returns
+        -------
+        int
+            index of the first reserved run.
+
+        """
+        lock_file = os.path.join(self.path, "next_run.lock")
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                if _break_stale_lock(lock_file, stale_after):
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{lock_file} is still locked after "
+                                       f"{timeout} s")
+                time.sleep(0.001)
+        os.write(fd, json.dumps({"host": socket.gethostname(),
+                                 "pid": os.getpid(),
+                                 "time": time.time()}).encode())
+        try:
+            with open(os.path.join(self.path, "next_run"), "r+") as fcount:
+                start = int(fcount.read())
+                if start + count > self.n_runs:
+                    raise ValueError(f"cannot reserve {count} runs, "
+                                     f"{self.n_runs - start} are left")
+                fcount.seek(0)
+                fcount.write(str(start + count))
+                fcount.truncate()
+        finally:
+            os.close(fd)
+            os.remove(lock_file)
+        return start
+
+    def write(self, start, w2):
+        """
+        Writes the results of a World2, or of all runs of a World2Ensemble,
+        from the run index start.
+
+        """
+        if w2.n != self.time.size:
+            raise ValueError(f"World2 has {w2.n} time steps, the store "
+                             f"{self.time.size}")
+        self.write_values(start,
+                          [getattr(w2, var_name).T
+                           for var_name in self.variables],
+                          np.array([np.broadcast_to(getattr(w2, name),
+                                                    getattr(w2, "n_runs", 1))
+                                    for name in self.parameter_names]).T)
+
+    def write_values(self, start, trajectories, parameters):
+        """
+        Writes trajectories and parameters of some runs, from the run index
+        start.
+
+        Parameters
+        ----------
+        start : int
+            index of the first run.
+        trajectories : array_like
+            trajectories of each stored variable, of shape (number of
+            variables, number of runs, number of time steps).
+        parameters : array_like
+            constants and initial conditions of each run, of shape (number
+            of runs, number of parameters).
+
+        """
+        count = len(parameters)
+        runs = slice(start, start + count)
+        for i, values in enumerate(trajectories):
+            self._trajectories[i, runs] = values
+        self._parameters[runs] = parameters
+        self._written[runs] = 1
+        self._trajectories.flush()
+        self._parameters.flush()
+        self._written.flush()
+
+    def read(self, variable, runs=None, time_window=None):
+        """
+        Reads the trajectories of one variable, lazily.
+
+        Parameters
+        ----------
+        variable : str
+            name of the variable, e.g. "ql" or "QL".
+        runs : slice or array_like, optional
+            runs to read. The default is None, for all runs.
+        time_window : tuple, optional
+            first and last years to read. The default is None, for all time.
+
+        Returns
+        -------
+        numpy.ndarray
+            memory-mapped trajectories, of shape (number of runs, number of
+            time steps).
+
+        """
+        i = self.variables.index(variable.lower())
+        k_min, k_max = 0, self.time.size
+        if time_window is not None:
+            k_min = np.searchsorted(self.time, time_window[0], side="left")
+            k_max = np.searchsorted(self.time, time_window[1], side="right")
+        if runs is None:
+            runs = slice(None)
+        return self._trajectories[i, runs, k_min:k_max]
+
+    def read_parameters(self, runs=None):
+        """
+        Reads the constants and initial conditions of some runs, by name.
+
+        """
+        if runs is None:
+            runs = slice(None)
+        return {name: self._parameters[runs, i]
+                for i, name in enumerate(self.parameter_names)}
+
+    @property
+    def written(self):
+        """
+        Flags of the runs written so far.
+
+        """
+        return self._written.astype(bool)
+
+
+def _break_stale_lock(lock_file, stale_after):
+    """
+    Removes a lock created more than stale_after seconds ago, by a process
+    that may have died while holding it.
+
+    Returns
+    -------
+    bool
+        True if the lock was removed.
+
+    """
+    try:
+        with open(lock_file) as flock:
+            claim = flock.read()
+        claimed = json.loads(claim)["time"] if claim else None
+        if claimed is None:
+            # still being written, or written by a process that died first
+            claimed = os.stat(lock_file).st_mtime
+        if time.time() - claimed <= stale_after:
+            return False
+        # moved aside first, so that only one of the waiting processes
+        # breaks it, and a lock taken meanwhile is put back
+        stale_file = f"{lock_file}.{os.getpid()}.stale"
+        os.rename(lock_file, stale_file)
+        with open(stale_file) as flock:
+            if flock.read() != claim:
+                try:
+                    os.link(stale_file, lock_file)
+                except FileExistsError:
+                    pass
+                os.remove(stale_file)
+                return False
+        os.remove(stale_file)
+        return True
+    except (OSError, ValueError, KeyError):
+        return False
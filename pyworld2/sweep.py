@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+"""
+Sweeps of World2 over many machines, coordinated only through a shared
+directory: no scheduler, no network service.
+
+A sweep samples constants and initial conditions uniformly within bounds,
+for each of some scenarios (configurations that override the base one, e.g.
+switch functions). Its runs are split into shards of fixed size, numbered
+scenario by scenario. The samples of a shard follow from the seed of the
+sweep and the shard index only, so that any shard can be run again, on any
+machine, with the same result.
+
+The directory of a sweep holds:
+
+    - sweep.json: base configuration, scenarios, bounds, seed and sizes,
+
+    - shards/<i>.lock: claim of shard i by a worker, created exclusively
+      (O_EXCL), with the host, pid and time of the claim,
+
+    - shards/<i>.npz: output of shard i, written aside then renamed,
+
+    - shards/<i>.failed: traceback of a failed shard, until retried.
+
+Workers are independent processes that claim, run and write shards until
+none is left. A merge then gathers all outputs into one ResultStore.
+
+Examples
+--------
+>>> sweep = Sweep.create("sweep", w2, {"pols": (3e9, 5e9)}, n_samples=10000,
+...                      shard_size=500, seed=0)
+>>> # on each machine, as many times as cores:
+>>> run_worker("sweep")        # or: pyworld2 sweep worker sweep
+>>> Sweep("sweep").status()    # or: pyworld2 sweep status sweep
+>>> Sweep("sweep").update_scenario(1, scenario)  # fixes a scenario
+>>> Sweep("sweep").retry()     # failed shards are claimed again
+>>> store = Sweep("sweep").merge("results")
+
+"""
+import json
+import os
+import socket
+import tempfile
+import time
+import traceback
+
+import numpy as np
+
+from .ensemble import World2Ensemble
+from .store import ResultStore
+from .world2 import (CONSTANT_NAMES, INITIAL_STATE_NAMES, VARIABLE_NAMES,
+                     World2)
+
+SHARD_STATES = ["pending", "running", "done", "failed"]
+
+
+class Sweep:
+    """
+    Sweep of World2 in a shared directory.
+
+    Attributes
+    ----------
+    path : str
+        directory of the sweep.
+    spec : dict
+        content of sweep.json.
+    names : list
+        names of the sampled constants and initial conditions.
+    n_shards : int
+        number of shards.
+
+    """
+
+    def __init__(self, path):
+        """
+        Opens an existing sweep.
+
+        """
+        self.path = path
+        with open(os.path.join(path, "sweep.json")) as fjson:
+            self.spec = json.load(fjson)
+        self.names = list(self.spec["bounds"])
+        self._shards_per_scenario = -(-self.spec["n_samples"] //
+                                      self.spec["shard_size"])
+        self.n_shards = (self._shards_per_scenario *
+                         len(self.spec["scenarios"]))
+
+    @classmethod
+    def create(cls, path, w2, bounds, n_samples, shard_size=100, seed=0,
+               scenarios=None, variables=VARIABLE_NAMES):
+        """
+        Creates a sweep.
+
+        Parameters
+        ----------
+        path : str
+            directory of the sweep, which must not exist.
+        w2 : World2
+            base simulation, with constants, initial state, table and switch
+            functions set.
+        bounds : dict
+            lower and upper bounds of each sampled parameter, by name of
+            CONSTANT_NAMES or INITIAL_STATE_NAMES.
+        n_samples : int
+            number of samples per scenario.
+        shard_size : int, optional
+            number of runs per shard. The default is 100.
+        seed : int, optional
+            seed of the sweep. The default is 0.
+        scenarios : list, optional
+            configurations overriding the base one, each with some keys of
+            World2.from_configuration among "state_variables",
+            "initial_state", "table_functions" and "switch_functions". Paths
+            to json files are read now. The default is None, for the base
+            configuration only.
+        variables : list, optional
+            names of the stored variables. The default is VARIABLE_NAMES.
+
+        Returns
+        -------
+        Sweep
+
+        """
+        unknown = set(bounds) - set(CONSTANT_NAMES + INITIAL_STATE_NAMES)
+        if unknown:
+            raise ValueError(f"unknown parameters {sorted(unknown)}, "
+                             "expected constants or initial conditions")
+        scenarios = [{}] if scenarios is None else list(scenarios)
+        scenarios = [_read_scenario(scenario) for scenario in scenarios]
+        spec = {"configuration": w2.get_configuration(),
+                "scenarios": scenarios,
+                "bounds": {name: [float(low), float(high)]
+                           for name, (low, high) in bounds.items()},
+                "n_samples": int(n_samples), "shard_size": int(shard_size),
+                "seed": int(seed), "variables": list(variables)}
+        os.makedirs(os.path.join(path, "shards"))
+        _write_atomic(os.path.join(path, "sweep.json"),
+                      lambda fjson: fjson.write(json.dumps(spec).encode()))
+        return cls(path)
+
+    def update_scenario(self, j, scenario):
+        """
+        Replaces scenario j, e.g. to fix a configuration whose shards
+        failed, and rewrites sweep.json atomically so that all workers read
+        it. Shards already done keep their output: retry only those that
+        failed.
+
+        Parameters
+        ----------
+        j : int
+            index of the scenario.
+        scenario : dict
+            configuration overriding the base one, as in create.
+
+        """
+        if not 0 <= j < len(self.spec["scenarios"]):
+            raise IndexError(f"scenario {j} out of "
+                             f"range({len(self.spec['scenarios'])})")
+        self.spec["scenarios"][j] = _read_scenario(scenario)
+        spec = json.dumps(self.spec).encode()
+        _write_atomic(os.path.join(self.path, "sweep.json"),
+                      lambda fjson: fjson.write(spec))
+
+    def shard_runs(self, i):
+        """
+        Returns the scenario, the first sample in the scenario and the
+        number of runs of shard i.
+
+        """
+        if not 0 <= i < self.n_shards:
+            raise IndexError(f"shard {i} out of range({self.n_shards})")
+        scenario, j = divmod(i, self._shards_per_scenario)
+        start = j * self.spec["shard_size"]
+        count = min(self.spec["shard_size"], self.spec["n_samples"] - start)
+        return scenario, start, count
+
+    def shard_samples(self, i):
+        """
+        Draws the samples of shard i, from the seed of the sweep and i.
+
+        Returns
+        -------
+        numpy.ndarray
+            samples of shape (number of runs, len(names)).
+
+        """
+        _, _, count = self.shard_runs(i)
+        low, high = np.array(list(self.spec["bounds"].values()),
+                             dtype=float).reshape(-1, 2).T
+        rng = np.random.default_rng([self.spec["seed"], i])
+        return low + rng.random((count, len(self.names))) * (high - low)
+
+    def build_shard(self, i):
+        """
+        Builds the World2Ensemble of shard i, ready to run.
+
+        """
+        scenario, _, count = self.shard_runs(i)
+        config = dict(self.spec["configuration"])
+        for key, value in self.spec["scenarios"][scenario].items():
+            if key in ["state_variables", "initial_state"]:
+                value = dict(config[key], **value)
+            config[key] = value
+        samples = self.shard_samples(i)
+        for j, name in enumerate(self.names):
+            key = ("state_variables" if name in CONSTANT_NAMES else
+                   "initial_state")
+            config[key] = dict(config[key], **{name: samples[:, j]})
+        w2 = World2Ensemble(count, config["year_min"], config["year_max"],
+                            config["dt"], config.get("dtype", "float64"),
+                            config.get("stride", 1))
+        w2.set_state_variables(**config["state_variables"])
+        w2.set_initial_state(**config["initial_state"])
+        w2.set_table_functions(config["table_functions"])
+        w2.set_switch_functions(config["switch_functions"])
+        return w2
+
+    def run_shard(self, i):
+        """
+        Runs shard i and writes its output.
+
+        """
+        w2 = self.build_shard(i)
+        with np.errstate(all="ignore"):
+            w2.run()
+        parameters = np.array([np.broadcast_to(getattr(w2, name), w2.n_runs)
+                               for name in CONSTANT_NAMES +
+                               INITIAL_STATE_NAMES]).T
+        trajectories = np.array([getattr(w2, var_name).T
+                                 for var_name in self.spec["variables"]])
+        _write_atomic(self._file(i, "npz"),
+                      lambda fnpz: np.savez(fnpz, trajectories=trajectories,
+                                            parameters=parameters))
+
+    def claim(self, i):
+        """
+        Claims shard i for this process, unless it is done, failed or
+        claimed by another one.
+
+        Returns
+        -------
+        bool
+            True if claimed.
+
+        """
+        if (os.path.exists(self._file(i, "npz")) or
+                os.path.exists(self._file(i, "failed"))):
+            return False
+        try:
+            fd = os.open(self._file(i, "lock"),
+                         os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as flock:
+            json.dump({"host": socket.gethostname(), "pid": os.getpid(),
+                       "time": time.time()}, flock)
+        # done or failed by another worker between the check and the claim
+        if (os.path.exists(self._file(i, "npz")) or
+                os.path.exists(self._file(i, "failed"))):
+            os.remove(self._file(i, "lock"))
+            return False
+        return True
+
+    def run_worker(self, max_shards=None):
+        """
+        Claims and runs shards until none is left, or max_shards are done.
+        A shard that raises is marked failed with its traceback, and the
+        worker goes on.
+
+        Returns
+        -------
+        list
+            indices of the shards run, failed ones included.
+
+        """
+        shards = []
+        for i in range(self.n_shards):
+            if max_shards is not None and len(shards) >= max_shards:
+                break
+            if not self.claim(i):
+                continue
+            try:
+                self.run_shard(i)
+            except Exception:
+                error = traceback.format_exc().encode()
+                _write_atomic(self._file(i, "failed"),
+                              lambda ferror: ferror.write(error))
+            finally:
+                os.remove(self._file(i, "lock"))
+            shards.append(i)
+        return shards
+
+    def status(self):
+        """
+        Returns the progress of the sweep.
+
+        Returns
+        -------
+        dict
+            number of shards in each state of SHARD_STATES, "n_shards", and
+            "shards": the state of each shard, with the host and pid of the
+            workers running shards.
+
+        """
+        files = set(os.listdir(os.path.join(self.path, "shards")))
+        shards = []
+        for i in range(self.n_shards):
+            if f"{i}.npz" in files:
+                shard = {"state": "done"}
+            elif f"{i}.failed" in files:
+                shard = {"state": "failed"}
+            elif f"{i}.lock" in files:
+                shard = {"state": "running"}
+                try:
+                    with open(self._file(i, "lock")) as flock:
+                        shard.update(json.load(flock))
+                except (OSError, ValueError):
+                    # released, or being written
+                    pass
+            else:
+                shard = {"state": "pending"}
+            shards.append(shard)
+        status = {state: sum(shard["state"] == state for shard in shards)
+                  for state in SHARD_STATES}
+        status.update(n_shards=self.n_shards, shards=shards)
+        return status
+
+    def retry(self, stale_after=None):
+        """
+        Makes failed shards pending again, and optionally shards claimed for
+        too long by workers that may have died. A shard run twice writes the
+        same output.
+
+        Parameters
+        ----------
+        stale_after : float, optional
+            age of the claims released [s]. The default is None, to keep all
+            claims.
+
+        Returns
+        -------
+        list
+            indices of the shards made pending.
+
+        """
+        shards = []
+        for i in range(self.n_shards):
+            try:
+                os.remove(self._file(i, "failed"))
+                shards.append(i)
+            except FileNotFoundError:
+                pass
+            if stale_after is not None:
+                try:
+                    with open(self._file(i, "lock")) as flock:
+                        claimed = json.load(flock)["time"]
+                    if time.time() - claimed > stale_after:
+                        os.remove(self._file(i, "lock"))
+                        shards.append(i)
+                except (OSError, ValueError, KeyError):
+                    pass
+        return shards
+
+    def merge(self, store_path):
+        """
+        Gathers the outputs of all shards into a new ResultStore, run by run
+        in the order of the shards. Run r belongs to the scenario r //
+        n_samples, recorded in the "sweep" entry of its metadata.
+
+        Returns
+        -------
+        ResultStore
+
+        """
+        missing = [i for i in range(self.n_shards)
+                   if not os.path.exists(self._file(i, "npz"))]
+        if missing:
+            raise ValueError(f"shards {missing} are not done, see status")
+        store = ResultStore.create(
+            store_path, len(self.spec["scenarios"]) * self.spec["n_samples"],
+            World2.from_configuration(self.spec["configuration"]),
+            self.spec["variables"],
+            metadata={"sweep": {key: self.spec[key] for key in
+                                ["scenarios", "bounds", "n_samples",
+                                 "seed"]}})
+        start = 0
+        for i in range(self.n_shards):
+            with np.load(self._file(i, "npz")) as output:
+                store.write_values(start, output["trajectories"],
+                                   output["parameters"])
+                start += len(output["parameters"])
+        return store
+
+    def _file(self, i, extension):
+        return os.path.join(self.path, "shards", f"{i}.{extension}")
+
+
+def run_worker(path, max_shards=None):
+    """
+    Runs shards of the sweep in path until none is left, see
+    Sweep.run_worker.
+
+    """
+    return Sweep(path).run_worker(max_shards)
+
+
+def _read_scenario(scenario):
+    """
+    Checks the keys of a scenario, and reads the json files it points to.
+
+    """
+    scenario = dict(scenario)
+    for key, value in scenario.items():
+        if key not in ["state_variables", "initial_state",
+                       "table_functions", "switch_functions"]:
+            raise ValueError(f"unknown key {key!r} in scenario")
+        if isinstance(value, str):
+            with open(value) as fjson:
+                scenario[key] = json.load(fjson)
+    return scenario
+
+
+def _write_atomic(file_name, write):
+    """
+    Writes a file with write(file) aside then renames it, so that readers of
+    the shared directory never see it partially written.
+
+    """
+    fd, tmp_name = tempfile.mkstemp(suffix=".tmp",
+                                    dir=os.path.dirname(file_name))
+    with os.fdopen(fd, "wb") as ftmp:
+        write(ftmp)
+    os.replace(tmp_name, file_name)
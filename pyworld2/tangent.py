@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Forward-mode (tangent-linear) sensitivities of World2 to its constants and
+initial conditions, propagated along the Euler scheme of the model in one
+pass.
+
+The model equations of World2.auxiliaries are evaluated on dual numbers,
+which carry the gradient of each value with respect to all parameters at
+once. Table functions contribute the exact slope of their segment, and
+switch functions, which do not depend on the parameters, contribute none.
+
+Examples
+--------
+>>> w2 = World2()
+>>> w2.set_all_standard()
+>>> w2.run(sensitivities=True)
+>>> i = PARAMETER_NAMES.index("pols")
+>>> w2.sensitivities["ql"][-1, i]     # d QL(2100) / d POLS
+
+"""
+import copy
+
+import numpy as np
+
+from .config import SWITCH_NAMES, TABLE_NAMES
+from .world2 import (CONSTANT_NAMES, INITIAL_STATE_NAMES, STATE_NAMES,
+                     VARIABLE_NAMES)
+
+PARAMETER_NAMES = CONSTANT_NAMES + INITIAL_STATE_NAMES
+# rates of the Euler scheme at k are computed from the state at k - 1
+RATE_NAMES = ["br", "dr", "nrur", "cid", "cig", "polg", "pola"]
+
+
+class Dual:
+    """
+    Dual number: a value and its gradient with respect to the parameters.
+
+    """
+    __slots__ = ("value", "grad")
+
+    def __init__(self, value, grad):
+        self.value = value
+        self.grad = grad
+
+    def __add__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value + other.value, self.grad + other.grad)
+        return Dual(self.value + other, self.grad)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value - other.value, self.grad - other.grad)
+        return Dual(self.value - other, self.grad)
+
+    def __rsub__(self, other):
+        return Dual(other - self.value, -self.grad)
+
+    def __neg__(self):
+        return Dual(-self.value, -self.grad)
+
+    def __mul__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value * other.value,
+                        self.grad * other.value + other.grad * self.value)
+        return Dual(self.value * other, self.grad * other)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value / other.value,
+                        (self.grad * other.value - other.grad * self.value) /
+                        (other.value * other.value))
+        return Dual(self.value / other, self.grad / other)
+
+    def __rtruediv__(self, other):
+        return Dual(other / self.value,
+                    -other * self.grad / (self.value * self.value))
+
+
+class TangentTable:
+    """
+    Class helper. Wraps a table function to evaluate it on dual numbers.
+
+    """
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, x):
+        if isinstance(x, Dual):
+            return Dual(self.func(x.value), self.func.slope(x.value) * x.grad)
+        return self.func(x)
+
+
+def run_tangent(w2):
+    """
+    Propagates the sensitivities of all model vectors along a run of World2,
+    linearized around its trajectory.
+
+    Parameters
+    ----------
+    w2 : World2
+        single simulation after its run with the Euler method.
+
+    Returns
+    -------
+    dict
+        sensitivities of each model vector, by name of VARIABLE_NAMES, of
+        shape (n, len(PARAMETER_NAMES)). Column i holds the derivatives with
+        respect to PARAMETER_NAMES[i].
+
+    """
+    if w2.p.ndim != 1:
+        raise ValueError("sensitivities are computed for single simulations "
+                         "only")
+    n_params = len(PARAMETER_NAMES)
+    dual = copy.copy(w2)
+    for i, name in enumerate(PARAMETER_NAMES):
+        grad = np.zeros(n_params)
+        grad[i] = 1.
+        setattr(dual, name, Dual(float(getattr(w2, name)), grad))
+    for func_name in TABLE_NAMES:
+        setattr(dual, func_name.lower(),
+                TangentTable(getattr(w2, func_name.lower())))
+
+    sensitivities = {var_name: np.full((w2.n, n_params), np.nan)
+                     for var_name in VARIABLE_NAMES}
+    state_grads = [getattr(dual, name).grad
+                   for name in INITIAL_STATE_NAMES]
+    for k in range(w2.n):
+        state = [Dual(float(getattr(w2, var_name)[k]), grad)
+                 for var_name, grad in zip(STATE_NAMES, state_grads)]
+        switches = {func_name.lower():
+                    getattr(w2, f"{func_name.lower()}_values")[k]
+                    for func_name in SWITCH_NAMES}
+        var = dual.auxiliaries(state, switches)
+        for var_name in VARIABLE_NAMES:
+            if var_name not in RATE_NAMES:
+                sensitivities[var_name][k] = var[var_name].grad
+        if k == w2.n - 1:
+            break
+        for var_name in RATE_NAMES:
+            sensitivities[var_name][k + 1] = var[var_name].grad
+        derivatives = [var["br"] - var["dr"], -var["nrur"],
+                       var["cig"] - var["cid"], var["polg"] - var["pola"],
+                       var["dciaf"]]
+        state_grads = [x.grad + w2.dt * dx.grad
+                       for x, dx in zip(state, derivatives)]
+    return sensitivities
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from .cache import ResultCache
+from .ensemble import World2Ensemble
+from .utils import TableFunction
+from .world2 import World2
+
+
+def test_result_cache(tmp_path):
+    """
+    Testing function: cached runs match uncached ones, keys follow the
+    configuration, and the directory stays under its size cap.
+
+    """
+    w2 = World2()
+    w2.set_all_standard()
+    w2.run()
+    reference = w2.trajectories.copy()
+
+    cache = ResultCache(tmp_path, max_bytes=400000)
+    cached = World2()
+    cached.set_all_standard()
+    cached.run(cache=cache)
+    cached.run(cache=cache)
+    assert cache.stats["misses"] == 1 and cache.stats["hits"] == 1
+    assert np.array_equal(cached.trajectories, reference, equal_nan=True)
+
+    # another process, from disk
+    other = ResultCache(tmp_path)
+    cached.run(cache=other)
+    assert other.stats["disk_hits"] == 1
+    assert np.array_equal(cached.ql, w2.ql, equal_nan=True)
+
+    key = cache.key(w2)
+    qlc = w2.qlc
+    w2.qlc = TableFunction(qlc.x, qlc.y + 0.1)
+    assert cache.key(w2) != key
+    w2.qlc = qlc
+    w2.nrun.trigger_value = 1971
+    assert cache.key(w2) != key
+    w2.nrun.trigger_value = 1970
+    assert cache.key(w2) == key != cache.key(w2, method="rk45")
+    # numpy-valued options hash as their Python values
+    assert (cache.key(w2, method="rk4", h=np.float32(1.)) ==
+            cache.key(w2, method="rk4", h=1.))
+    assert (cache.key(w2, method="rk45", atol=np.array([1e-3, 1e-6])) ==
+            cache.key(w2, method="rk45", atol=[1e-3, 1e-6]))
+
+    for pols in [3e9, 3.2e9, 3.4e9]:
+        cached.pols = pols
+        cached.run(cache=cache)
+    assert cache.stats["evictions"] > 0
+    assert 0 < cache.disk_usage() <= cache.max_bytes
+
+
+def test_result_cache_ensemble_sizes():
+    """
+    Testing function: ensembles of different sizes get different keys, and
+    run one after the other against the same cache.
+
+    """
+    cache = ResultCache()
+    for n_runs in [3, 5, 3]:
+        w2 = World2Ensemble(n_runs)
+        w2.set_all_standard()
+        w2.run(cache=cache)
+        assert w2.trajectories.shape[-1] == n_runs
+    assert cache.stats["misses"] == 2 and cache.stats["hits"] == 1
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+import numpy as np
+
+from .cli import main
+from .world2 import World2
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), "..", "examples")
+
+
+def test_run_manifest(tmp_path):
+    """
+    Testing function: the run command saves trajectories and summaries of
+    the scenarios of a manifest.
+
+    """
+    with open(os.path.join(EXAMPLES, "manifest.json")) as fjson:
+        scenarios = json.load(fjson)[2:4]
+    for scenario in scenarios:
+        for key in ["table_functions", "switch_functions"]:
+            if key in scenario:
+                scenario[key] = os.path.join(EXAMPLES, scenario[key])
+    manifest = os.path.join(tmp_path, "manifest.json")
+    with open(manifest, "w") as fjson:
+        json.dump(scenarios, fjson)
+
+    output = os.path.join(tmp_path, "results")
+    assert main(["run", manifest, "-o", output, "-j", "1"]) == 0
+
+    with open(os.path.join(output, "summary.json")) as fjson:
+        summaries = json.load(fjson)
+    assert [summary["name"] for summary in summaries] == ["scenario_3",
+                                                          "scenario_4"]
+    w2 = World2.from_configuration(scenarios[1])
+    w2.run()
+    results = np.load(os.path.join(output, "scenario_4.npz"))
+    assert np.array_equal(results["ql"], w2.ql, equal_nan=True)
+    assert summaries[1]["final"]["QL"] == w2.ql[-1]
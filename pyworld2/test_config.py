@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from . import config
+from .world2 import World2
+
+SCENARIOS = os.path.join(os.path.dirname(__file__), "..", "examples",
+                         "scenarios")
+
+
+def test_registry(tmp_path):
+    """
+    Testing function: a configuration file is compiled once, until it is
+    modified, and incomplete files are rejected.
+
+    """
+    json_file = os.path.join(tmp_path, "functions_table.json")
+    with open(config.DEFAULT_TABLE_FILE) as fjson:
+        tables = json.load(fjson)
+    with open(json_file, "w") as fjson:
+        json.dump(tables, fjson)
+
+    functions = config.load_table_functions(json_file)
+    assert config.load_table_functions(json_file) is functions
+    w2, w2_other = World2(), World2()
+    w2.set_table_functions(json_file)
+    w2_other.set_table_functions(json_file)
+    assert w2.brmm is w2_other.brmm
+
+    with open(json_file, "w") as fjson:
+        json.dump(tables[1:], fjson)
+    os.utime(json_file, ns=(0, 0))
+    with pytest.raises(ValueError, match="missing table functions"):
+        config.load_table_functions(json_file)
+
+
+def test_switch_functions_per_instance(tmp_path):
+    """
+    Testing function: switch functions loaded from the same file, including
+    multi-stage schedules, are modified in place per instance only.
+
+    """
+    json_file = os.path.join(tmp_path, "functions_switch.json")
+    with open(config.DEFAULT_SWITCH_FILE) as fjson:
+        switches = json.load(fjson)
+    for switch in switches:
+        if "NRUN" in switch:
+            switch.update({"NRUN1": 0.5, "NRUN2": 0.25,
+                           "trigger.value": [1970, 2000]})
+    with open(json_file, "w") as fjson:
+        json.dump(switches, fjson)
+
+    w2 = World2()
+    w2.set_switch_functions(json_file)
+    w2.nrun.values[1] = 0.1
+    w2.nrun.trigger_values[0] = 1980
+    w2.brn.value_after_switch = 0.03
+    w2_other = World2()
+    w2_other.set_switch_functions(json_file)
+    assert w2_other.nrun.values == [1, 0.5, 0.25]
+    assert w2_other.nrun.trigger_values == [1970, 2000]
+    assert w2_other.brn.value_after_switch == 0.04
+
+    w2_fork = w2_other.fork()
+    w2_fork.nrun.values[1] = 0.1
+    assert w2_other.nrun.values == [1, 0.5, 0.25]
+
+
+def test_bundle(tmp_path):
+    """
+    Testing function: a bundle of the example scenarios gives the same
+    functions as the scenario files.
+
+    """
+    bundle_file = os.path.join(tmp_path, "scenarios.json")
+    config.bundle_scenarios(SCENARIOS, bundle_file)
+    bundle = config.load_bundle(bundle_file)
+    assert len(bundle) == len(os.listdir(SCENARIOS))
+
+    name = "functions_switch_scenario_2.json"
+    w2, w2_ref = World2(), World2()
+    w2.set_switch_functions(bundle[name])
+    w2_ref.set_switch_functions(os.path.join(SCENARIOS, name))
+    assert np.array_equal(w2.nrun.sample(w2.time), w2_ref.nrun.sample(w2.time))
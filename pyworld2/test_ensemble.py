@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from .config import DEFAULT_SWITCH_FILE
+from .ensemble import World2Ensemble
+from .utils import Schedule
+from .world2 import World2
+
+
+def test_ensemble_matches_single_runs():
+    """
+    Testing function: each run of an ensemble matches the same configuration
+    run alone with World2.
+
+    """
+    pols = [3.6e9, 4e9, 5e9]
+    pi = [1.65e9, 1.65e9, 1.2e9]
+    nrun1 = [1, 0.5, 0.25]
+    trigger = [1970, 1970, 2000]
+
+    w2_ens = World2Ensemble(3)
+    w2_ens.set_state_variables(pols=pols)
+    w2_ens.set_initial_state(pi=pi)
+    w2_ens.set_table_functions()
+    w2_ens.set_switch_functions()
+    w2_ens.set_switch_function("NRUN", value_after_switch=nrun1,
+                               trigger_value=trigger)
+    w2_ens.run()
+
+    for i in range(3):
+        w2 = World2()
+        w2.set_state_variables(pols=pols[i])
+        w2.set_initial_state(pi=pi[i])
+        w2.set_table_functions()
+        w2.set_switch_functions()
+        w2.nrun.value_after_switch = nrun1[i]
+        w2.nrun.trigger_value = trigger[i]
+        w2.run()
+        for var in ["p", "nr", "ci", "pol", "ciaf", "ql"]:
+            assert np.allclose(getattr(w2_ens, var)[:, i], getattr(w2, var),
+                               rtol=1e-10, equal_nan=True), var
+
+
+def test_ensemble_multi_stage_switch(tmp_path):
+    """
+    Testing function: a multi-stage switch function from a configuration
+    file cannot be overridden with set_switch_function, and runs per run as
+    a Schedule of arrays.
+
+    """
+    json_file = os.path.join(tmp_path, "functions_switch.json")
+    with open(DEFAULT_SWITCH_FILE) as fjson:
+        switches = json.load(fjson)
+    for switch in switches:
+        if "NRUN" in switch:
+            switch.update({"NRUN1": 0.5, "NRUN2": 0.25,
+                           "trigger.value": [1970, 2000]})
+    with open(json_file, "w") as fjson:
+        json.dump(switches, fjson)
+
+    w2_ens = World2Ensemble(2)
+    w2_ens.set_state_variables()
+    w2_ens.set_initial_state()
+    w2_ens.set_table_functions()
+    w2_ens.set_switch_functions(json_file)
+    with pytest.raises(ValueError, match="multi-stage Schedule"):
+        w2_ens.set_switch_function("NRUN", value_after_switch=[1, 0.5])
+    w2_ens.nrun = Schedule([1, np.array([0.5, 0.8]), 0.25], [1970, 2000])
+    w2_ens.run()
+
+    w2 = World2()
+    w2.set_state_variables()
+    w2.set_initial_state()
+    w2.set_table_functions()
+    w2.set_switch_functions(json_file)
+    w2.run()
+    assert np.allclose(w2_ens.ql[:, 0], w2.ql, rtol=1e-10, equal_nan=True)
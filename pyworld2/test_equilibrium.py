@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from .equilibrium import find_equilibrium, state_jacobian, switch_values
+from .world2 import World2
+
+
+def test_equilibrium():
+    """
+    Testing function: without use of natural resources, the model has a
+    stable equilibrium, with the exact Jacobian, where a run started after
+    the switch years stays.
+
+    """
+    w2 = World2(year_min=2000, year_max=2200)
+    w2.set_all_standard()
+    w2.nrun.value_after_switch = 0.
+    eq = find_equilibrium(w2)
+    assert eq.converged and eq.stable
+    assert eq.residual < 1e-10
+
+    state = np.array(list(eq.state.values()))
+    derivatives, jacobian = state_jacobian(w2, state, switch_values(w2))
+    h = 1e-6 * state
+    for j in range(len(state)):
+        up, down = state.copy(), state.copy()
+        up[j] += h[j]
+        down[j] -= h[j]
+        np.testing.assert_allclose(
+            (w2.derivatives(np.inf, up) - w2.derivatives(np.inf, down)) /
+            (2 * h[j]), jacobian[:, j], rtol=1e-6, atol=1e-12)
+
+    w2.set_initial_state(*state)
+    w2.run()
+    for var_name, value in eq.state.items():
+        assert np.isclose(getattr(w2, var_name)[-1], value, rtol=1e-9)
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+import json
+import subprocess
+import sys
+
+# time to import pyworld2 once numpy is loaded [s]
+IMPORT_TIME_BUDGET = 0.25
+FORBIDDEN_MODULES = ["matplotlib", "scipy", "numba"]
+
+
+def test_headless_import():
+    """
+    Testing function: importing pyworld2 and running World2 loads neither
+    plotting nor scipy, within the import time budget.
+
+    """
+    code = ("import json, sys, time\n"
+            "import numpy\n"
+            "t_start = time.perf_counter()\n"
+            "import pyworld2\n"
+            "t_import = time.perf_counter() - t_start\n"
+            "w2 = pyworld2.World2()\n"
+            "w2.set_all_standard()\n"
+            "w2.run()\n"
+            "print(json.dumps({'time': t_import,\n"
+            "                  'modules': sorted(sys.modules)}))\n")
+    output = json.loads(subprocess.check_output([sys.executable, "-c", code]))
+    loaded = {module.split(".")[0] for module in output["modules"]}
+    assert not loaded & set(FORBIDDEN_MODULES)
+    assert output["time"] < IMPORT_TIME_BUDGET
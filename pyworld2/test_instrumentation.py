@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import numpy as np
+
+from .instrumentation import CountingTable, Instrumentation
+from .world2 import STEP_GROUPS, World2
+
+
+def test_instrumentation(tmp_path):
+    """
+    Testing function: an instrumented run counts steps and function calls,
+    matches a plain run, and leaves the instance as it was once detached.
+
+    """
+    w2_ref = World2()
+    w2_ref.set_all_standard()
+    w2_ref.run()
+
+    w2 = World2()
+    w2.set_all_standard()
+    steps = []
+    with Instrumentation(w2, callbacks=[lambda w2, k: steps.append(k)]) as ins:
+        w2.run()
+    assert np.array_equal(w2.trajectories, w2_ref.trajectories,
+                          equal_nan=True)
+    assert steps == list(range(w2.n))
+
+    report = ins.report()
+    assert report["n_steps"] == w2.n - 1
+    assert set(report["groups"]) == set(["init"] + STEP_GROUPS)
+    assert report["table_calls"]["QLM"] == 2 * (w2.n - 1)
+    # step_init reads FC too
+    assert report["switch_reads"]["FC"] == w2.n
+    assert report["first_nan"] is None
+    ins.to_json(tmp_path / "report.json")
+    with open(tmp_path / "report.json") as fjson:
+        assert json.load(fjson)["n_steps"] == w2.n - 1
+
+    assert "step" not in vars(w2)
+    assert not isinstance(w2.qlm, CountingTable)
+    assert isinstance(w2.fc_values, np.ndarray)
+
+
+def test_first_nan():
+    """
+    Testing function: the first step producing a NaN is reported.
+
+    """
+    w2 = World2()
+    w2.set_all_standard()
+    w2.set_initial_state(ciafi=np.nan)
+    with Instrumentation(w2) as ins:
+        w2.run()
+    assert ins.first_nan["k"] == 1
+    assert "ciaf" in ins.first_nan["variables"]
+
+
+def test_instrumentation_stride():
+    """
+    Testing function: with stride > 1, the moving window is instrumented,
+    callbacks see every integration step and the first NaN is reported at
+    its integration step.
+
+    """
+    w2_ref = World2(stride=5)
+    w2_ref.set_all_standard()
+    w2_ref.run()
+
+    w2 = World2(stride=5)
+    w2.set_all_standard()
+    steps = []
+    with Instrumentation(w2, callbacks=[lambda w2, k: steps.append(k)]) as ins:
+        w2.run()
+    assert np.array_equal(w2.trajectories, w2_ref.trajectories,
+                          equal_nan=True)
+    assert steps == list(range(w2.n_steps + 1))
+    assert ins.report()["n_steps"] == w2.n_steps
+    assert type(w2) is World2
+
+    w2.set_initial_state(ciafi=np.nan)
+    with Instrumentation(w2) as ins:
+        w2.run()
+    assert ins.first_nan["k"] == 1
+    assert np.isclose(ins.first_nan["time"], 1900.2)
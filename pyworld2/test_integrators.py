@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from .integrators import error_report
+from .world2 import World2
+
+
+def test_euler_method():
+    """
+    Testing function: the "euler" method is the Euler scheme of step.
+
+    """
+    w2_ref = World2()
+    w2_ref.set_all_standard()
+    w2_ref.run()
+
+    w2 = World2()
+    w2.set_all_standard()
+    w2.run(method="euler")
+    assert np.array_equal(w2.trajectories, w2_ref.trajectories,
+                          equal_nan=True)
+    assert w2.integration_stats["n_evaluations"] == w2.n - 1
+
+
+def test_higher_order_methods():
+    """
+    Testing function: RK4 and the adaptive pair are 5 times more accurate
+    than the Euler scheme at dt = 0.2, with fewer evaluations.
+
+    """
+    w2 = World2()
+    w2.set_all_standard()
+    w2.run()
+    euler = error_report(w2, reference_dt=0.01)
+
+    for method, options in [("rk4", {"h": 1.}), ("rk45", {"rtol": 1e-4})]:
+        w2.run(method=method, **options)
+        report = error_report(w2, reference_dt=0.01)
+        assert report["n_evaluations"] < euler["n_evaluations"]
+        for var_name, error in report["max_relative_error"].items():
+            assert error < euler["max_relative_error"][var_name] / 5
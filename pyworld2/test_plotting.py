@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import numpy as np
+
+from .ensemble import World2Ensemble
+from .plotting import decimate, render_figures
+
+
+def test_render_figures(tmp_path):
+    """
+    Testing function: ensemble figures are rendered to files by a pool of
+    processes.
+
+    """
+    w2 = World2Ensemble(50)
+    w2.set_all_standard()
+    w2.set_state_variables(pols=np.linspace(3e9, 5e9, 50))
+    w2.run()
+    jobs = [{"fig_file": os.path.join(tmp_path, f"figure_{i}.png"),
+             "time": w2.time, "var_data": [w2.p, w2.polr, w2.ql],
+             "var_names": ["P", "POLR", "QL"], "members": members}
+            for i, members in enumerate([0, 20])]
+    fig_files = render_figures(jobs, n_workers=2)
+    assert fig_files == [job["fig_file"] for job in jobs]
+    assert all(os.path.getsize(fig_file) > 0 for fig_file in fig_files)
+
+
+def test_decimate():
+    """
+    Testing function: decimation keeps both ends of time.
+
+    """
+    time = np.arange(1001)
+    time_dec, data_dec = decimate(time, time * 2, 300)
+    assert time_dec[0] == 0 and time_dec[-1] == 1000
+    assert time_dec.size <= 301
+    assert np.array_equal(data_dec, time_dec * 2)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from .policy import OBJECTIVE_SENSES, non_dominated_sort, search_policies
+from .world2 import World2
+
+
+def test_search_policies(tmp_path):
+    """
+    Testing function: the front is non-dominated, beats the standard run on
+    final QL, and its exported policies reproduce its objectives.
+
+    """
+    bounds = {"NRUN1": (0.25, 1), "NRUN.trigger": (1970, 2000),
+              "POLN1": (0.25, 1)}
+    front = search_policies(bounds, pop_size=16, n_generations=4, seed=0)
+    assert front.n_evaluations <= 16 * 5
+    assert np.all(non_dominated_sort(front.objectives * OBJECTIVE_SENSES)
+                  == 0)
+
+    w2_std = World2()
+    w2_std.set_all_standard()
+    w2_std.run()
+    assert front.objectives[0, 0] > w2_std.ql[-1]
+
+    json_files = front.export(tmp_path)
+    w2 = World2()
+    w2.set_all_standard()
+    w2.set_switch_functions(json_files[0])
+    w2.run()
+    assert np.isclose(w2.ql[-1], front.objectives[0, 0], rtol=1e-10)
+    assert np.isclose(np.nanmax(w2.polr), front.objectives[0, 1],
+                      rtol=1e-10)
+
+
+def test_search_policies_workers():
+    """
+    Testing function: a search split among processes finds the same front
+    as in the current process.
+
+    """
+    bounds = {"NRUN1": (0.25, 1), "POLN1": (0.25, 1)}
+    front = search_policies(bounds, pop_size=8, n_generations=2, seed=1)
+    front_workers = search_policies(bounds, pop_size=8, n_generations=2,
+                                    seed=1, n_workers=2)
+    assert np.array_equal(front_workers.x, front.x)
+    assert np.allclose(front_workers.objectives, front.objectives)
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from .ensemble import World2Ensemble
+from .precision import precision_report
+
+
+def test_float32_standard_run():
+    """
+    Testing function: the standard run in float32 stays within 1e-5 of
+    float64 for all variables, with half the memory.
+
+    """
+    report = precision_report()
+    assert report["memory_ratio"] == 0.5
+    assert max(report["max_relative_error"].values()) < 1e-5
+
+    w2 = World2Ensemble(3, dtype=np.float32)
+    w2.set_all_standard()
+    w2.set_state_variables(pols=[3e9, 3.6e9, 4e9])
+    w2.run()
+    assert w2.trajectories.dtype == np.float32
+    assert w2.pols.dtype == w2.fc_values.dtype == np.float32
+    assert w2.get_configuration()["dtype"] == "float32"
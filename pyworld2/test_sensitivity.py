@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from .sensitivity import run_samples, saltelli_sample, sobol_analysis
+
+
+def test_sobol_analysis():
+    """
+    Testing function: Sobol indices have one row per parameter, and the
+    pollution ratio is driven by the pollution standard, not by land area.
+
+    """
+    bounds = {"pols": (3e9, 4.5e9), "la": (130e6, 140e6)}
+    res = sobol_analysis(bounds, 32, seed=0, year_max=1960, dt=0.5,
+                         n_workers=1)
+    assert res.samples.shape == (32 * 4, 2)
+    assert res.s1["POLR"].shape == (2, res.time.size)
+    assert res.st["POLR"][0, -1] > 0.9
+    assert res.st["POLR"][1, -1] < 0.1
+
+
+def test_run_samples_in_processes():
+    """
+    Testing function: runs spread over a process pool match runs in the
+    current process.
+
+    """
+    names, samples = saltelli_sample({"pi": (1.5e9, 1.8e9)}, 8, seed=1)
+    kwargs = dict(outputs=["P", "QL"], year_max=1950, dt=0.5, chunk_size=10)
+    ref = run_samples(names, samples, n_workers=1, **kwargs)
+    res = run_samples(names, samples, n_workers=2, **kwargs)
+    for output in ["P", "QL"]:
+        assert np.array_equal(res[output], ref[output], equal_nan=True)
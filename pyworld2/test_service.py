@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from .service import SimulationService, decode_result, request_run
+from .world2 import World2
+
+
+def test_service():
+    """
+    Testing function: identical specs in flight run once, and results served
+    on localhost match a direct run.
+
+    """
+    spec = {"state_variables": {"pols": 5e9},
+            "switch_functions": [{"NRUN": 1, "NRUN1": 0.25,
+                                  "trigger.value": 1970}],
+            "variables": ["p", "ql"]}
+
+    async def main():
+        service = SimulationService(port=0, n_workers=2)
+        await service.start()
+        try:
+            results = await asyncio.gather(*[service.run(spec)
+                                             for _ in range(8)])
+            loop = asyncio.get_running_loop()
+            served = await loop.run_in_executor(None, request_run, spec,
+                                                service.host, service.port)
+            with pytest.raises(RuntimeError, match="unknown keys"):
+                await loop.run_in_executor(None, request_run, {"pol": 1},
+                                           service.host, service.port)
+        finally:
+            await service.close()
+        return service.stats, results, served
+
+    stats, results, served = asyncio.run(main())
+    # 8 coalesced requests, the served one, and the invalid one
+    assert stats["runs"] == 3 and stats["coalesced"] == 7
+    assert stats["errors"] == 1
+    assert all(result == results[0] for result in results)
+
+    w2 = World2()
+    w2.set_all_standard()
+    w2.pols = 5e9
+    w2.nrun.value_after_switch = 0.25
+    w2.run()
+    assert np.allclose(served["time"], w2.time)
+    for var_name in ["p", "ql"]:
+        assert np.array_equal(served[var_name], getattr(w2, var_name),
+                              equal_nan=True)
+    assert "nr" not in decode_result(results[0])
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from .ensemble import World2Ensemble
+from .store import ResultStore
+from .world2 import World2
+
+
+def write_ensemble(path, pols):
+    """
+    Runs an ensemble and appends it to a store, as a worker process would.
+
+    """
+    w2 = World2Ensemble(len(pols), year_max=1950)
+    w2.set_state_variables(pols=pols)
+    w2.set_initial_state()
+    w2.set_table_functions()
+    w2.set_switch_functions()
+    w2.run()
+    store = ResultStore(path, mode="r+")
+    start = store.reserve(len(pols))
+    store.write(start, w2)
+
+
+def test_store_concurrent_writes(tmp_path):
+    """
+    Testing function: runs appended by several processes are read back with
+    their parameters, by run and time window.
+
+    """
+    path = os.path.join(tmp_path, "store")
+    w2 = World2(year_max=1950)
+    w2.set_all_standard()
+    ResultStore.create(path, 6, w2)
+
+    pols = [[3e9, 3.5e9, 4e9], [4.5e9, 5e9, 5.5e9]]
+    with ProcessPoolExecutor(2) as pool:
+        list(pool.map(write_ensemble, [path, path], pols))
+
+    store = ResultStore(path)
+    assert store.written.all()
+    pols_stored = store.read_parameters()["pols"]
+    i = int(np.argmin(np.abs(pols_stored - 5e9)))
+    w2.set_state_variables(pols=5e9)
+    w2.run()
+    assert np.allclose(store.read("QL", runs=i), w2.ql, equal_nan=True)
+    window = store.read("p", runs=[i], time_window=(1920, 1930))
+    assert np.array_equal(window, [w2.p[(w2.time >= 1920)
+                                        & (w2.time <= 1930)]])
+
+
+def test_store_stale_lock(tmp_path):
+    """
+    Testing function: a lock left by a process that died is broken after
+    stale_after seconds, and a live one is waited for.
+
+    """
+    path = os.path.join(tmp_path, "store")
+    w2 = World2(year_max=1950)
+    w2.set_all_standard()
+    store = ResultStore.create(path, 6, w2)
+    lock_file = os.path.join(path, "next_run.lock")
+    with open(lock_file, "w") as flock:
+        json.dump({"host": "lost", "pid": 0, "time": time.time()}, flock)
+    with pytest.raises(TimeoutError):
+        store.reserve(2, timeout=0.05)
+
+    with open(lock_file, "w") as flock:
+        json.dump({"host": "lost", "pid": 0, "time": time.time() - 60},
+                  flock)
+    assert store.reserve(2, timeout=0.05) == 0
+    assert store.reserve(2) == 2
+    assert not os.path.exists(lock_file)
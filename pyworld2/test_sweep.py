@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .sweep import Sweep, run_worker
+from .world2 import World2
+
+
+def test_sweep(tmp_path):
+    """
+    Testing function: shards run by several processes merge into a store,
+    each shard can be run again with the same result, and failed or stale
+    shards can be retried.
+
+    """
+    w2 = World2(year_max=1950)
+    w2.set_all_standard()
+    path = os.path.join(tmp_path, "sweep")
+    sweep = Sweep.create(path, w2, {"pols": (3e9, 5e9), "nri": (6e11, 1.2e12)},
+                         n_samples=12, shard_size=5, seed=1,
+                         scenarios=[{}, {"state_variables": {"fn": 0.8}},
+                                    {"switch_functions": []}],
+                         variables=["p", "ql"])
+    assert sweep.n_shards == 9
+    with ProcessPoolExecutor(3) as pool:
+        shards = sum(pool.map(run_worker, [path] * 3), [])
+    assert sorted(shards) == list(range(9))
+    status = sweep.status()
+    assert status["done"] == 6 and status["failed"] == 3
+    with open(os.path.join(path, "shards", "7.failed")) as ferror:
+        assert "missing switch functions" in ferror.read()
+
+    # fixed on disk, then retried by fresh workers
+    sweep.update_scenario(2, {})
+    assert Sweep(path).spec["scenarios"][2] == {}
+    assert sorted(sweep.retry()) == [6, 7, 8]
+    with open(os.path.join(path, "shards", "8.lock"), "w") as flock:
+        json.dump({"host": "lost", "pid": 0, "time": time.time() - 60},
+                  flock)
+    assert run_worker(path) == [6, 7]
+    assert sweep.status()["running"] == 1
+    assert sweep.retry(stale_after=30) == [8]
+    assert run_worker(path) == [8]
+    assert sweep.status()["done"] == 9
+
+    store = sweep.merge(os.path.join(tmp_path, "store"))
+    assert store.written.all() and store.n_runs == 36
+    w2_shard = sweep.build_shard(3)
+    w2_shard.run()
+    assert np.array_equal(store.read("ql", runs=slice(12, 17)),
+                          w2_shard.ql.T, equal_nan=True)
+    assert np.all(store.read_parameters(slice(12, 24))["fn"] == 0.8)
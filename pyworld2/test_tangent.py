@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from .tangent import PARAMETER_NAMES
+from .world2 import World2
+
+
+def test_sensitivities():
+    """
+    Testing function: propagated sensitivities of QL, P and POLR match
+    central finite differences.
+
+    """
+    w2 = World2()
+    w2.set_all_standard()
+    w2.run(sensitivities=True)
+
+    for name in ["pols", "ciafn", "nri", "ciafi"]:
+        outputs = []
+        for sign in [1, -1]:
+            w2_fd = World2()
+            w2_fd.set_all_standard()
+            h = 1e-6 * getattr(w2, name)
+            setattr(w2_fd, name, getattr(w2, name) + sign * h)
+            w2_fd.run()
+            outputs.append(np.array([w2_fd.ql, w2_fd.p, w2_fd.polr]))
+        finite_differences = (outputs[0] - outputs[1]) / (2 * h)
+        i = PARAMETER_NAMES.index(name)
+        sensitivities = np.array([w2.sensitivities[var_name][:, i]
+                                  for var_name in ["ql", "p", "polr"]])
+        error = np.abs(sensitivities - finite_differences)[:, 1:]
+        scale = np.abs(finite_differences)[:, 1:].max(axis=1)
+        assert np.all(error.max(axis=1) < 1e-4 * scale), name
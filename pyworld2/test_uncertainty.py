@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from .config import TABLE_NAMES, load_table_functions
+from .ensemble import World2Ensemble
+from .uncertainty import jitter_tables, scale_tables
+from .world2 import World2
+
+
+def test_table_ensemble():
+    """
+    Testing function: jittered tables keep their ends and monotony, and each
+    run of a table-uncertainty ensemble matches a single run of its tables.
+
+    """
+    defaults = load_table_functions()
+    functions = jitter_tables(8, sigma=0.3, seed=0)
+    for func_name in TABLE_NAMES:
+        y, y_default = functions[func_name].y, defaults[func_name].y
+        assert np.allclose(y[:, [0, -1]], y_default[[0, -1]])
+        steps = np.diff(y, axis=1) * np.sign(np.diff(y_default))
+        assert np.all(steps >= -1e-12)
+
+    functions["POLAT"] = scale_tables(8, names=["POLAT"], seed=1)["POLAT"]
+    w2_ens = World2Ensemble(8)
+    w2_ens.set_state_variables()
+    w2_ens.set_initial_state()
+    w2_ens.set_table_functions(functions)
+    w2_ens.set_switch_functions()
+    w2_ens.run()
+
+    for i in [0, 5]:
+        w2 = World2()
+        w2.set_all_standard()
+        w2.set_table_functions({func_name: functions[func_name].table(i)
+                                for func_name in TABLE_NAMES})
+        w2.run()
+        assert np.allclose(w2_ens.ql[:, i], w2.ql, rtol=1e-10,
+                           equal_nan=True)
+
+
+def test_table_ensemble_rk4():
+    """
+    Testing function: a table-uncertainty ensemble runs with RK4, each run
+    matching a single run of its tables.
+
+    """
+    functions = jitter_tables(4, sigma=0.3, seed=2)
+    w2_ens = World2Ensemble(4)
+    w2_ens.set_state_variables()
+    w2_ens.set_initial_state()
+    w2_ens.set_table_functions(functions)
+    w2_ens.set_switch_functions()
+    w2_ens.run(method="rk4", h=1.)
+
+    w2 = World2()
+    w2.set_all_standard()
+    w2.set_table_functions({func_name: functions[func_name].table(3)
+                            for func_name in TABLE_NAMES})
+    w2.run(method="rk4", h=1.)
+    assert np.allclose(w2_ens.ql[:, 3], w2.ql, rtol=1e-10, equal_nan=True)
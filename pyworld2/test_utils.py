@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from scipy.interpolate import interp1d
+
+from .utils import BatchTableFunction, Clipper, Schedule, TableFunction
+
+
+def test_table_function_matches_interp1d():
+    """
+    Testing function: TableFunction interpolates like interp1d, clamped at
+    both ends, for scalars and arrays on uniform and non-uniform tables.
+
+    """
+    x_tests = np.concatenate([[-1, 0, 0.5, 2, 5, 7], np.linspace(-2, 8, 101)])
+    tables = [([0, 1, 2, 3, 4, 5], [3, 1.8, 1, 0.8, 0.7, 0.6]),
+              ([0, 0.25, 1, 4, 5], [0, 0.15, 0.5, 0.85, 1])]
+    for x_values, y_values in tables:
+        ref = interp1d(x_values, y_values, bounds_error=False,
+                       fill_value=(y_values[0], y_values[-1]))
+        func = TableFunction(x_values, y_values)
+        assert np.allclose(func(x_tests), ref(x_tests), rtol=1e-12)
+        for x in x_tests:
+            assert np.isclose(func(x), ref(x), rtol=1e-12)
+        assert np.isnan(func(np.nan))
+
+
+def test_batch_table_function():
+    """
+    Testing function: BatchTableFunction evaluates each of its tables like
+    TableFunction, with shared or per-table x values.
+
+    """
+    rng = np.random.default_rng(0)
+    x_tests = rng.uniform(-2, 8, 20)
+    x_tests[:3] = [np.nan, 0, 5]
+    for x_values in [[0, 1, 2, 3, 4, 5], [0, 0.25, 1, 4, 5],
+                     np.sort(rng.uniform(0, 5, (20, 5)), axis=1)]:
+        y_values = rng.random((20, np.shape(x_values)[-1]))
+        func = BatchTableFunction(x_values, y_values)
+        values = func(x_tests)
+        for i, x in enumerate(x_tests):
+            assert np.isclose(values[i], func.table(i)(x), rtol=1e-12,
+                              equal_nan=True)
+        assert np.allclose(func(2.5), [func.table(i)(2.5) for i in range(20)])
+        x_grid = np.stack([x_tests, x_tests[::-1]])
+        assert np.allclose(func(x_grid), [func(x_tests), func(x_tests[::-1])],
+                           equal_nan=True)
+        assert func(x_grid.astype(np.float32)).dtype == np.float32
+
+
+def test_switch_functions_sampled_over_time():
+    """
+    Testing function: switch functions sampled over a time vector match their
+    values at each time, for single and per-run triggers.
+
+    """
+    time = np.arange(1900, 2100.2, 0.2)
+    clipper = Clipper(1, 0.25, 1970)
+    assert np.array_equal(clipper.sample(time), [clipper(t) for t in time])
+
+    schedule = Schedule([1, 0.5, 0.25], [1970, 2000])
+    assert np.array_equal(schedule.sample(time), [schedule(t) for t in time])
+
+    schedule = Schedule([1, 0.5, 0.25], [np.array([1950, 1970]), 2000])
+    values = schedule.sample(time)
+    assert values.shape == (time.size, 2)
+    assert np.array_equal(values[:, 0], Schedule([1, 0.5, 0.25],
+                                                 [1950, 2000]).sample(time))
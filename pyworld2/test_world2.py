@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
 
+import os
+import warnings
 from math import isclose
 
-from .world2 import World2
+import numpy as np
+
+from . import kernel
+from .world2 import VARIABLE_NAMES, World2, run_policies
 
 
 def test_standard_run():
@@ -26,3 +31,142 @@ def test_standard_run():
         # print(val_name, "... ", np.allclose(val_end, arr_w2[-1]))
         assert isclose(val_end, arr_w2[-1],
                        rel_tol=1e-10), f"{val_name} is not close to {val_end}"
+
+
+def test_kernel_run():
+    """
+    Testing function: the fused loop of the compiled backend, run here as
+    plain Python, matches step_init and step.
+
+    """
+    w2_ref = World2()
+    w2_ref.set_all_standard()
+    w2_ref.run()
+
+    w2 = World2()
+    w2.set_all_standard()
+    w2._run_kernel(kernel.run)
+    for var in VARIABLE_NAMES:
+        assert np.allclose(getattr(w2, var), getattr(w2_ref, var),
+                           rtol=1e-10, equal_nan=True), var
+
+
+def test_numba_backend():
+    """
+    Testing function: the numba backend (or its python fallback) reproduces
+    the standard run.
+
+    """
+    w2 = World2()
+    w2.set_all_standard()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        w2.run(backend="numba")
+    assert isclose(w2.ql[-1], 0.54940464789, rel_tol=1e-10)
+
+
+def test_iter_run():
+    """
+    Testing function: snapshots of the generator match a full run.
+
+    """
+    w2 = World2()
+    w2.set_all_standard()
+    w2.run()
+
+    snapshots = list(w2.iter_run(every=7, chunk_size=10))
+    assert [snap["k"] for snap in snapshots] == list(range(0, w2.n, 7))
+    for snap in snapshots:
+        for var in VARIABLE_NAMES:
+            assert np.allclose(snap[var], getattr(w2, var)[snap["k"]],
+                               rtol=1e-12, equal_nan=True), var
+
+
+def test_contiguous_trajectories():
+    """
+    Testing function: model vectors are views of one buffer, reused by the
+    following runs, with the requested type.
+
+    """
+    w2 = World2(dtype=np.float32)
+    w2.set_all_standard()
+    w2.run()
+    buffer = w2.trajectories
+    assert buffer.shape == (len(VARIABLE_NAMES), w2.n)
+    assert buffer.dtype == np.float32
+    assert np.shares_memory(w2.ql, buffer)
+
+    w2.run()
+    assert w2.trajectories is buffer
+    assert isclose(w2.ql[-1], 0.54940464789, rel_tol=1e-3)
+
+
+def test_run_policies():
+    """
+    Testing function: policies run from a shared prefix match policies run
+    from scratch, with both backends.
+
+    """
+    scenarios = os.path.join(os.path.dirname(__file__), "..", "examples",
+                             "scenarios")
+    json_files = [None] + [os.path.join(scenarios,
+                                        f"functions_switch_scenario_{i}.json")
+                           for i in ["2", "6.1", "7"]]
+    w2 = World2()
+    w2.set_state_variables()
+    w2.set_initial_state()
+    w2.set_table_functions()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for backend in ["python", "numba"]:
+            worlds = run_policies(w2, json_files, backend=backend)
+            for json_file, world in zip(json_files, worlds):
+                w2_ref = World2()
+                w2_ref.set_all_standard()
+                w2_ref.set_switch_functions(json_file)
+                w2_ref.run()
+                assert np.allclose(world.trajectories, w2_ref.trajectories,
+                                   rtol=1e-10, equal_nan=True)
+
+
+def test_snapshot_restore():
+    """
+    Testing function: a run continued from a snapshot matches the full run.
+
+    """
+    w2_ref = World2()
+    w2_ref.set_all_standard()
+    w2_ref.run()
+
+    w2 = World2()
+    w2.set_all_standard()
+    w2.restore(w2_ref.snapshot(500))
+    w2.run(k_start=500)
+    assert w2.ql[-1] == w2_ref.ql[-1]
+
+
+def test_time_grid_and_stride():
+    """
+    Testing function: the time grid has a whole number of steps, and a run
+    with a stride stores every stride-th point of the full run.
+
+    """
+    assert World2(year_max=1950).n == 251
+    assert World2(dt=0.1).time[-1] == 2100
+    assert World2(dt=0.01, stride=100).n == 201
+
+    w2_ref = World2()
+    w2_ref.set_all_standard()
+    w2_ref.run()
+
+    w2 = World2(stride=5)
+    w2.set_all_standard()
+    w2.run()
+    assert np.array_equal(w2.time, w2_ref.time[::5])
+    assert np.array_equal(w2.trajectories, w2_ref.trajectories[:, ::5],
+                          equal_nan=True)
+
+    values = w2_ref.interpolate([1950.1, 2100])
+    assert isclose(values["ql"][0], 0.5 * (w2_ref.ql[250] + w2_ref.ql[251]),
+                   rel_tol=1e-12)
+    assert values["ql"][1] == w2_ref.ql[-1]
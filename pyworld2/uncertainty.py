@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Perturbations of the table functions of World2, for ensembles over the
+uncertainty of the non-linear tables. Each helper draws n alternative tables
+of some table functions, as BatchTableFunction to run in one World2Ensemble:
+
+    - scale_tables: each table multiplied by a random factor,
+
+    - noise_tables: each point multiplied by its own random factor,
+
+    - jitter_tables: increments between points multiplied by random
+      factors, then rescaled so that the table keeps its first value and its
+      total rise and fall. Monotone tables stay monotone within their range,
+      and flat parts stay flat.
+
+Examples
+--------
+>>> functions = jitter_tables(1000, sigma=0.2, seed=0)
+>>> w2 = World2Ensemble(1000)
+>>> w2.set_state_variables()
+>>> w2.set_initial_state()
+>>> w2.set_table_functions(functions)
+>>> w2.set_switch_functions()
+>>> w2.run()
+
+"""
+import numpy as np
+
+from .config import TABLE_NAMES, load_table_functions
+from .utils import BatchTableFunction
+
+
+def _perturb(n, perturb, names, tables, seed):
+    """
+    Applies perturb(y, rng) -> (n, m) array to the y values of some tables,
+    and returns all tables by name.
+
+    """
+    if tables is None:
+        tables = load_table_functions()
+    names = TABLE_NAMES if names is None else names
+    unknown = [name for name in names if name not in TABLE_NAMES]
+    if unknown:
+        raise ValueError(f"unknown table functions {unknown}")
+    rng = np.random.default_rng(seed)
+    functions = dict(tables)
+    for name in names:
+        func = tables[name]
+        functions[name] = BatchTableFunction(func.x, perturb(func.y, rng))
+    return functions
+
+
+def scale_tables(n, sigma=0.1, names=None, tables=None, seed=None):
+    """
+    Draws n versions of some tables, each multiplied by a log-normal factor
+    of median 1.
+
+    Parameters
+    ----------
+    n : int
+        number of versions, the n_runs of the ensemble.
+    sigma : float, optional
+        standard deviation of the log of the factors. The default is 0.1.
+    names : list, optional
+        names of the tables to perturb. The default is None, for TABLE_NAMES.
+    tables : dict, optional
+        TableFunction by name to perturb. The default is None, for the
+        tables of "functions_table_default.json".
+    seed : int, optional
+        seed of the random generator. The default is None.
+
+    Returns
+    -------
+    dict
+        BatchTableFunction for the perturbed tables and the unchanged
+        TableFunction for the others, by name of TABLE_NAMES.
+
+    """
+    return _perturb(n, lambda y, rng: y * np.exp(sigma *
+                                                 rng.standard_normal((n, 1))),
+                    names, tables, seed)
+
+
+def noise_tables(n, sigma=0.1, names=None, tables=None, seed=None):
+    """
+    Draws n versions of some tables, each point multiplied by its own
+    log-normal factor of median 1. Monotony is not kept. See scale_tables for
+    the parameters.
+
+    """
+    return _perturb(n, lambda y, rng: y * np.exp(
+        sigma * rng.standard_normal((n, y.size))), names, tables, seed)
+
+
+def jitter_tables(n, sigma=0.1, names=None, tables=None, seed=None):
+    """
+    Draws n versions of some tables with the same shape: increments between
+    points are multiplied by log-normal factors of median 1, then rising and
+    falling increments are rescaled to keep the total rise and the total
+    fall of each table. The first and last values do not change. See
+    scale_tables for the parameters.
+
+    """
+    def perturb(y, rng):
+        steps = np.diff(y) * np.exp(sigma *
+                                    rng.standard_normal((n, y.size - 1)))
+        for sign in [1, -1]:
+            part = np.where(sign * steps > 0, steps, 0.)
+            total = part.sum(axis=1, keepdims=True)
+            target = np.where(sign * np.diff(y) > 0, np.diff(y), 0.).sum()
+            steps = np.where(sign * steps > 0,
+                             steps * target / np.where(total != 0, total, 1),
+                             steps)
+        return y[0] + np.concatenate([np.zeros((n, 1)),
+                                      np.cumsum(steps, axis=1)], axis=1)
+
+    return _perturb(n, perturb, names, tables, seed)
@@ -1,14 +1,18 @@
 # -*- coding: utf-8 -*-
 
-import matplotlib.pyplot as plt
-from matplotlib.ticker import EngFormatter, ScalarFormatter
+from bisect import bisect_right
+
+import numpy as np
 
 
 def clip(value_before_switch, value_after_switch, t_switch, t):
     """
-    logical function of time. Changes value at threshold time t_switch.
+    logical function of time. Changes value at threshold time t_switch. If
+    t_switch is an array, switch values are selected element-wise.
 
     """
+    if isinstance(t_switch, np.ndarray):
+        return np.where(t <= t_switch, value_before_switch, value_after_switch)
     if t <= t_switch:
         return value_before_switch
     else:
@@ -32,70 +36,243 @@ class Clipper:
         return clip(self.value_before_switch, self.value_after_switch,
                     self.trigger_value, t)
 
+    def sample(self, time):
+        """
+        Evaluates the switch function over a whole time vector at once. If
+        values or trigger are arrays of shape (n_runs,), the output has shape
+        (time.size, n_runs).
+
+        """
+        time = np.asarray(time, dtype=float)
+        shape = np.broadcast(self.value_before_switch, self.value_after_switch,
+                             self.trigger_value).shape
+        t = time.reshape(time.shape + (1,) * len(shape))
+        return np.where(t <= self.trigger_value, self.value_before_switch,
+                        self.value_after_switch).astype(float)
+
+
+class Schedule:
+    """
+    Class helper. Generalizes Clipper to a multi-stage policy: var(t) takes
+    values[0] until trigger_values[0], then values[i] until trigger_values[i],
+    and values[-1] after the last threshold time.
+
+    """
+
+    def __init__(self, values, trigger_values):
+        if len(values) != len(trigger_values) + 1:
+            raise ValueError("a schedule needs one value more than threshold "
+                             "times")
+        for trigger_before, trigger_after in zip(trigger_values[:-1],
+                                                 trigger_values[1:]):
+            if np.any(np.asarray(trigger_after) < np.asarray(trigger_before)):
+                raise ValueError("threshold times must be in increasing "
+                                 "order")
+        self.values = list(values)
+        self.trigger_values = list(trigger_values)
+
+    def __call__(self, t):
+        value = self.values[0]
+        for value_after_switch, trigger_value in zip(self.values[1:],
+                                                     self.trigger_values):
+            value = clip(value, value_after_switch, trigger_value, t)
+        return value
+
+    def sample(self, time):
+        """
+        Evaluates the schedule over a whole time vector at once. If values or
+        triggers are arrays of shape (n_runs,), the output has shape
+        (time.size, n_runs).
+
+        """
+        time = np.asarray(time, dtype=float)
+        shape = np.broadcast(*self.values, *self.trigger_values).shape
+        t = time.reshape(time.shape + (1,) * len(shape))
+        value = np.broadcast_to(self.values[0], t.shape[:1] + shape)
+        for value_after_switch, trigger_value in zip(self.values[1:],
+                                                     self.trigger_values):
+            value = np.where(t <= trigger_value, value, value_after_switch)
+        return value.astype(float)
+
+
+class TableFunction:
+    """
+    Class helper. Defines a non-linear variable as the linear interpolation of
+    a table, clamped to the first and last values of the table outside of its
+    range. It replaces scipy.interpolate.interp1d in the simulation loop, with
+    a fast path for scalars and one for arrays.
+
+    Attributes
+    ----------
+    x : numpy.ndarray
+        input values of the table, strictly increasing.
+    y : numpy.ndarray
+        output values of the table.
+    slopes : numpy.ndarray
+        slope of each of the x.size - 1 segments of the table.
+    uniform : bool
+        True if x values are evenly spaced. Scalars are then located in the
+        table by index arithmetic rather than by bisection.
+
+    """
+
+    def __init__(self, x_values, y_values):
+        self.x = np.asarray(x_values, dtype=float)
+        self.y = np.asarray(y_values, dtype=float)
+        if self.x.ndim != 1 or self.x.shape != self.y.shape:
+            raise ValueError("x and y values must be 1-D and of same size")
+        if self.x.size < 2 or np.any(np.diff(self.x) <= 0):
+            raise ValueError("x values must be at least 2 and strictly "
+                             "increasing")
+        steps = np.diff(self.x)
+        self.slopes = np.diff(self.y) / steps
+        self.uniform = bool(np.allclose(steps, steps[0], rtol=1e-12, atol=0))
+
+        # plain floats, faster than numpy scalars in the scalar path
+        self._xs = self.x.tolist()
+        self._ys = self.y.tolist()
+        self._slopes_list = self.slopes.tolist()
+        self._x_first, self._x_last = self._xs[0], self._xs[-1]
+        self._y_first, self._y_last = self._ys[0], self._ys[-1]
+        self._inv_step = 1 / steps[0]
+        self._i_last = self.x.size - 2
+
+    def __call__(self, x):
+        if isinstance(x, (float, int, np.floating)):
+            return self._call_scalar(x)
+        values = np.interp(x, self.x, self.y)
+        # keeps reduced-precision arrays in their type
+        if getattr(x, "dtype", None) == np.float32:
+            return values.astype(np.float32)
+        return values
+
+    def _call_scalar(self, x):
+        if x <= self._x_first:
+            return self._y_first
+        if x >= self._x_last:
+            return self._y_last
+        if x != x:
+            return x
+        if self.uniform:
+            i = int((x - self._x_first) * self._inv_step)
+            if i > self._i_last:
+                i = self._i_last
+        else:
+            i = bisect_right(self._xs, x) - 1
+        return self._ys[i] + self._slopes_list[i] * (x - self._xs[i])
+
+    def slope(self, x):
+        """
+        Derivative of the table function at a scalar x: slope of the segment
+        holding x (the right one at a breakpoint), and zero where clamped.
+
+        """
+        if x < self._x_first or x >= self._x_last:
+            return 0.
+        return self._slopes_list[bisect_right(self._xs, x) - 1]
+
+
+class BatchTableFunction:
+    """
+    Class helper. Holds n alternative tables of a non-linear variable, one
+    per run of a World2Ensemble, and evaluates all of them at once on an
+    input of shape (n,), or (..., n) with tables along the last axis. Each
+    table is clamped to its first and last values outside of its range, as
+    TableFunction.
+
+    Attributes
+    ----------
+    x : numpy.ndarray
+        input values, strictly increasing, of shape (m,) if shared by all
+        tables or (n, m).
+    y : numpy.ndarray
+        output values of each table, of shape (n, m).
+    slopes : numpy.ndarray
+        slope of each segment of each table, of shape (n, m - 1).
+    n : int
+        number of tables.
+    uniform : bool
+        True if x values are shared and evenly spaced. Inputs are then
+        located in the tables by index arithmetic rather than by bisection.
+
+    """
+
+    def __init__(self, x_values, y_values):
+        self.x = np.asarray(x_values, dtype=float)
+        self.y = np.asarray(y_values, dtype=float)
+        if self.y.ndim != 2 or self.x.shape not in [self.y.shape,
+                                                    self.y.shape[1:]]:
+            raise ValueError("y values must be of shape (n, m), and x values "
+                             "of shape (m,) or (n, m)")
+        steps = np.diff(self.x, axis=-1)
+        if self.y.shape[1] < 2 or np.any(steps <= 0):
+            raise ValueError("x values must be at least 2 and strictly "
+                             "increasing")
+        self.n = self.y.shape[0]
+        self.slopes = np.diff(self.y, axis=1) / steps
+        self._x_first, self._x_last = self.x[..., 0], self.x[..., -1]
+        self._i_last = self.y.shape[1] - 2
+        # segments are flattened and indexed by row * (m - 1) + segment, with
+        # values y[i] + slopes[i] * (x - x[i]) = intercepts[i] + slopes[i] * x
+        self._offsets = np.arange(self.n) * (self._i_last + 1)
+        self._intercepts = (self.y[:, :-1] -
+                            self.slopes * self.x[..., :-1]).ravel()
+        self._slopes_flat = self.slopes.ravel()
+        self.uniform = bool(self.x.ndim == 1 and
+                            np.allclose(steps, steps[0], rtol=1e-12, atol=0))
+        if self.uniform:
+            self._inv_step = 1 / steps[0]
+
+    def __call__(self, x):
+        dtype = getattr(x, "dtype", None)
+        x = np.asarray(x, dtype=float)
+        # inputs of shape (..., n): the last axis runs over the tables
+        if x.shape[-1:] != (self.n,):
+            x = np.broadcast_to(x, np.broadcast_shapes(x.shape, (self.n,)))
+        x = np.clip(x, self._x_first, self._x_last)
+        if self.uniform:
+            # NaN inputs give any index, and stay NaN
+            with np.errstate(invalid="ignore"):
+                i = ((x - self._x_first) * self._inv_step).astype(np.intp)
+            np.clip(i, 0, self._i_last, out=i)
+        elif self.x.ndim == 1:
+            i = np.searchsorted(self.x, x, side="right") - 1
+            np.clip(i, 0, self._i_last, out=i)
+        else:
+            i = np.count_nonzero(self.x <= x[..., None], axis=-1) - 1
+            np.clip(i, 0, self._i_last, out=i)
+        i += self._offsets
+        values = self._intercepts.take(i) + self._slopes_flat.take(i) * x
+        # keeps reduced-precision arrays in their type, as TableFunction
+        if dtype == np.float32:
+            return values.astype(np.float32)
+        return values
+
+    def table(self, i):
+        """
+        Returns the i-th table, as a TableFunction.
+
+        """
+        return TableFunction(self.x if self.x.ndim == 1 else self.x[i],
+                             self.y[i])
+
 
 def make_patch_spines_invisible(ax):
     """
-    Helper from matplotlib gallery (Multiple Yaxis With Spines)
+    Helper from matplotlib gallery (Multiple Yaxis With Spines). See
+    pyworld2.plotting, imported on first use.
 
     """
-    ax.set_frame_on(True)
-    ax.patch.set_visible(False)
-    for sp in ax.spines.values():
-        sp.set_visible(False)
+    from .plotting import make_patch_spines_invisible
+    return make_patch_spines_invisible(ax)
 
 
-def plot_world_variables(time, var_data, var_names, var_lims,
-                         title=None,
-                         figsize=None,
-                         dist_spines=0.09,
-                         grid=False):
+def plot_world_variables(*args, **kwargs):
     """
-    Plots world state from an instance of World2.
+    Plots world state from an instance of World2. See
+    pyworld2.plotting.plot_world_variables: matplotlib is imported on first
+    use only.
 
     """
-    var_number = len(var_data)
-
-    fig, host = plt.subplots(figsize=figsize)
-    axs = [host, ]
-    for i in range(var_number-1):
-        axs.append(host.twinx())
-
-    fig.subplots_adjust(left=dist_spines*2)
-    for i, ax in enumerate(axs[1:]):
-        ax.spines["left"].set_position(("axes", -(i + 1)*dist_spines))
-        ax.spines["left"].set_visible(True)
-        ax.yaxis.set_label_position('left')
-        ax.yaxis.set_ticks_position('left')
-
-    ps = []
-    for ax, label, ydata, color in zip(axs, var_names, var_data,
-                                       ["black", "#e7298a", "#d95f02",
-                                        "#7570b3", "#1b9e77"]):
-        ps.append(ax.plot(time, ydata, label=label, color=color, linewidth=3,
-                          alpha=0.7)[0])
-    axs[0].grid(grid)
-    axs[0].set_xlim(time[0], time[-1])
-
-    for ax, lim in zip(axs, var_lims):
-        ax.set_ylim(lim[0], lim[1])
-
-    for ax_ in axs:
-        formatter_ = EngFormatter(places=0, sep="\N{THIN SPACE}")
-        ax_.tick_params(axis='y', rotation=90)
-        ax_.yaxis.set_major_locator(plt.MaxNLocator(5))
-        ax_.yaxis.set_major_formatter(formatter_)
-
-    tkw = dict(size=4, width=1.5)
-    axs[0].set_xlabel("time [years]")
-    axs[0].tick_params(axis='x', **tkw)
-    for i, (ax, p) in enumerate(zip(axs, ps)):
-        ax.set_ylabel(p.get_label(), rotation="horizontal")
-        ax.yaxis.label.set_color(p.get_color())
-        ax.tick_params(axis='y', colors=p.get_color(), **tkw)
-        ax.yaxis.set_label_coords(-i*dist_spines, 1.01)
-
-    if title is not None:
-        fig.suptitle(title, x=0.95, ha="right", fontsize=10)
-
-    plt.tight_layout()
-    return axs
\ No newline at end of file
+    from .plotting import plot_world_variables
+    return plot_world_variables(*args, **kwargs)
@@ -29,13 +29,28 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-import json
+import copy
 import os
+import warnings
 
 import numpy as np
-from scipy.interpolate import interp1d
 
-from .utils import Clipper, plot_world_variables, plt
+from .config import (SWITCH_NAMES, TABLE_NAMES, load_switch_functions,
+                     load_table_functions, parse_switch_functions,
+                     parse_table_functions)
+from .utils import Schedule
+
+# names of the model vectors and constants, in the order used by the compiled
+# backend
+VARIABLE_NAMES = ["p", "br", "dr", "cr", "nr", "nrur", "nrfr",
+                  "ci", "cir", "cig", "cid", "cira", "msl", "ecir",
+                  "ciaf", "fr", "pol", "polr", "polg", "pola", "ql"]
+CONSTANT_NAMES = ["la", "pdn", "ciafn", "ecirn", "ciaft", "pols", "fn", "qls"]
+INITIAL_STATE_NAMES = ["pi", "nri", "cii", "poli", "ciafi"]
+STATE_NAMES = ["p", "nr", "ci", "pol", "ciaf"]
+# groups of equations run in order by World2.step, as step_<group> methods
+STEP_GROUPS = ["population", "resources", "capital", "pollution",
+               "agriculture", "auxiliaries"]
 
 
 class World2:
@@ -60,10 +75,21 @@ class World2:
         end year of the simulation.
     dt : float
         time step of the numerical integration [year].
+    stride : int
+        number of integration steps per stored point of time.
+    n_steps : int
+        number of steps of the numerical integration.
     time : numpy.ndarray
-        time from year_min to year_max sampled every dt on n points [year].
+        time of the stored points, from year_min to year_max every stride * dt
+        [year].
     n : int
-        number of time steps of the numerical integration.
+        number of stored points of time, the size of the model vectors.
+    dtype : numpy.dtype
+        floating-point type of the model vectors.
+    trajectories : numpy.ndarray
+        contiguous storage of all model vectors, one per row in the order of
+        VARIABLE_NAMES. Model vectors are views of its rows. It is allocated
+        by step_init and reused by the following runs.
     p : numpy.ndarray
         P - Population [people]. It is a state variable.
     br : numpy.ndarray
@@ -77,7 +103,8 @@ class World2:
     pdn : float
         PDN - Population Density Normal [people/square kilometer].
     nr : numpy.ndarray
-        NR - Natural Resources [natural resource units]. It is a state variable.
+        NR - Natural Resources [natural resource units]. It is a state
+        variable.
     nrur : numpy.ndarray
         NRUR - Natural-Resource-Usage Rate [natural resource units/year].
     nrfr : numpy.ndarray
@@ -99,7 +126,8 @@ class World2:
     ecir : numpy.ndarray
         ECIR - Effective-Capital-Investment Ratio [capital units/person].
     ecirn : float
-        ECIRN - Effective-Capital-Investment Ratio Normal [capital units/person].
+        ECIRN - Effective-Capital-Investment Ratio Normal
+        [capital units/person].
     ciaf : numpy.ndarray
         CIAF - Capital-Investment-in-Agriculture Fraction [].
     ciaft : float
@@ -133,49 +161,49 @@ class World2:
         POLI - Pollution, Initial [pollution units].
     ciafi : float
         CIAFI - Capital-Investment-in-Agriculture Fraction, Initial [].
-    brcm : interp1d
+    brcm : TableFunction
         BRCM - Birth-Rate-From-Crowding Multiplier [].
-    brfm : interp1d
+    brfm : TableFunction
         BRFM - Birth-Rate-From-Food Multiplier [].
-    brmm : interp1d
+    brmm : TableFunction
         BRMM - Birth-Rate-From-Material Multiplier [].
-    brpm : interp1d
+    brpm : TableFunction
         BRPM - Death-Rate-From-Pollution Multiplier [].
-    drcm : interp1d
+    drcm : TableFunction
         DRCM - Death-Rate-From-Crowding Multiplier [].
-    drfm : interp1d
+    drfm : TableFunction
         DRFM - Death-Rate-From-Frood Multiplier [].
-    drmm : interp1d
+    drmm : TableFunction
         DRMM - Death-Rate-From-Material Multiplier [].
-    drpm : interp1d
+    drpm : TableFunction
         DRPM - Death-Rate-From-Pollution Multiplier [].
-    cfifr : interp1d
+    cfifr : TableFunction
         CFIFR - Capital Fraction Indicated by Food Ratio [].
-    cim: interp1d
+    cim: TableFunction
         CIM - Capital-Investment Multiplier [].
-    ciqr : interp1d
+    ciqr : TableFunction
         CIQR - Capital-Investment-From-Quality Ratio [].
-    fcm : interp1d
+    fcm : TableFunction
         FCM - Food-From-Crowding Multiplier [].
-    fpci: interp1d
+    fpci: TableFunction
         FPCI - Food Potential From Capital Investment [food units/person/year].
-    fpm : interp1d
+    fpm : TableFunction
         FPM - Food-From-Pollution Multiplier [].
-    nrem : interp1d
+    nrem : TableFunction
         NREM - Natural-Resource-Exctraction Multiplier [].
-    nrmm : interp1d
+    nrmm : TableFunction
         NRMM - Natural-Resource-From-Material Multiplier [].
-    polat : interp1d
+    polat : TableFunction
         POLAT - Pollution-Absoption Time [years].
-    polcm : interp1d
+    polcm : TableFunction
         POLCM - Pollution-From-Capital Multiplier [].
-    qlc : interp1d
+    qlc : TableFunction
         QLC - Quality of Life from Crowding [].
-    qlf : interp1d
+    qlf : TableFunction
         QLF - Quality of Life from Food [].
-    qlm : interp1d
+    qlm : TableFunction
         QLM - Quality of Life from Material [].
-    qlp : interp1d
+    qlp : TableFunction
         QLP - Quality of Life from Pollution [].
     brn : Clipper
         BRN - Birth Rate Normal [fraction/year].
@@ -192,10 +220,21 @@ class World2:
         [natural resource units/person/year].
     poln : Clipper
         POLN - Pollution Normal [pollution units/person/year].
+    brn_values, drn_values, cidn_values, cign_values, fc_values, nrun_values,
+    poln_values : numpy.ndarray
+        switch functions evaluated over time, see sample_switch_functions.
+    integration_stats : dict
+        "method", "n_steps", "n_rejected" and "n_evaluations" of the
+        right-hand side in the last run.
+    sensitivities : dict
+        derivatives of each model vector with respect to the constants and
+        initial conditions, of shape (n, 13), after run(sensitivities=True).
+        See pyworld2.tangent.
 
     """
 
-    def __init__(self, year_min=1900, year_max=2100, dt=0.2):
+    def __init__(self, year_min=1900, year_max=2100, dt=0.2,
+                 dtype=np.float64, stride=1):
         """
         __init__ of class World2.
 
@@ -207,18 +246,56 @@ class World2:
             end year of the simulation. The default is 2100.
         dt : float, optional
             time step of the numerical integration [year]. The default is 0.2.
+        dtype : numpy.dtype, optional
+            floating-point type of the model vectors, e.g. numpy.float32 to
+            halve their memory. The Euler integration then runs in that type
+            too, with switch values sampled in it. See pyworld2.precision for
+            its accuracy. The default is numpy.float64.
+        stride : int, optional
+            stores one point of time every stride integration steps, e.g. 100
+            to store one point per year with dt=0.01. The number of steps must
+            be a multiple of stride. The default is 1, to store every step.
+
+        """
+        self.set_time_grid(year_min, year_max, dt, stride)
+        self.dtype = np.dtype(dtype)
+        if not np.issubdtype(self.dtype, np.floating):
+            raise ValueError(f"dtype must be a floating-point type, got "
+                             f"{self.dtype}")
+
+    def set_time_grid(self, year_min, year_max, dt, stride=1):
+        """
+        Sets the time grid from whole numbers of steps: the integration runs
+        n_steps = (year_max - year_min) / dt steps, rounded up if dt does not
+        divide the time span, and time[i] = year_min + i * stride * dt.
 
         """
+        n_steps = int(np.ceil((year_max - year_min) / dt - 1e-9))
+        if stride < 1 or n_steps % stride:
+            raise ValueError(f"stride must divide the {n_steps} steps of the "
+                             f"integration, got {stride}")
         self.year_min = year_min
         self.year_max = year_max
         self.dt = dt
-        self.time = np.arange(self.year_min, self.year_max + self.dt, self.dt)
+        self.stride = stride
+        self.n_steps = n_steps
+        self.time = self.integration_time(0, n_steps + 1, stride)
         self.n = self.time.size
+        self.trajectories = None
+
+    def integration_time(self, k_min, k_max, stride=1):
+        """
+        Returns the points of time of the integration steps from k_min to
+        k_max (excluded), every stride steps [year].
+
+        """
+        return self.year_min + self.dt * np.arange(k_min, k_max, stride)
 
     def set_state_variables(self, la=135e6, pdn=26.5, ciafn=0.3, ecirn=1,
                             ciaft=15, pols=3.6e9, fn=1, qls=1):
         """
-        Sets constant variables and initializes model vectors.
+        Sets constant variables. Model vectors are allocated at the start of
+        the simulation, by step_init.
 
         Parameters
         ----------
@@ -245,48 +322,45 @@ class World2:
             is 1.
 
         """
-        # Variables & constants related to Population
-        self.p = np.zeros((self.n,))
-        self.br = np.zeros((self.n,))
-        self.dr = np.zeros((self.n,))
-        self.cr = np.zeros((self.n,))
+        # Constants related to Population
         self.la = la
         self.pdn = pdn
 
-        # Variables & constants related to Natural Resources
-        self.nr = np.zeros((self.n,))
-        self.nrur = np.zeros((self.n,))
-        self.nrfr = np.zeros((self.n,))
-
-        # Variables & constants related to Capital investsment
-        self.ci = np.zeros((self.n,))
-        self.cir = np.zeros((self.n,))
-        self.cig = np.zeros((self.n,))
-        self.cid = np.zeros((self.n,))
-        self.cira = np.zeros((self.n,))
+        # Constants related to Capital investsment
         self.ciafn = ciafn
-
-        self.msl = np.zeros((self.n,))
-        self.ecir = np.zeros((self.n,))
         self.ecirn = ecirn
 
-        # Variables & constants related to Agriculture & Food
-        self.ciaf = np.zeros((self.n,))
+        # Constants related to Agriculture & Food
         self.ciaft = ciaft
-        self.fr = np.zeros((self.n,))
         self.fn = fn
 
-        # Variables & constants related to Pollution
-        self.pol = np.zeros((self.n,))
-        self.polr = np.zeros((self.n,))
-        self.polg = np.zeros((self.n,))
-        self.pola = np.zeros((self.n,))
+        # Constants related to Pollution
         self.pols = pols
 
-        # Variables & constants related to Quality of Life
-        self.ql = np.zeros((self.n,))
+        # Constants related to Quality of Life
         self.qls = qls
 
+    def allocate_vectors(self, n):
+        """
+        Allocates all model vectors on n points of time, as views of the rows
+        of trajectories. It is called by step_init. The buffer of a previous
+        run is reused if it has the same size and type.
+
+        """
+        shape = (len(VARIABLE_NAMES),) + self._vector_shape(n)
+        if (self.trajectories is None or self.trajectories.shape != shape
+                or self.trajectories.dtype != self.dtype):
+            self.trajectories = np.zeros(shape, dtype=self.dtype)
+        for var_name, vector in zip(VARIABLE_NAMES, self.trajectories):
+            setattr(self, var_name, vector)
+
+    def _vector_shape(self, n):
+        """
+        Returns the shape of a model vector on n points of time.
+
+        """
+        return (n,)
+
     def set_initial_state(self, pi=1.65e9, nri=900e9,
                           cii=0.4e9, poli=0.2e9, ciafi=0.2):
         """
@@ -318,30 +392,44 @@ class World2:
     def set_switch_functions(self, json_file=None):
         """
         Sets all time-dependant variables switched at some threshold year.
-        These variables are useful to simulate control policies.
+        These variables are useful to simulate control policies. If
+        "trigger.value" is a list of years, the variable is a multi-stage
+        Schedule: ``NAME`` switches to ``NAME1`` at the first year, then to
+        ``NAME2`` at the second year, and so on.
 
         Parameters
         ----------
-        json_file : str, optional
+        json_file : str, list or dict, optional
             path to a json configuration file, keeping the same structure as
             "functions_switch_default.json" in pyworld2 library. If None,
-            default json file is loaded.
+            default json file is loaded. Files are compiled once per process,
+            see pyworld2.config. It can also be the content of such a file, or
+            switch functions by name (e.g. from pyworld2.config.load_bundle).
 
         """
-        if json_file is None:
-            json_file = "functions_switch_default.json"
-            json_file = os.path.join(os.path.dirname(__file__), json_file)
-        with open(json_file) as fjson:
-            tables = json.load(fjson)
-
-        func_names = ["BRN", "DRN", "CIDN", "CIGN", "FC", "NRUN", "POLN"]
+        if isinstance(json_file, dict):
+            functions = json_file
+        elif isinstance(json_file, list):
+            functions = parse_switch_functions(json_file)
+        else:
+            functions = load_switch_functions(json_file)
+
+        # copied, as their values may be modified per instance
+        for func_name in SWITCH_NAMES:
+            setattr(self, func_name.lower(),
+                    copy.deepcopy(functions[func_name]))
+
+    def sample_switch_functions(self):
+        """
+        Evaluates all switch functions over the time vector, so that the
+        simulation loop only reads arrays. It is called by step_init: switch
+        functions modified afterwards are ignored until the next run.
 
-        for func_name in func_names:
-            for table in tables:
-                if func_name in table:
-                    func = Clipper(table[func_name], table[f"{func_name}1"],
-                                   table["trigger.value"])
-                    setattr(self, func_name.lower(), func)
+        """
+        for func_name in SWITCH_NAMES:
+            values = getattr(self, func_name.lower()).sample(self.time)
+            setattr(self, f"{func_name.lower()}_values",
+                    values.astype(self.dtype, copy=False))
 
     def set_table_functions(self, json_file=None):
         """
@@ -350,32 +438,23 @@ class World2:
 
         Parameters
         ----------
-        json_file : str, optional
+        json_file : str, list or dict, optional
             path to a json configuration file, keeping the same structure as
             "functions_table_default.json" in pyworld2 library. If None,
-            default json file is loaded.
-
-        """
-        if json_file is None:
-            json_file = "functions_table_default.json"
-            json_file = os.path.join(os.path.dirname(__file__), json_file)
-        with open(json_file) as fjson:
-            tables = json.load(fjson)
-
-        func_names = ["BRCM", "BRFM", "BRMM", "BRPM",
-                      "DRCM", "DRFM", "DRMM", "DRPM",
-                      "CFIFR", "CIM", "CIQR", "FCM", "FPCI", "FPM",
-                      "NREM", "NRMM", "POLAT", "POLCM", "POLR",
-                      "QLC", "QLF", "QLM", "QLP"]
-
-        for func_name in func_names:
-            for table in tables:
-                if table["y.name"] == func_name:
-                    func = interp1d(table["x.values"], table["y.values"],
-                                    bounds_error=False,
-                                    fill_value=(table["y.values"][0],
-                                                table["y.values"][-1]))
-                    setattr(self, func_name.lower(), func)
+            default json file is loaded. Files are compiled once per process,
+            see pyworld2.config. It can also be the content of such a file, or
+            table functions by name (e.g. from pyworld2.config.load_bundle).
+
+        """
+        if isinstance(json_file, dict):
+            functions = json_file
+        elif isinstance(json_file, list):
+            functions = parse_table_functions(json_file)
+        else:
+            functions = load_table_functions(json_file)
+
+        for func_name in TABLE_NAMES:
+            setattr(self, func_name.lower(), functions[func_name])
 
     def set_all_standard(self):
         """
@@ -387,20 +466,488 @@ class World2:
         self.set_table_functions()
         self.set_switch_functions()
 
-    def run(self):
+    @classmethod
+    def from_configuration(cls, config):
+        """
+        Builds a simulation ready to run from a configuration, as returned by
+        get_configuration. Missing keys take their default values, and table
+        or switch functions can be paths to json configuration files.
+
+        Parameters
+        ----------
+        config : dict
+            optional keys "year_min", "year_max", "dt", "dtype", "stride",
+            "state_variables", "initial_state", "table_functions" and
+            "switch_functions".
+
+        Returns
+        -------
+        World2
+
+        """
+        w2 = cls(**{key: config[key] for key in
+                    ["year_min", "year_max", "dt", "dtype", "stride"]
+                    if key in config})
+        w2.set_state_variables(**config.get("state_variables", {}))
+        w2.set_initial_state(**config.get("initial_state", {}))
+        w2.set_table_functions(config.get("table_functions"))
+        w2.set_switch_functions(config.get("switch_functions"))
+        return w2
+
+    def get_configuration(self):
+        """
+        Returns everything that determines the result of a run, as plain
+        Python types. Table and switch functions keep the structure of the
+        json configuration files.
+
+        Returns
+        -------
+        dict
+            "year_min", "year_max", "dt", "stride", "dtype" (name of the
+            floating-point type), "state_variables" and "initial_state"
+            (constants by name), "table_functions" and "switch_functions"
+            (lists of tables).
+
+        """
+        config = {"year_min": self.year_min, "year_max": self.year_max,
+                  "dt": self.dt, "stride": self.stride,
+                  "dtype": self.dtype.name}
+        config["state_variables"] = {name: np.asarray(getattr(self, name))
+                                     .tolist() for name in CONSTANT_NAMES}
+        config["initial_state"] = {name: np.asarray(getattr(self, name))
+                                   .tolist() for name in INITIAL_STATE_NAMES}
+        config["table_functions"] = []
+        for func_name in TABLE_NAMES:
+            func = getattr(self, func_name.lower())
+            config["table_functions"].append({"y.name": func_name,
+                                              "x.values": func.x.tolist(),
+                                              "y.values": func.y.tolist()})
+        config["switch_functions"] = []
+        for func_name in SWITCH_NAMES:
+            func = getattr(self, func_name.lower())
+            if isinstance(func, Schedule):
+                values = func.values
+                trigger_value = [np.asarray(trigger).tolist()
+                                 for trigger in func.trigger_values]
+            else:
+                values = [func.value_before_switch, func.value_after_switch]
+                trigger_value = np.asarray(func.trigger_value).tolist()
+            table = {func_name: np.asarray(values[0]).tolist()}
+            for i, value in enumerate(values[1:]):
+                table[f"{func_name}{i + 1}"] = np.asarray(value).tolist()
+            table["trigger.value"] = trigger_value
+            config["switch_functions"].append(table)
+        return config
+
+    def run(self, backend="python", k_start=0, method="euler",
+            sensitivities=False, cache=None, **options):
         """
         Runs the simulation.
 
+        Parameters
+        ----------
+        backend : str, optional
+            "python" runs step_init and step in Python. "numba" runs the same
+            equations in one compiled loop (see pyworld2.kernel), and falls
+            back to "python" with a warning if numba is not installed. The
+            default is "python".
+        k_start : int, optional
+            time step to continue from, after fork(k_start) or restore. Model
+            vectors are kept up to k_start and computed afterwards. The
+            default is 0, for a run from the initial state.
+        method : str, optional
+            integrator of the state variables. "euler" is the explicit Euler
+            scheme of the book, with step dt. "rk4" and "rk45" are the
+            integrators of pyworld2.integrators, which report the model on
+            the same time grid. Their rates (br, dr, nrur, cid, cig, polg,
+            pola) are taken at each point of time, while the Euler scheme
+            reports the rates used from the previous point. The default is
+            "euler".
+        sensitivities : bool, optional
+            if True, the derivatives of all model vectors with respect to the
+            constants and initial conditions are propagated along the run,
+            into the sensitivities attribute (see pyworld2.tangent). It
+            requires the Euler method and a run from the initial state. The
+            default is False.
+        cache : pyworld2.cache.ResultCache, optional
+            cache of results: if the same configuration was run with the same
+            options, its model vectors are loaded instead, otherwise the run
+            is stored. It applies to runs from the initial state without
+            sensitivities. The default is None, for no cache.
+        **options
+            options of the integrator, e.g. h for "rk4", or rtol and atol for
+            "rk45". Their steps default to dt, whatever the stride.
+
+        """
+        if cache is not None:
+            if sensitivities or k_start > 0:
+                raise ValueError("cached runs start from the initial state, "
+                                 "without sensitivities")
+            key = cache.key(self, backend=backend, method=method, **options)
+            result = cache.get(key)
+            if result is None:
+                self.run(backend, method=method, **options)
+                cache.put(key, self.trajectories, self.integration_stats)
+            else:
+                self.allocate_vectors(self.n)
+                np.copyto(self.trajectories, result[0])
+                self.integration_stats = dict(result[1])
+            return
+        if sensitivities and (method != "euler" or k_start > 0 or
+                              self.stride > 1):
+            raise ValueError("sensitivities are propagated along the Euler "
+                             "method from the initial state, with stride 1 "
+                             "only")
+        if self.stride > 1 and method == "euler":
+            if backend != "python" or k_start > 0:
+                raise ValueError("a run with stride > 1 uses the python "
+                                 "backend from the initial state only")
+            self._run_strided()
+            return
+        if method != "euler":
+            if backend != "python" or k_start > 0:
+                raise ValueError(f"method {method!r} runs with the python "
+                                 "backend from the initial state only")
+            self._run_integrator(method, **options)
+            return
+        if k_start > 0 and self.trajectories is None:
+            raise ValueError("no state to continue from at k_start="
+                             f"{k_start}, see fork and restore")
+        if backend == "numba":
+            from . import kernel
+            if kernel.njit is None:
+                warnings.warn("numba is not installed, World2 runs with the "
+                              "python backend", RuntimeWarning)
+                backend = "python"
+        if backend == "python":
+            if k_start == 0:
+                self.step_init()
+            else:
+                self.sample_switch_functions()
+            for k in range(k_start + 1, self.n):
+                self.step(k)
+        elif backend == "numba":
+            self._run_kernel(kernel.run_kernel, k_start)
+        else:
+            raise ValueError(f"unknown backend {backend!r}, expected "
+                             "'python' or 'numba'")
+        self.integration_stats = {"method": "euler",
+                                  "n_steps": self.n - 1 - k_start,
+                                  "n_rejected": 0,
+                                  "n_evaluations": self.n - 1 - k_start}
+        if sensitivities:
+            from .tangent import run_tangent
+            self.sensitivities = run_tangent(self)
+
+    def _run_strided(self):
+        """
+        Runs the Euler scheme in the moving window of iter_run, and stores
+        one point of time every stride steps.
+
+        """
+        self.allocate_vectors(self.n)
+        for snapshot in self.iter_run(every=self.stride,
+                                      chunk_size=max(self.stride, 128)):
+            i = snapshot["k"] // self.stride
+            for var_name in VARIABLE_NAMES:
+                getattr(self, var_name)[i] = snapshot[var_name]
+        self.integration_stats = {"method": "euler",
+                                  "n_steps": self.n_steps, "n_rejected": 0,
+                                  "n_evaluations": self.n_steps}
+
+    def interpolate(self, times, var_names=VARIABLE_NAMES):
+        """
+        Interpolates model vectors linearly at any points of time within the
+        simulation.
+
+        Parameters
+        ----------
+        times : array_like
+            points of time [year].
+        var_names : list, optional
+            names of the model vectors. The default is VARIABLE_NAMES.
+
+        Returns
+        -------
+        dict
+            values of each model vector at times, by name.
+
+        """
+        times = np.asarray(times, dtype=float)
+        i = np.clip(np.searchsorted(self.time, times) - 1, 0, self.n - 2)
+        weight = (times - self.time[i]) / (self.time[i + 1] - self.time[i])
+        weight = weight.reshape(weight.shape +
+                                (1,) * (len(self._vector_shape(0)) - 1))
+        values = {}
+        for var_name in var_names:
+            vector = getattr(self, var_name)
+            values[var_name] = (vector[i] * (1 - weight) +
+                                vector[i + 1] * weight)
+        return values
+
+    def auxiliaries(self, state, switches):
         """
-        self.step_init()
-        for k in range(1, self.n):
-            self.step(k)
+        Computes all model variables from the state variables, at one or
+        many points of time.
+
+        Parameters
+        ----------
+        state : sequence
+            values of the state variables, in the order of STATE_NAMES.
+        switches : dict
+            values of the switch functions, by lowercase name.
+
+        Returns
+        -------
+        dict
+            values of all model variables, by name of VARIABLE_NAMES, and the
+            derivative of ciaf as "dciaf". Rates are taken at the same time
+            as the state.
+
+        """
+        p, nr, ci, pol, ciaf = state
+        cr = p / (self.la * self.pdn)
+        cir = ci / p
+        nrfr = nr / self.nri
+        polr = pol / self.pols
+        cira = cir * ciaf / self.ciafn
+        fr = (self.fcm(cr) * self.fpci(cira) * self.fpm(polr) *
+              switches["fc"]) / self.fn
+        ecir = cir * (1 - ciaf) * self.nrem(nrfr) / (1 - self.ciafn)
+        msl = ecir / self.ecirn
+        qlm, qlf = self.qlm(msl), self.qlf(fr)
+        return {"p": p, "nr": nr, "ci": ci, "pol": pol, "ciaf": ciaf,
+                "cr": cr, "cir": cir, "nrfr": nrfr, "polr": polr,
+                "cira": cira, "fr": fr, "ecir": ecir, "msl": msl,
+                "ql": (self.qls * qlm * self.qlc(cr) * qlf *
+                       self.qlp(polr)),
+                "br": (p * switches["brn"] * self.brmm(msl) *
+                       self.brcm(cr) * self.brfm(fr) * self.brpm(polr)),
+                "dr": (p * switches["drn"] * self.drmm(msl) *
+                       self.drpm(polr) * self.drfm(fr) * self.drcm(cr)),
+                "nrur": p * switches["nrun"] * self.nrmm(msl),
+                "cid": ci * switches["cidn"],
+                "cig": p * self.cim(msl) * switches["cign"],
+                "polg": p * switches["poln"] * self.polcm(cir),
+                "pola": pol / self.polat(polr),
+                "dciaf": ((self.cfifr(fr) * self.ciqr(qlm / qlf) - ciaf) /
+                          self.ciaft)}
+
+    def derivatives(self, t, state):
+        """
+        Right-hand side of the model: time derivatives of the state
+        variables, in the order of STATE_NAMES.
+
+        Parameters
+        ----------
+        t : float
+            time [year].
+        state : numpy.ndarray
+            values of the state variables, of shape (5,) or (5, n_runs).
+
+        Returns
+        -------
+        numpy.ndarray
+            derivatives, of the shape of state.
+
+        """
+        if state.ndim == 1:
+            # plain floats, faster than numpy scalars with table functions
+            state = state.tolist()
+        switches = {func_name.lower(): getattr(self, func_name.lower())(t)
+                    for func_name in SWITCH_NAMES}
+        var = self.auxiliaries(state, switches)
+        return np.array([var["br"] - var["dr"], -var["nrur"],
+                         var["cig"] - var["cid"], var["polg"] - var["pola"],
+                         var["dciaf"]])
+
+    def _run_integrator(self, method, **options):
+        """
+        Runs the simulation with an integrator of pyworld2.integrators, then
+        computes all model variables from the state at once.
+
+        """
+        from . import integrators
+        if method not in integrators.INTEGRATORS:
+            raise ValueError(f"unknown method {method!r}, expected 'euler' or "
+                             f"one of {list(integrators.INTEGRATORS)}")
+        integrator = integrators.INTEGRATORS[method]
+        self.allocate_vectors(self.n)
+        self.sample_switch_functions()
+        # initial conditions are in the order of STATE_NAMES
+        y0 = np.empty((len(STATE_NAMES),) + self._vector_shape(self.n)[1:])
+        for i, name in enumerate(INITIAL_STATE_NAMES):
+            y0[i] = getattr(self, name)
+        options.setdefault("h", self.dt)
+        if method == "rk45" and "breakpoints" not in options:
+            options["breakpoints"] = self.switch_times()
+        state, stats = integrator(self.derivatives, self.time, y0, **options)
+        switches = {}
+        for func_name in SWITCH_NAMES:
+            values = getattr(self, f"{func_name.lower()}_values")
+            switches[func_name.lower()] = values.reshape(
+                values.shape + (1,) * (self.p.ndim - values.ndim))
+        var = self.auxiliaries(np.moveaxis(state, 1, 0), switches)
+        for var_name in VARIABLE_NAMES:
+            getattr(self, var_name)[:] = var[var_name]
+        self.integration_stats = dict(method=method, **stats)
+
+    def switch_times(self):
+        """
+        Returns all threshold years of the switch functions, where the
+        right-hand side of the model is discontinuous.
+
+        """
+        times = []
+        for func_name in SWITCH_NAMES:
+            func = getattr(self, func_name.lower())
+            if isinstance(func, Schedule):
+                times += [np.ravel(trigger) for trigger in func.trigger_values]
+            else:
+                times.append(np.ravel(func.trigger_value))
+        return np.unique(np.concatenate(times)).astype(float)
+
+    def snapshot(self, k):
+        """
+        Captures the state of the simulation at the k-th time step: values of
+        all model vectors, from which the integration can go on.
+
+        Returns
+        -------
+        dict
+            "k" index and "time" of the step, and values of all model vectors
+            at that step, by name.
+
+        """
+        snapshot = {"k": k, "time": self.time[k]}
+        for var_name in VARIABLE_NAMES:
+            snapshot[var_name] = getattr(self, var_name)[k].copy()
+        return snapshot
+
+    def restore(self, snapshot):
+        """
+        Writes a snapshot back into the model vectors, so that run(k_start=
+        snapshot["k"]) continues the simulation from it.
+
+        """
+        self.allocate_vectors(self.n)
+        for var_name in VARIABLE_NAMES:
+            getattr(self, var_name)[snapshot["k"]] = snapshot[var_name]
+
+    def fork(self, k=None):
+        """
+        Copies the simulation, to continue it with other switch or table
+        functions. Constants and functions are copied as they are, and the
+        model vectors up to the k-th time step.
+
+        Parameters
+        ----------
+        k : int, optional
+            last time step kept in the copy. The default is None, to copy the
+            whole model vectors.
+
+        Returns
+        -------
+        World2
+            copy of the simulation, to run with run(k_start=k).
+
+        """
+        world = copy.copy(self)
+        for func_name in SWITCH_NAMES:
+            if hasattr(self, func_name.lower()):
+                func = copy.deepcopy(getattr(self, func_name.lower()))
+                setattr(world, func_name.lower(), func)
+        if self.trajectories is not None:
+            if k is None:
+                world.trajectories = self.trajectories.copy()
+            else:
+                world.trajectories = np.zeros_like(self.trajectories)
+                world.trajectories[:, :k + 1] = self.trajectories[:, :k + 1]
+            world.allocate_vectors(self.n)
+        return world
+
+    def iter_run(self, every=1, chunk_size=128):
+        """
+        Runs the simulation as a generator of snapshots of the model. Model
+        vectors of the instance are left untouched: the simulation runs in a
+        window of chunk_size + 1 points of time, whose last point is carried
+        over to the next chunk. Memory does not grow with the length of the
+        simulation.
+
+        Parameters
+        ----------
+        every : int, optional
+            yields a snapshot every `every` steps, starting at the first time
+            step. The default is 1.
+        chunk_size : int, optional
+            number of steps run between two moves of the window. The default
+            is 128.
+
+        Yields
+        ------
+        dict
+            "k" index and "time" of the integration step, and values of all
+            model vectors at that step, by name.
+
+        """
+        window = copy.copy(self)
+        window.trajectories = None
+        window.n = chunk_size + 1
+        window.time = self.integration_time(0, window.n)
+        window.step_init()
+        k_start = 0
+        for k in range(self.n_steps + 1):
+            i = k - k_start
+            if i > chunk_size:
+                for var_name in VARIABLE_NAMES:
+                    vector = getattr(window, var_name)
+                    vector[0] = vector[chunk_size]
+                k_start += chunk_size
+                window.time = self.integration_time(k_start,
+                                                    k_start + window.n)
+                window.sample_switch_functions()
+                i = 1
+            if i > 0:
+                window.step(i)
+            if k % every == 0:
+                snapshot = window.snapshot(i)
+                snapshot["k"] = k
+                yield snapshot
+
+    def _run_kernel(self, run_kernel, k_start=0):
+        """
+        Runs the simulation with a kernel of pyworld2.kernel, on buffers
+        packed from the model vectors, constants and functions.
+
+        """
+        self.allocate_vectors(self.n)
+        if self.p.ndim != 1:
+            raise ValueError("compiled backend runs single simulations only")
+        self.sample_switch_functions()
+        constants = np.array([getattr(self, name) for name in
+                              CONSTANT_NAMES + INITIAL_STATE_NAMES],
+                             dtype=float)
+        funcs = [getattr(self, name.lower()) for name in TABLE_NAMES]
+        sizes = np.array([func.x.size for func in funcs], dtype=np.int64)
+        tables = np.zeros((3, len(funcs), sizes.max()))
+        for i, func in enumerate(funcs):
+            tables[0, i, :func.x.size] = func.x
+            tables[1, i, :func.x.size] = func.y
+            tables[2, i, :func.x.size - 1] = func.slopes
+        switches = np.array([getattr(self, f"{name.lower()}_values")
+                             for name in SWITCH_NAMES])
+
+        run_kernel(self.trajectories, self.dt, constants, tables, sizes,
+                   switches, k_start)
 
     def step_init(self):
         """
         Runs the simulation at first time step.
 
         """
+        self.allocate_vectors(self.n)
+        self.sample_switch_functions()
+
         # initialize population
         self.p[0] = self.pi
         self.br[0] = np.nan
@@ -417,7 +964,7 @@ class World2:
 
         # initialize pollution
         self.pol[0] = self.poli
-        self.polg[0] = (self.pi * self.poln(self.time[0]) *
+        self.polg[0] = (self.pi * self.poln_values[0] *
                         self.polcm(self.cir[0]))
         self.polr[0] = self.poli / self.pols
         self.pola[0] = self.poli / self.polat(self.polr[0])
@@ -430,7 +977,7 @@ class World2:
         # initialize other intermediary variables
         self.cira[0] = self.cir[0] * self.ciafi / self.ciafn
         self.fr[0] = (self.fpci(self.cira[0]) * self.fcm(self.cr[0]) *
-                      self.fpm(self.polr[0]) * self.fc(self.time[0])) / self.fn
+                      self.fpm(self.polr[0]) * self.fc_values[0]) / self.fn
         self.ecir[0] = (self.cir[0] * (1 - self.ciaf[0]) *
                         self.nrem(self.nrfr[0])) / (1 - self.ciafn)
         self.msl[0] = self.ecir[0] / self.ecirn
@@ -438,43 +985,75 @@ class World2:
 
     def step(self, k):
         """
-        Runs the simulation at k-th time step.
+        Runs the simulation at k-th time step, one group of equations after
+        the other, in the order of STEP_GROUPS.
 
         """
-        j = k - 1
+        self.step_population(k)
+        self.step_resources(k)
+        self.step_capital(k)
+        self.step_pollution(k)
+        self.step_agriculture(k)
+        self.step_auxiliaries(k)
+
+    def step_population(self, k):
+        """
+        Updates the population state variable at k-th time step.
 
-        # update population state variable
-        self.br[k] = (self.p[j] * self.brn(self.time[j]) *
+        """
+        j = k - 1
+        self.br[k] = (self.p[j] * self.brn_values[j] *
                       self.brmm(self.msl[j]) * self.brcm(self.cr[j]) *
                       self.brfm(self.fr[j]) * self.brpm(self.polr[j]))
-        self.dr[k] = (self.p[j] * self.drn(self.time[j]) *
+        self.dr[k] = (self.p[j] * self.drn_values[j] *
                       self.drmm(self.msl[j]) * self.drpm(self.polr[j]) *
                       self.drfm(self.fr[j]) * self.drcm(self.cr[j]))
         self.p[k] = self.p[j] + (self.br[k] - self.dr[k]) * self.dt
 
-        # update natural resources state variable
-        self.nrur[k] = (self.p[j] * self.nrun(self.time[j]) *
+    def step_resources(self, k):
+        """
+        Updates the natural resources state variable at k-th time step.
+
+        """
+        j = k - 1
+        self.nrur[k] = (self.p[j] * self.nrun_values[j] *
                         self.nrmm(self.msl[j]))
         self.nr[k] = self.nr[j] - self.nrur[k] * self.dt
         self.nrfr[k] = self.nr[k] / self.nri
 
-        # update capital investment state variable
-        self.cid[k] = self.ci[j] * self.cidn(self.time[j])
+    def step_capital(self, k):
+        """
+        Updates the capital investment state variable at k-th time step.
+
+        """
+        j = k - 1
+        self.cid[k] = self.ci[j] * self.cidn_values[j]
         self.cig[k] = (self.p[j] * self.cim(self.msl[j]) *
-                       self.cign(self.time[j]))
+                       self.cign_values[j])
         # (24):
         self.ci[k] = self.ci[j] + self.dt * (self.cig[k] - self.cid[k])
         self.cr[k] = self.p[k] / (self.la * self.pdn)
         self.cir[k] = self.ci[k] / self.p[k]
 
-        # update pollution state variable
-        self.polg[k] = (self.p[j] * self.poln(self.time[j]) *
+    def step_pollution(self, k):
+        """
+        Updates the pollution state variable at k-th time step.
+
+        """
+        j = k - 1
+        self.polg[k] = (self.p[j] * self.poln_values[j] *
                         self.polcm(self.cir[j]))
         self.pola[k] = self.pol[j] / self.polat(self.polr[j])
         self.pol[k] = self.pol[j] + (self.polg[k] - self.pola[k]) * self.dt
         self.polr[k] = self.pol[k] / self.pols
 
-        # update capital investment in agriculutre fraction state variable
+    def step_agriculture(self, k):
+        """
+        Updates the capital investment in agriculture fraction state variable
+        at k-th time step.
+
+        """
+        j = k - 1
         self.ciaf[k] = (self.ciaf[j] +
                         (self.cfifr(self.fr[j]) *
                          self.ciqr(self.qlm(self.msl[j]) /
@@ -482,12 +1061,16 @@ class World2:
                          self.ciaf[j]) *
                         (self.dt / self.ciaft))
 
-        # update other intermediary variables
+    def step_auxiliaries(self, k):
+        """
+        Updates the other intermediary variables at k-th time step.
+
+        """
         self.cira[k] = self.cir[k] * self.ciaf[k] / self.ciafn
         self.fr[k] = (self.fcm(self.cr[k]) *
                       self.fpci(self.cira[k]) *
                       self.fpm(self.polr[k]) *
-                      self.fc(self.time[k])) / self.fn
+                      self.fc_values[k]) / self.fn
         self.ecir[k] = (self.cir[k] *
                         (1 - self.ciaf[k]) *
                         self.nrem(self.nrfr[k])) / (1 - self.ciafn)
@@ -497,6 +1080,54 @@ class World2:
                       self.qlp(self.polr[k]))
 
 
+def run_policies(w2, json_files, backend="python"):
+    """
+    Runs one simulation per switch configuration. The first time steps, over
+    which all switch functions are equal, are simulated once and shared by
+    all runs.
+
+    Parameters
+    ----------
+    w2 : World2
+        simulation with constants, initial state and table functions set.
+    json_files : list
+        paths to json configuration files of switch functions, see
+        World2.set_switch_functions.
+    backend : str, optional
+        backend of World2.run. The default is "python".
+
+    Returns
+    -------
+    list
+        one World2 per json file, after its run.
+
+    """
+    worlds = []
+    for json_file in json_files:
+        world = w2.fork()
+        world.set_switch_functions(json_file)
+        world.sample_switch_functions()
+        worlds.append(world)
+
+    # last time step before switch functions differ
+    k_shared = w2.n - 1
+    for world in worlds[1:]:
+        for func_name in SWITCH_NAMES:
+            values = getattr(world, f"{func_name.lower()}_values")
+            values_ref = getattr(worlds[0], f"{func_name.lower()}_values")
+            differ = (values != values_ref).reshape(w2.n, -1).any(axis=1)
+            if differ.any():
+                k_shared = min(k_shared, int(np.argmax(differ)) - 1)
+    k_shared = max(k_shared, 0)
+
+    worlds[0].run(backend=backend)
+    for i, json_file in enumerate(json_files[1:], start=1):
+        worlds[i] = worlds[0].fork(k_shared)
+        worlds[i].set_switch_functions(json_file)
+        worlds[i].run(backend=backend, k_start=k_shared)
+    return worlds
+
+
 def hello_world2():
     """
     This example runs and plots the 2 scenarios from the book World Dynamics
@@ -507,6 +1138,10 @@ def hello_world2():
         - reduced usage of Natural Resources.
 
     """
+    import matplotlib.pyplot as plt
+
+    from .plotting import plot_world_variables
+
     # scenario: standard run
     w2_std = World2()
     w2_std.set_state_variables()
@@ -19,6 +19,8 @@ setup(
     download_url="https://github.com/cvanwynsberghe/pyworld2/archive/v1.0.tar.gz",
 
     install_requires=["numpy", "scipy", "matplotlib"],
+    extras_require={"numba": ["numba"]},
+    entry_points={"console_scripts": ["pyworld2 = pyworld2.cli:main"]},
 
     include_package_data=True,  # files declared in MANIFEST.in
 